@@ -1,62 +1,177 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, send_from_directory, abort
+from flask import Flask, render_template, redirect, url_for, request, flash, send_from_directory, send_file, abort, jsonify
 from flask_login import LoginManager, login_required, login_user, logout_user, UserMixin, current_user
 import os
 import bcrypt
-from ca_tools.list_certs import list_certificates
+import base64
+import fnmatch
+import functools
+import hashlib
+import hmac
+import io
+import mimetypes
+import shutil
+from ca_tools.list_certs import list_certificates, ScanProgress
+from ca_tools.ca_index import open_index
+from ca_tools.archive_store import open_store
+from ca_tools.bundle_export import BundleMember, FORMATS as EXPORT_FORMATS, bundle_members, parse_variants, stream_bundle
+from ca_tools.expiry_index import ExpiryIndex, describe as describe_expiry
+from ca_tools.san_index import SanSearch, MODE_HOST, MODE_SUFFIX
+from ca_tools.cert_cache import CertCache
+from ca_tools.serial_index import SerialIndex
+from ca_tools.cert_watcher import CertInventory, CertWatcher
+from ca_tools.cert_query import query_certificates
+from ca_tools.key_pool import KeyPool
+from ca_tools.leader import LeaderElection
+from ca_tools import issuer
+from ca_tools.bulk_issue import parse_rows, bulk_issue, format_result as format_bulk_result
+from ca_tools.ca_lock import ca_write_lock
+from ca_tools.jobs import JobQueue, JobError
+from ca_tools.renewal import AutoRenewer, RenewalHistory, read_renewal_params
+from ca_tools.revoke import revoke_batch, OUTCOME_REVOKED, OUTCOME_ALREADY_REVOKED, OUTCOME_NOT_FOUND
+from ca_tools.revoke import REASONS as REVOKE_REASONS
+from ca_tools.crl_cache import CrlCache, crl_response
+from ca_tools.ocsp import OcspResponder
+from ca_tools.docs_cache import DocsCache
+from ca_tools.static_assets import StaticAssets, referenced_files
+from ca_tools.metrics import AppMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE, cache_samples
 from config import Config
 import subprocess
 import tempfile
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 from markupsafe import Markup
-import markdown2
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# --- Optional: Kennzahlen (/metrics); ausgeschaltet wird nichts instrumentiert ---
+metrics = None
+if app.config["METRICS_ENABLED"]:
+    metrics = AppMetrics(slow_request_ms=app.config["METRICS_SLOW_REQUEST_MS"],
+                         shared_dir=app.config["METRICS_DIR"]).install(
+        app, issue_script=app.config["ISSUE_SCRIPT"])
+
+# --- Zertifikats-Metadaten-Cache ---
+cert_cache = CertCache(app.config["CERT_CACHE_FILE"]) if app.config["CERT_CACHE_FILE"] else None
+
+# --- Seriennummern-Index (Serial → Datei) für Revoke/Renew/Details ---
+serial_index = SerialIndex(app.config["CA_DIR"], app.config["ISSUED_DIR"],
+                           backend=app.config["CERT_PARSER"], cache=cert_cache)
+
+# --- Gepackter Archiv-Speicher (ältere Archiv-Sätze in Segmenten, siehe ca_tools/archive_store.py) ---
+archive_store = open_store(app.config["ARCHIVE_DIR"])
+
+# --- Ablauf-Index (sortiert nach notAfter, direkt aus index.txt) ---
+expiry_index = ExpiryIndex(open_index(os.path.join(app.config["CA_DIR"], "index.txt")))
+
+# --- Optional: In-Memory-Bestand, aktuell gehalten durch inotify/Polling (nur im Leader, siehe unten) ---
+cert_inventory = None
+
+# --- Kaltstart-Scan im Hintergrund (füllt Cache/Bestand, blockiert keine Anfrage) ---
+scan_progress = ScanProgress()
+
+def _warm_up(inventory):
+    if inventory is not None:
+        inventory.reload(progress=scan_progress)
+    else:
+        list_certificates(app.config["CA_DIR"], app.config["ISSUED_DIR"], include_archive=True,
+                          backend=app.config["CERT_PARSER"], cache=cert_cache,
+                          workers=app.config["SCAN_WORKERS"], executor_kind=app.config["SCAN_EXECUTOR"],
+                          progress=scan_progress)
+
+def _start_cert_services():
+    """Watcher + Kaltstart-Scan; der Bestand wird erst nach dem Start des Scans sichtbar."""
+    global cert_inventory
+    inventory = None
+    if app.config["CERT_WATCHER"] != "off":
+        inventory = CertInventory(app.config["CA_DIR"], app.config["ISSUED_DIR"],
+                                  backend=app.config["CERT_PARSER"], cache=cert_cache,
+                                  workers=app.config["SCAN_WORKERS"],
+                                  executor_kind=app.config["SCAN_EXECUTOR"], load=False)
+        CertWatcher(inventory, mode=app.config["CERT_WATCHER"],
+                    poll_interval=app.config["CERT_WATCHER_POLL_INTERVAL"]).start()
+    if inventory is not None or cert_cache is not None:
+        scan_progress.start()  # bereits vor dem Thread-Start als "läuft" markieren
+        threading.Thread(target=_warm_up, args=(inventory,), name="cert-warm-up", daemon=True).start()
+    cert_inventory = inventory
+
+# --- Optional: Pool vorab erzeugter Schlüssel für schnellere Ausstellung ---
+# Entnehmen können alle Prozesse (atomares rename), aufgefüllt wird nur im Leader
+key_pool = None
+if app.config["KEY_POOL_SIZE"] > 0:
+    key_pool = KeyPool(app.config["KEY_POOL_DIR"], algo=app.config["CERT_KEY_ALGO"],
+                       bits=app.config["CERT_KEY_BITS"], target=app.config["KEY_POOL_SIZE"])
+
 # --- Login Setup ---
 login_manager = LoginManager(app)
 login_manager.login_view = "login"
 
+def _write_password_file(passwd_file, pw_hash, replace=True):
+    """
+    Hash über eine eigene temporäre Datei (0600) schreiben: andere Worker lesen nie eine halbe Datei.
+    replace=False legt nur an – existiert die Datei schon (anderer Worker war schneller), bleibt sie.
+    """
+    directory = os.path.dirname(passwd_file)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".passwd.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pw_hash)
+        if replace:
+            os.replace(tmp, passwd_file)
+            return True
+        try:
+            os.link(tmp, passwd_file)
+            return True
+        except FileExistsError:
+            return False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
 def load_password_hash(app) -> bytes:
     """Lädt den gespeicherten bcrypt-Hash aus der Datei oder erstellt ihn initial."""
     passwd_file = app.config["PASSWD_FILE"]
-    os.makedirs(os.path.dirname(passwd_file), exist_ok=True)
-
-    if os.path.exists(passwd_file):
-        with open(passwd_file, "rb") as f:
-            return f.read().strip()
-
-    # Initiales Passwort = admin
-    default_pw = b"admin"
-    pw_hash = bcrypt.hashpw(default_pw, bcrypt.gensalt())
-    with open(passwd_file, "wb") as f:
-        f.write(pw_hash)
-    print(f"🔑 Neues Admin-Standardpasswort 'admin' gesetzt → {passwd_file}")
-    return pw_hash
+    if not os.path.exists(passwd_file):
+        # Initiales Passwort = admin
+        if _write_password_file(passwd_file, bcrypt.hashpw(b"admin", bcrypt.gensalt()), replace=False):
+            print(f"🔑 Neues Admin-Standardpasswort 'admin' gesetzt → {passwd_file}")
+    with open(passwd_file, "rb") as f:
+        return f.read().strip()
 
 
 def save_password_hash(app, new_password: str) -> bytes:
     """Speichert ein neues Passwort verschlüsselt in die Datei."""
-    passwd_file = app.config["PASSWD_FILE"]
     pw_hash = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt())
-    os.makedirs(os.path.dirname(passwd_file), exist_ok=True)
-    with open(passwd_file, "wb") as f:
-        f.write(pw_hash)
+    _write_password_file(app.config["PASSWD_FILE"], pw_hash)
     return pw_hash
 
-PASSWORD_HASH = load_password_hash(app)
+_password_state = {"signature": None, "hash": load_password_hash(app)}
+
+def _current_password_hash() -> bytes:
+    """Hash aus der Datei, neu gelesen sobald sie sich ändert – eine Änderung in einem Worker gilt in allen."""
+    try:
+        st = os.stat(app.config["PASSWD_FILE"])
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature != _password_state["signature"]:
+            _password_state["hash"] = load_password_hash(app)
+            _password_state["signature"] = signature
+    except OSError:
+        pass   # Datei kurzzeitig nicht lesbar → zuletzt bekannter Hash
+    return _password_state["hash"]
 
 class User(UserMixin):
     id = "admin"
-    password_hash = PASSWORD_HASH
 
     @staticmethod
     def verify_password(candidate: str) -> bool:
-        return bcrypt.checkpw(candidate.encode("utf-8"), User.password_hash)
+        return bcrypt.checkpw(candidate.encode("utf-8"), _current_password_hash())
 
     @staticmethod
     def change_password(new_password: str):
-        User.password_hash = save_password_hash(app, new_password)
+        save_password_hash(app, new_password)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -64,18 +179,61 @@ def load_user(user_id):
         return User()
     return None
 
+# --- Statische Assets: Fingerprint im Dateinamen, gzip/brotli vorkomprimiert, immutable gecacht ---
+static_assets = None
+if app.config["STATIC_ASSETS"]:
+    static_assets = StaticAssets(app.static_folder, app.config["STATIC_BUILD_DIR"])
+    try:
+        static_assets.build(referenced_files(os.path.join(app.root_path, "templates", "layout.html")))
+    except OSError as e:
+        # Kein Grund, den Worker nicht zu starten – ohne (vollständiges) Manifest gehen die Originale raus
+        app.logger.warning("⚠️ Statische Assets nicht gebaut (%s) – liefere unkomprimierte Originale.", e)
+
+@app.template_global()
+def asset_url(filename):
+    """Wie url_for('static', filename=…), aber mit Fingerprint, sofern die Datei im Asset-Manifest steht."""
+    name = static_assets.url_name(filename) if static_assets is not None else filename
+    return url_for("static", filename=name)
+
+def serve_static(filename):
+    """Ersetzt Flasks static-View: fingerprinted Dateien vorkomprimiert und immutable, sonst wie bisher."""
+    resolved = static_assets.resolve(filename, request.accept_encodings) if static_assets is not None else None
+    if resolved is None:
+        return app.send_static_file(filename)
+    path, logical, encoding, digest = resolved
+    response = send_file(
+        path,
+        mimetype=mimetypes.guess_type(logical)[0] or "application/octet-stream",
+        etag=f"{digest}-{encoding}" if encoding else digest,
+        max_age=365 * 24 * 3600,
+        conditional=True,
+    )
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+app.view_functions["static"] = serve_static
+
+docs_cache = DocsCache(app.config["DOCS_DIR"])
+def _docs_layout_version():
+    """Stand von Templates und Asset-Fingerprints – gleich in allen Workern, neu nach Template-/Asset-Updates."""
+    parts = []
+    for name in ("layout.html", "docs.html"):
+        st = os.stat(os.path.join(app.root_path, "templates", name))
+        parts.append(f"{name}:{st.st_mtime_ns}:{st.st_size}")
+    if static_assets is not None:
+        parts.extend(f"{name}:{info['hash']}" for name, info in sorted(static_assets.manifest.items()))
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:8]
+
+# Gecachte Doku-Seiten nach Template-Updates neu laden; in allen Workern gleich, damit ETags über Worker hinweg passen
+_DOCS_BOOT_ID = _docs_layout_version()
+
 def get_docs_list():
-    """Liest alle Markdown-Dateien im docs-Ordner und gibt sie als dict zurück."""
-    docs = []
-    DOCS_DIR = Path(app.config["DOCS_DIR"])
-    for f in sorted(DOCS_DIR.glob("*.md")):
-        title = f.stem.replace("_", " ").capitalize()
-        docs.append({
-            "id": f.stem,
-            "title": title,
-            "filename": f.name
-        })
-    return docs
+    """Liefert alle Markdown-Dateien im docs-Ordner (gecacht bis sich das Verzeichnis ändert)."""
+    return docs_cache.menu()
 
 # ---------- Hilfsfunktionen für Varianten & Root-CA ---------------------------
 
@@ -93,10 +251,296 @@ def _variants_for_certfile(issued_dir: str, cert_filename: str):
     for ext in exts:
         fname = f"{base}{ext}"
         fpath = os.path.join(issued_dir, fname)
-        if os.path.exists(fpath):
+        # Während des Archivierens liegen Teile des Satzes schon im Archiv (download_file findet sie dort)
+        if os.path.exists(fpath) or os.path.exists(os.path.join(issued_dir, "archive", fname)):
             variants.append({"name": ext.lstrip("."), "filename": fname})
     return variants
 
+def _packed_variants(cert_filename: str):
+    """Varianten eines gepackten Archiv-Satzes (Download über archive/<Datei> aus dem Segment-Speicher)."""
+    packed = archive_store.find_member(cert_filename)
+    if packed is None:
+        return []
+    exts = [".key.pem", ".csr.pem", ".cert.pem", ".fullchain.pem", ".p12"]
+    return [{"name": ext.lstrip("."), "filename": f"archive/{packed.base}{ext}"}
+            for ext in exts if f"{packed.base}{ext}" in packed.members]
+
+def _find_cert_by_serial(serial: str, include_archive: bool = False):
+    """Liefert den Pfad der .cert.pem zu einer Seriennummer (oder None)."""
+    entry = serial_index.lookup(serial, include_archive=include_archive)
+    return entry["path"] if entry else None
+
+def _pool_key_args():
+    """Nimmt (falls aktiv) einen Schlüssel aus dem Key-Pool und liefert die Skript-Argumente dazu."""
+    if key_pool is None:
+        return None, []
+    key_file = key_pool.take()
+    if key_file is None:
+        return None, []  # Pool leer → Skript erzeugt den Schlüssel wie bisher selbst
+    return key_file, ["-K", key_file, "-P", key_pool.pass_file]
+
+def _discard_pool_key(key_file):
+    """Entfernt einen entnommenen Pool-Schlüssel, falls das Skript ihn nicht übernommen hat."""
+    if key_file and os.path.exists(key_file):
+        os.remove(key_file)
+
+_HAVE_FLOCK = shutil.which("flock") is not None
+
+def _issue_certificate(cn: str, dns_list, ip_list):
+    """
+    Stellt ein Zertifikat über das konfigurierte Backend aus (ISSUE_BACKEND):
+      - "script": issue_server_cert.sh (Standard)
+      - "python": native Ausstellung im Prozess (ca_tools/issuer.py)
+    Nutzt den Key-Pool, falls aktiv. Liefert (erfolgreich, Ausgabe/Log).
+    """
+    pool_key, pool_args = _pool_key_args()
+    try:
+        if app.config["ISSUE_BACKEND"] == "python":
+            try:
+                result = issuer.issue_certificate(
+                    cn, dns_list, ip_list,
+                    ca_dir=app.config["CA_DIR"], issued_dir=app.config["ISSUED_DIR"],
+                    days=app.config["CERT_DAYS"], key_algo=app.config["CERT_KEY_ALGO"],
+                    key_bits=app.config["CERT_KEY_BITS"],
+                    pool_key=pool_key, pool_pass_file=key_pool.pass_file if pool_key else None,
+                )
+            except (issuer.IssueError, OSError, ValueError) as e:
+                return False, str(e)
+            return True, issuer.format_result(result)
+
+        cmd = [app.config["ISSUE_SCRIPT"], "-c", cn]
+        for d in dns_list:
+            cmd += ["-d", d]
+        for i in ip_list:
+            cmd += ["-i", i]
+        cmd += pool_args
+        if _HAVE_FLOCK:
+            # Das Skript sperrt selbst nur um "openssl ca" (flock auf ${CA_DIR}/.ca.lock) →
+            # Schlüsselerzeugung, CSR und PKCS#12 laufen parallel
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        else:
+            # Ohne flock(1) das ganze Skript unter der CA-Schreibsperre ausführen
+            with ca_write_lock(app.config["CA_DIR"]):
+                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                        env=dict(os.environ, CA_LOCK_HELD="1"))
+        return result.returncode == 0, result.stdout
+    finally:
+        _discard_pool_key(pool_key)
+
+# --- CRL-Auslieferung aus dem Speicher (neu geladen nur bei geänderter Datei) ---
+crl_cache = CrlCache(os.path.join(app.config["CA_DIR"], "crl"), compress_pem=app.config["CRL_GZIP"])
+
+# --- OCSP-Responder (Status aus index.txt, signierte Antworten zwischengespeichert) ---
+ocsp_responder = None
+if app.config["OCSP_ENABLED"]:
+    ocsp_responder = OcspResponder(
+        app.config["CA_DIR"],
+        validity=app.config["OCSP_VALIDITY"],
+        signer_cert_file=app.config["OCSP_SIGNER_CERT"] or None,
+        signer_key_file=app.config["OCSP_SIGNER_KEY"] or None,
+        echo_nonce=app.config["OCSP_NONCE"],
+    )
+
+# ---------- CA-Operationen (direkt oder als Job ausführbar) -------------------
+
+def _run_logged(cmd, log):
+    """Führt einen Befehl aus, schreibt stdout/stderr ins Job-Log und wirft bei Fehler."""
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    log(f"$ {' '.join(cmd)}\n{result.stdout}")
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, cmd, output=result.stdout)
+    return result.stdout
+
+def _op_create(params, log):
+    cn = params["cn"]
+    ok, output = _issue_certificate(cn, params.get("dns", []), params.get("ips", []))
+    log(output)
+    if metrics is not None:
+        metrics.issued_total.inc("create", "ok" if ok else "failed")
+    if not ok:
+        raise JobError(f"❌ Fehler bei der Zertifikatserstellung für {cn}")
+    return f"✅ Zertifikat für {cn} erfolgreich erstellt."
+
+def _revoke_serials(serials, reason=None, log=None):
+    """Widerruft eine oder mehrere Seriennummern mit genau einer CRL-Erzeugung."""
+    issued_dir = app.config["ISSUED_DIR"]
+    entries = {}
+    for serial, entry in zip(serials, serial_index.lookup_many(serials)):
+        in_issued = entry and os.path.normpath(os.path.dirname(entry["path"])) == os.path.normpath(issued_dir)
+        entries[serial] = entry["file"].rsplit(".cert.pem", 1)[0] if in_issued else None
+    results = revoke_batch(app.config["CA_DIR"], issued_dir, app.config["ARCHIVE_DIR"],
+                           entries, reason=reason, log=log)
+    if metrics is not None:
+        for r in results:
+            metrics.revoked_total.inc(r["outcome"])
+    return results
+
+def _op_revoke(params, log):
+    serials = params.get("serials") or [params["serial"]]
+    try:
+        results = _revoke_serials(serials, reason=params.get("reason"), log=log)
+    except subprocess.CalledProcessError as e:
+        raise JobError(f"❌ Fehler beim Widerruf: {e}")
+
+    counts = {}
+    for r in results:
+        counts[r["outcome"]] = counts.get(r["outcome"], 0) + 1
+    revoked = counts.get(OUTCOME_REVOKED, 0)
+
+    if len(results) == 1:
+        r = results[0]
+        if r["outcome"] == OUTCOME_NOT_FOUND:
+            raise JobError(f"❌ Kein Zertifikat mit Seriennummer {r['serial']} gefunden!")
+        if r["outcome"] == OUTCOME_ALREADY_REVOKED:
+            return f"ℹ️ Zertifikat {r['serial']} war bereits widerrufen ({len(r['files'])} Dateien archiviert)."
+        return (f"🔒 Zertifikat {r['serial']} wurde widerrufen, CRL aktualisiert "
+                f"und ins Archiv verschoben ({len(r['files'])} Dateien).")
+
+    if not revoked and not counts.get(OUTCOME_ALREADY_REVOKED):
+        raise JobError(f"❌ Keines der {len(results)} Zertifikate wurde gefunden!")
+    message = f"🔒 {revoked} von {len(results)} Zertifikaten widerrufen, CRL einmal aktualisiert"
+    if counts.get(OUTCOME_ALREADY_REVOKED):
+        message += f", {counts[OUTCOME_ALREADY_REVOKED]} bereits widerrufen"
+    if counts.get(OUTCOME_NOT_FOUND):
+        message += f", {counts[OUTCOME_NOT_FOUND]} nicht gefunden"
+    return message + "."
+
+def _renew_certificate(cert_file, log, source="renew"):
+    """Stellt ein Zertifikat mit CN/DNS/IP aus cert_file neu aus. Liefert (erfolgreich, Meldung)."""
+    try:
+        cn, dns_list, ip_list = read_renewal_params(cert_file)
+    except (OSError, ValueError) as e:
+        return False, f"❌ Konnte CN/SAN aus {os.path.basename(cert_file)} nicht auslesen: {e}"
+
+    ok, output = _issue_certificate(cn, dns_list, ip_list)
+    log(output)
+    if metrics is not None:
+        metrics.issued_total.inc(source, "ok" if ok else "failed")
+    if not ok:
+        return False, f"❌ Fehler beim Erneuern des Zertifikats {cn}"
+    return True, f"🔁 Zertifikat {cn} wurde erfolgreich erneuert."
+
+def _op_renew(params, log):
+    serial = params["serial"]
+
+    # Zertifikat über den Seriennummern-Index finden
+    cert_file = _find_cert_by_serial(serial)
+
+    if not cert_file:
+        raise JobError(f"❌ Kein Zertifikat mit Seriennummer {serial} gefunden!")
+
+    ok, message = _renew_certificate(cert_file, log)
+    if not ok:
+        raise JobError(message)
+    return message
+
+def _bulk_report(rows, log=None):
+    """Massenausstellung mit den Einstellungen aus config.py; jede fertige Zeile landet im Log."""
+    report = bulk_issue(
+        rows, app.config["CA_DIR"], app.config["ISSUED_DIR"],
+        days=app.config["CERT_DAYS"], key_algo=app.config["CERT_KEY_ALGO"],
+        key_bits=app.config["CERT_KEY_BITS"], workers=app.config["BULK_WORKERS"],
+        # Im Web-Prozess nur Threads: spawn/forkserver würden app.py in jedem Pool-Prozess neu importieren
+        # (samt Watcher, Key-Pool, Jobs), fork aus dem mehrfädigen Prozess kann blockieren
+        executor_kind="thread",
+        progress=(lambda r: log(format_bulk_result(r))) if log else None,
+    )
+    if metrics is not None:
+        metrics.issued_total.inc("bulk", "ok", amount=report["ok"])
+        metrics.issued_total.inc("bulk", "failed", amount=report["failed"])
+    return report
+
+def _op_bulk(params, log):
+    rows = params["rows"]
+    log(f"📋 {len(rows)} Zeilen")
+    report = _bulk_report(rows, log)
+    message = (f"{report['ok']} von {report['total']} Zertifikaten ausgestellt in {report['seconds']:.2f} s "
+               f"({report['certs_per_second']} Zertifikate/s)")
+    if report["ok"] == 0:
+        raise JobError(f"❌ {message}")
+    if report["failed"]:
+        return f"⚠️ {message}, {report['failed']} fehlgeschlagen (siehe Log)."
+    return f"✅ {message}."
+
+OPERATIONS = {
+    "create": (_op_create, "success"),
+    "bulk": (_op_bulk, "success"),
+    "renew": (_op_renew, "success"),
+    "revoke": (_op_revoke, "warning"),
+}
+
+def _run_operation(kind, params, log):
+    """Führt eine Operation aus OPERATIONS aus (mit Zeitmessung, falls Kennzahlen aktiv sind)."""
+    func = OPERATIONS[kind][0]
+    if metrics is None:
+        return func(params, log)
+    started = time.perf_counter()
+    outcome = "failed"
+    try:
+        result = func(params, log)
+        outcome = "ok"
+        return result
+    finally:
+        metrics.operation_seconds.observe(time.perf_counter() - started, kind, outcome)
+
+# --- Job-Queue (JOB_WORKERS = 0 → Operationen laufen direkt in der Anfrage) ---
+job_queue = None
+if app.config["JOB_WORKERS"] > 0:
+    job_queue = JobQueue(app.config["JOB_DB_FILE"], workers=app.config["JOB_WORKERS"])
+    for _kind in OPERATIONS:
+        job_queue.register(_kind, functools.partial(_run_operation, _kind))
+
+# --- Optional: automatische Erneuerung im Hintergrund ---
+auto_renewer = None
+if app.config["AUTO_RENEW"]:
+    auto_renewer = AutoRenewer(
+        RenewalHistory(app.config["AUTO_RENEW_DB_FILE"]), expiry_index, serial_index,
+        renew=lambda cert_file, log: _renew_certificate(cert_file, log, source="auto"),
+        window_days=app.config["AUTO_RENEW_WINDOW_DAYS"], workers=app.config["AUTO_RENEW_WORKERS"],
+        interval=app.config["AUTO_RENEW_INTERVAL"], archive_predecessor=app.config["AUTO_RENEW_ARCHIVE"],
+        archive_dir=app.config["ARCHIVE_DIR"], max_attempts=app.config["AUTO_RENEW_MAX_ATTEMPTS"],
+    )
+
+# --- Hintergrunddienste nur in einem Prozess (Leader-Wahl per Dateisperre, siehe ca_tools/leader.py) ---
+# Mit mehreren gunicorn-Workern laufen Scan, Watcher, Key-Pool-Auffüllung, Job-Ausführung und
+# Auto-Erneuerung genau einmal; die übrigen Worker reihen Jobs nur ein und lesen über den Cache.
+def _start_background_services():
+    _start_cert_services()
+    if key_pool is not None:
+        key_pool.start()
+    if job_queue is not None:
+        job_queue.start()
+    if auto_renewer is not None:
+        auto_renewer.start()
+
+# Beim Flask-Reloader (python app.py mit FLASK_DEBUG) startet der überwachende Elternprozess nichts
+_reloader_parent = (__name__ == "__main__" and app.config["FLASK_DEBUG"]
+                    and os.environ.get("WERKZEUG_RUN_MAIN") != "true")
+leader = None
+if not _reloader_parent:
+    leader = LeaderElection(app.config["SERVICES_LOCK_FILE"], _start_background_services).start()
+
+def _dispatch(kind: str, params: dict, label: str):
+    """Reiht eine Operation in die Job-Queue ein oder führt sie direkt aus (mit Flash-Meldung)."""
+    category = OPERATIONS[kind][1]
+    if job_queue is not None:
+        job_id = job_queue.submit(kind, params, label)
+        flash(Markup('⏳ Auftrag „{}“ eingereiht – <a href="{}">Status anzeigen</a>').format(
+            label, url_for("jobs_view", _anchor=f"job-{job_id}")), "info")
+        return job_id
+
+    log_lines = []
+    try:
+        flash(_run_operation(kind, params, log_lines.append), category)
+    except JobError as e:
+        message = str(e)
+        if log_lines:
+            with tempfile.NamedTemporaryFile("w", delete=False, suffix=".log") as tmpout:
+                tmpout.write("\n".join(log_lines))
+            message += f" (siehe Log: {tmpout.name})"
+        flash(message, "danger")
+    return None
+
 # --- Routes ---
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -113,27 +557,158 @@ def logout():
     logout_user()
     return redirect(url_for("login"))
 
+def _get_certificates(include_archive: bool = True):
+    """Zertifikatsliste aus dem In-Memory-Bestand (Watcher) oder per Scan mit Cache."""
+    if cert_inventory is not None:
+        return cert_inventory.certificates(include_archive=include_archive)
+    return list_certificates(app.config["CA_DIR"], app.config["ISSUED_DIR"], include_archive=include_archive,
+                             backend=app.config["CERT_PARSER"], cache=cert_cache)
+
+# --- Suchindex über Hostnamen/IPs (neu aufgebaut nur bei Änderungen an issued/, archive/ oder index.txt) ---
+san_search = SanSearch(lambda: _get_certificates(include_archive=True),
+                       [app.config["ISSUED_DIR"], app.config["ARCHIVE_DIR"]],
+                       open_index(os.path.join(app.config["CA_DIR"], "index.txt")),
+                       version=lambda: cert_inventory.version if cert_inventory is not None else None)
+
 @app.route("/")
 @login_required
 def dashboard():
-    # Zertifikate wie gehabt einlesen
-    #certs = list_certificates(app.config["CA_DIR"], app.config["ISSUED_DIR"])
-    certs = list_certificates(app.config["CA_DIR"], app.config["ISSUED_DIR"], include_archive=True)
-    #certs = list_certificates(app.config["CA_DIR"], app.config["ISSUED_DIR"], include_archive=False)
-
-    # Für jedes Zertifikat die Varianten (key/csr/cert/fullchain/p12) ergänzen
-    for c in certs:
-        c["variants"] = _variants_for_certfile(app.config["ISSUED_DIR"], c.get("file"))
+    # Die Tabelle lädt ihre Zeilen seitenweise über /api/certs (DataTables serverSide)
 
     # Root-CA nur als öffentliches Zertifikat bereitstellen
     root_cert_filename = "ca.cert.pem"  # liegt unter CA_DIR/certs/
 
     return render_template(
         "cert_list.html",
-        certs=certs,
         root_cert=root_cert_filename  # im Template oben als Download anzeigen
     )
 
+@app.route("/api/certs")
+@login_required
+def api_certs():
+    """
+    Serverseitige Datenquelle für die Zertifikatstabelle (DataTables-Protokoll):
+    Paging, Sortierung, Suche sowie Filter nach Quelle (active/archive/all) und Status.
+    Varianten (key/csr/cert/fullchain/p12) werden nur für die sichtbare Seite ermittelt.
+    """
+    args = request.args
+
+    # Während des Kaltstart-Scans nur den Fortschritt melden, statt selbst zu scannen
+    if scan_progress.running:
+        return jsonify({
+            "draw": args.get("draw", 0, type=int),
+            "recordsTotal": 0,
+            "recordsFiltered": 0,
+            "data": [],
+            "scan": scan_progress.as_dict(),
+        })
+
+    certs = _get_certificates(include_archive=True)
+
+    filtered, page = query_certificates(
+        certs,
+        search=args.get("search[value]", ""),
+        source=args.get("source", "active"),
+        status=args.get("status", ""),
+        order_column=args.get("order[0][column]", 2, type=int),
+        order_dir=args.get("order[0][dir]", "desc"),
+        start=args.get("start", 0, type=int),
+        length=args.get("length", 10, type=int),
+    )
+
+    for c in page:
+        variants = (_packed_variants(c["file"]) if c.get("packed")
+                    else _variants_for_certfile(app.config["ISSUED_DIR"], c.get("file")))
+        c["variants"] = [dict(v, url=url_for("download_file", filename=v["filename"])) for v in variants]
+        c["urls"] = {
+            "renew": url_for("renew_cert", serial=c["serial"]),
+            "revoke": url_for("revoke_cert", serial=c["serial"]),
+            "details": url_for("cert_details", serial=c["serial"]),
+        }
+
+    return jsonify({
+        "draw": args.get("draw", 0, type=int),
+        "recordsTotal": len(certs),
+        "recordsFiltered": filtered,
+        "data": page,
+    })
+
+@app.route("/api/expiry")
+@login_required
+def api_expiry():
+    """
+    Ablauf-Übersicht aus dem Ablauf-Index, ohne Zertifikatsdateien zu lesen:
+      ?days=30   Fenster für "läuft bald ab"
+      ?limit=50  maximale Einträge je Liste
+      ?next=10   die nächsten K ablaufenden Zertifikate
+    "expired_in_issued" (abgelaufen, aber noch in issued/) ist während des Kaltstart-Scans null.
+    """
+    days = max(0, request.args.get("days", 30, type=int))
+    limit = max(0, request.args.get("limit", 50, type=int))
+    k = max(0, request.args.get("next", 10, type=int))
+    now = time.time()
+
+    issued = None if scan_progress.running else serial_index.issued_files()
+
+    def item(entry):
+        return describe_expiry(entry, expiry_index.epoch(entry.serial), now,
+                               file=issued.get(entry.serial) if issued else None)
+
+    counts = expiry_index.counts(windows=sorted({7, 30, days}), now=now)
+    expired_in_issued = None
+    if issued is not None:
+        expired_in_issued = [e for e in expiry_index.expired(now) if e.serial in issued]
+        counts["expired_in_issued"] = len(expired_in_issued)
+
+    return jsonify({
+        "days": days,
+        "counts": counts,
+        "expiring": [item(e) for e in expiry_index.expiring_within(days, now=now, limit=limit)],
+        "next": [item(e) for e in expiry_index.next_to_expire(k, now=now)],
+        "expired_in_issued": None if expired_in_issued is None else [item(e) for e in expired_in_issued[:limit]],
+    })
+
+@app.route("/api/search")
+@login_required
+def api_search():
+    """
+    Welche Zertifikate decken einen Hostnamen bzw. eine IP ab?
+      ?q=api.prod.bmgnet.loc | 10.0.4.17 | 10.0.4.0/24   (mehrfach möglich)
+      ?mode=suffix   alle Namen unterhalb einer Domain statt Abdeckung eines Hostnamens
+      ?all=1         auch abgelaufene, widerrufene und archivierte Zertifikate
+    """
+    queries = [q.strip() for q in request.args.getlist("q") if q.strip()]
+    if not queries:
+        return jsonify({"error": "Parameter q fehlt."}), 400
+    if scan_progress.running:
+        return jsonify({"error": "Zertifikate werden noch eingelesen.", "scan": scan_progress.as_dict()}), 503
+
+    mode = MODE_SUFFIX if request.args.get("mode") == MODE_SUFFIX else MODE_HOST
+    include_all = request.args.get("all", "") in ("1", "true", "on", "yes")
+    limit = request.args.get("limit", 500, type=int)
+    results = {}
+    for q in queries:
+        hits = san_search.search(q, mode=mode, include_all=include_all, limit=limit)
+        results[q] = [
+            {k: c.get(k) for k in ("serial", "cn", "status", "source", "expire", "san", "file", "matched")}
+            for c in hits
+        ]
+    return jsonify({"mode": mode, "all": include_all, "results": results})
+
+@app.route("/api/scan")
+@login_required
+def api_scan_status():
+    """Fortschritt des Kaltstart-Scans (für die Fortschrittsanzeige im Dashboard)."""
+    return jsonify(scan_progress.as_dict())
+
+@app.route("/api/keypool")
+@login_required
+def api_keypool():
+    """Füllstand und Auffüllrate des Key-Pools."""
+    if key_pool is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(key_pool.metrics(), enabled=True))
+
 @app.route("/change_password", methods=["GET", "POST"])
 @login_required
 def change_password():
@@ -173,6 +748,18 @@ def download_file(filename):
     if os.path.exists(issued_path):
         return send_from_directory(app.config["ISSUED_DIR"], filename, as_attachment=True)
 
+    # 1a) Satz wird gerade archiviert (.cert.pem zuletzt verschoben): Variante schon im Archiv
+    if "/" not in filename and os.path.exists(os.path.join(app.config["ARCHIVE_DIR"], filename)):
+        return send_from_directory(app.config["ARCHIVE_DIR"], filename, as_attachment=True)
+
+    # 1b) Gepackte Archiv-Dateien: nur den einen Satz aus dem Segment entpacken
+    if filename.startswith("archive/") and "/" not in filename[len("archive/"):]:
+        name = filename[len("archive/"):]
+        data = archive_store.read_member(name)
+        if data is not None:
+            return send_file(io.BytesIO(data), as_attachment=True, download_name=name,
+                             mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream")
+
     # 2) Root-CA: nur das öffentliche Zertifikat erlauben
     if filename == "ca.cert.pem":
         ca_certs_dir = os.path.join(app.config["CA_DIR"], "certs")
@@ -198,267 +785,335 @@ def create_cert():
 
         issue_script = app.config["ISSUE_SCRIPT"]
 
-        if not os.path.isfile(issue_script):
+        if app.config["ISSUE_BACKEND"] == "script" and not os.path.isfile(issue_script):
             flash(f"Fehler: Ausgabeskript nicht gefunden ({issue_script})", "danger")
             return redirect(url_for("create_cert"))
 
-        cmd = [issue_script, "-c", cn]
-        for d in dns_list:
-            cmd += ["-d", d]
-        for i in ip_list:
-            cmd += ["-i", i]
-
-        import tempfile, subprocess
-        with tempfile.NamedTemporaryFile(delete=False) as tmpout:
-            result = subprocess.run(cmd, stdout=tmpout, stderr=subprocess.STDOUT, text=True)
-            tmpout_path = tmpout.name
-
-        if result.returncode == 0:
-            flash(f"✅ Zertifikat für {cn} erfolgreich erstellt.", "success")
-        else:
-            flash(f"❌ Fehler bei der Zertifikatserstellung (siehe Log: {tmpout_path})", "danger")
-
+        _dispatch("create", {"cn": cn, "dns": dns_list, "ips": ip_list}, f"Erstellen {cn}")
         return redirect(url_for("dashboard"))
 
     return render_template("cert_create.html", title="Neues Zertifikat")
 
-@app.route("/revoke/<serial>", methods=["POST"])
+@app.route("/bulk", methods=["GET", "POST"])
 @login_required
-def revoke_cert(serial):
-    ca_dir = app.config["CA_DIR"]
-    issued_dir = app.config["ISSUED_DIR"]
-    archive_dir = app.config["ARCHIVE_DIR"]
-    ca_pass = os.path.join(ca_dir, "private", "ca.pass")
-    conf_file = os.path.join(ca_dir, "openssl.cnf")
-    
-    os.makedirs(archive_dir, exist_ok=True)
-
-
-    cert_file = None
-    base_name = None 
-
-    # Alle Zertifikate durchsuchen und Seriennummer per openssl auslesen
-    for f in os.listdir(issued_dir):
-        if not f.endswith(".cert.pem"):
-            continue
-        full_path = os.path.join(issued_dir, f)
+def bulk_create():
+    """Massenausstellung aus CSV/JSON (Upload oder Textfeld): als Auftrag oder – ohne Job-Queue – direkt mit Bericht."""
+    report = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        text = upload.read().decode("utf-8-sig") if upload and upload.filename else request.form.get("rows", "")
+        if not text.strip():
+            flash("❌ Keine Zeilen übergeben!", "danger")
+            return redirect(url_for("bulk_create"))
 
         try:
-            result = subprocess.run(
-                ["openssl", "x509", "-in", full_path, "-noout", "-serial"],
-                capture_output=True, text=True, check=True
-            )
-            cert_serial = result.stdout.strip().split("=")[1].upper()
+            rows = parse_rows(text)
+        except (ValueError, AttributeError, TypeError) as e:
+            flash(f"❌ Datei konnte nicht gelesen werden: {e}", "danger")
+            return redirect(url_for("bulk_create"))
 
-            # Seriennummern vergleichen (case-insensitive, ohne führende Nullen)
-            if cert_serial.lstrip("0") == serial.lstrip("0"):
-                cert_file = full_path
-                base_name = f.rsplit(".cert.pem", 1)[0]  # <-- Basisname speichern
-                break
-        except Exception:
-            continue
+        wants_json = request.accept_mimetypes.best == "application/json"
+        if job_queue is not None:
+            # Im Hintergrund als Auftrag – Fortschritt je Zeile im Job-Log unter /jobs
+            job_id = _dispatch("bulk", {"rows": rows}, f"Massenausstellung ({len(rows)} Zeilen)")
+            if wants_json:
+                return jsonify({"job_id": job_id, "status_url": url_for("job_status", job_id=job_id)}), 202
+            return redirect(url_for("jobs_view", _anchor=f"job-{job_id}"))
 
-    if not cert_file:
-        flash(f"❌ Kein Zertifikat mit Seriennummer {serial} gefunden!", "danger")
-        return redirect(url_for("dashboard"))
+        report = _bulk_report(rows)
+        if wants_json:
+            return jsonify(report)
 
-    try:
-        # Zertifikat widerrufen
-        subprocess.run([
-            "openssl", "ca",
-            "-config", conf_file,
-            "-revoke", cert_file,
-            "-passin", f"file:{ca_pass}"
-        ], check=True)
-
-        # Neue CRL generieren
-        crl_file = os.path.join(ca_dir, "crl", "ca.crl.pem")
-        subprocess.run([
-            "openssl", "ca",
-            "-config", conf_file,
-            "-gencrl",
-            "-out", crl_file,
-            "-passin", f"file:{ca_pass}"
-        ], check=True)
-        
-        # Auch CRL als DER exportieren (für Windows / Firewalls)
-        crl_der = os.path.join(ca_dir, "crl", "ca.crl")
-        subprocess.run([
-            "openssl", "crl",
-            "-in", crl_file,
-            "-outform", "DER",
-            "-out", crl_der
-        ], check=True)
-        
-        # 📦 Zertifikatsdateien ins Archiv verschieben
-        extensions = [".cert.pem", ".key.pem", ".csr.pem", ".fullchain.pem", ".p12"]
-        moved_files = []
-        for ext in extensions:
-            src = os.path.join(issued_dir, base_name + ext)
-            if os.path.exists(src):
-                dst = os.path.join(archive_dir, os.path.basename(src))
-                os.rename(src, dst)
-                moved_files.append(os.path.basename(dst))
-
-        flash(f"🔒 Zertifikat {serial} wurde widerrufen, CRL aktualisiert und ins Archiv verschoben ({len(moved_files)} Dateien).", "warning")
-
-    except subprocess.CalledProcessError as e:
-        flash(f"❌ Fehler beim Widerruf: {e}", "danger")
+    return render_template("cert_bulk.html", title="Massenausstellung", report=report)
 
+@app.route("/revoke/<serial>", methods=["POST"])
+@login_required
+def revoke_cert(serial):
+    _dispatch("revoke", {"serial": serial}, f"Widerruf {serial}")
     return redirect(url_for("dashboard"))
 
-@app.route("/renew/<serial>", methods=["POST"])
+@app.route("/revoke/batch", methods=["POST"])
 @login_required
-def renew_cert(serial):
-    issued_dir = app.config["ISSUED_DIR"]
-    issue_script = app.config["ISSUE_SCRIPT"]
-
-    cert_file = None
-    cn = None
-    san_list = []
-
-    # Zertifikat anhand Seriennummer finden
-    for f in os.listdir(issued_dir):
-        if not f.endswith(".cert.pem"):
-            continue
-        full_path = os.path.join(issued_dir, f)
-        try:
-            result = subprocess.run(
-                ["openssl", "x509", "-in", full_path, "-noout", "-serial"],
-                capture_output=True, text=True, check=True
-            )
-            cert_serial = result.stdout.strip().split("=")[1].upper()
-            if cert_serial.lstrip("0") == serial.lstrip("0"):
-                cert_file = full_path
-                break
-        except Exception:
-            continue
+def revoke_batch_certs():
+    """
+    Sammel-Widerruf: Formular (serials=…, mehrfach) aus der Tabellen-Mehrfachauswahl
+    oder JSON {"serials": [...], "reason": "..."} für Skripte.
+    """
+    data = request.get_json(silent=True) if request.is_json else None
+    if data is not None:
+        serials, reason = data.get("serials") or [], data.get("reason")
+    else:
+        serials, reason = request.form.getlist("serials"), request.form.get("reason") or None
+    serials = list(dict.fromkeys(s.strip() for s in serials if s and s.strip()))
 
-    if not cert_file:
-        flash(f"❌ Kein Zertifikat mit Seriennummer {serial} gefunden!", "danger")
+    if reason is not None and reason not in REVOKE_REASONS:
+        if data is not None:
+            return jsonify({"error": f"Unbekannter Widerrufsgrund: {reason}"}), 400
+        flash(f"❌ Unbekannter Widerrufsgrund: {reason}", "danger")
         return redirect(url_for("dashboard"))
 
-    # CN und SAN auslesen
-    try:
-        cn = subprocess.run(
-            ["openssl", "x509", "-in", cert_file, "-noout", "-subject"],
-            capture_output=True, text=True, check=True
-        ).stdout.strip().split("CN=")[-1]
-
-        san_output = subprocess.run(
-            ["openssl", "x509", "-in", cert_file, "-noout", "-text"],
-            capture_output=True, text=True, check=True
-        ).stdout
-        for line in san_output.splitlines():
-            if "DNS:" in line or "IP Address:" in line:
-                san_list.append(line.strip())
-    except subprocess.CalledProcessError:
-        flash(f"❌ Konnte CN/SAN für Zertifikat {serial} nicht auslesen.", "danger")
+    if not serials:
+        if data is not None:
+            return jsonify({"error": "Keine Seriennummern angegeben."}), 400
+        flash("Keine Zertifikate ausgewählt.", "warning")
         return redirect(url_for("dashboard"))
 
-    # Neue Zertifikatserstellung (Renew)
-    cmd = [issue_script, "-c", cn]
-    for san in san_list:
-        if "DNS:" in san:
-            dns_name = san.split("DNS:")[-1].split(",")[0]
-            cmd += ["-d", dns_name]
-        if "IP Address:" in san:
-            ip_addr = san.split("IP Address:")[-1].split(",")[0]
-            cmd += ["-i", ip_addr]
+    params = {"serials": serials, "reason": reason}
+    if data is None:
+        _dispatch("revoke", params, f"Sammel-Widerruf ({len(serials)})")
+        return redirect(url_for("dashboard"))
 
+    # JSON-API: mit Job-Queue → Auftrags-ID, sonst direkt mit Ergebnis je Seriennummer
+    if job_queue is not None:
+        job_id = job_queue.submit("revoke", params, f"Sammel-Widerruf ({len(serials)})")
+        return jsonify({"job": job_id, "status_url": url_for("job_status", job_id=job_id)}), 202
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        flash(f"🔁 Zertifikat {cn} wurde erfolgreich erneuert.", "success")
+        results = _revoke_serials(serials, reason=reason)
     except subprocess.CalledProcessError as e:
-        flash(f"❌ Fehler beim Erneuern des Zertifikats {cn}: {e.stderr}", "danger")
+        return jsonify({"error": f"Fehler beim Widerruf: {e}"}), 500
+    return jsonify({"results": results})
 
+@app.route("/renew/<serial>", methods=["POST"])
+@login_required
+def renew_cert(serial):
+    _dispatch("renew", {"serial": serial}, f"Erneuern {serial}")
     return redirect(url_for("dashboard"))
 
+@app.route("/jobs")
+@login_required
+def jobs_view():
+    """Übersicht der letzten Aufträge (create/renew/revoke …)."""
+    jobs = job_queue.list() if job_queue is not None else []
+    renewals = auto_renewer.history.list(limit=50) if auto_renewer is not None else []
+    runs = auto_renewer.history.runs(limit=5) if auto_renewer is not None else []
+    return render_template("jobs.html", title="Aufträge", jobs=jobs, queue_enabled=job_queue is not None,
+                           renewer=auto_renewer, renewals=renewals, runs=runs)
+
+@app.route("/jobs/<job_id>")
+@login_required
+def job_status(job_id):
+    """Status und Log eines Auftrags als JSON."""
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        abort(404, description="Auftrag nicht gefunden.")
+    return jsonify(job)
+
+@app.route("/renewals/run", methods=["POST"])
+@login_required
+def run_renewals():
+    """Startet sofort einen Lauf der automatischen Erneuerung (im Hintergrund)."""
+    if auto_renewer is None:
+        abort(404)
+    auto_renewer.trigger()
+    flash("🔁 Prüflauf der automatischen Erneuerung gestartet.", "info")
+    return redirect(url_for("jobs_view", _anchor="renewals"))
+
+@app.route("/api/renewals")
+@login_required
+def api_renewals():
+    """Historie der automatischen Erneuerung (letzte Läufe und Einzelergebnisse) als JSON."""
+    if auto_renewer is None:
+        return jsonify({"enabled": False})
+    return jsonify({
+        "enabled": True,
+        "running": auto_renewer.running,
+        "last_run": auto_renewer.last_run,
+        "last_error": auto_renewer.last_error,
+        "window_days": auto_renewer.window_days,
+        "runs": auto_renewer.history.runs(),
+        "renewals": auto_renewer.history.list(limit=request.args.get("limit", 100, type=int)),
+    })
+
+@app.route("/api/renewals/<int:renewal_id>")
+@login_required
+def renewal_status(renewal_id):
+    """Eine Erneuerung inkl. Log als JSON."""
+    renewal = auto_renewer.history.get(renewal_id) if auto_renewer is not None else None
+    if renewal is None:
+        abort(404, description="Erneuerung nicht gefunden.")
+    return jsonify(renewal)
+
 @app.route("/download/index")
 @login_required
 def download_cert_index():
-    """Ermöglicht den Download der aktuellen CA index.txt."""
-    ca_dir = app.config["CA_DIR"]
-    index_file = os.path.join(ca_dir, "index.txt")
-
-    if not os.path.exists(index_file):
+    """
+    Download der aktuellen CA index.txt in lesbarer Form, Zeile für Zeile direkt aus der Datei gestreamt.
+    Bewusst nicht über den geparsten Index: Fehlzeilen und doppelte Seriennummern bleiben sichtbar.
+    """
+    try:
+        src = open(os.path.join(app.config["CA_DIR"], "index.txt"), "r", errors="replace")
+    except FileNotFoundError:
         flash("❌ Keine Zertifikatsliste gefunden!", "danger")
         return redirect(url_for("dashboard"))
 
-    # Eine temporäre, menschenlesbare Version (optional) erzeugen
-    readable_index = os.path.join(tempfile.gettempdir(), "cert_index_readable.txt")
-    with open(index_file, "r") as src, open(readable_index, "w") as dst:
-        dst.write("# Status | Ablauf | Seriennummer | Subject\n")
-        dst.write("# ===========================================\n")
-        for line in src:
-            parts = line.strip().split("\t")
-            if len(parts) >= 6:
-                status, expire, revdate, serial, _, subject = parts[:6]
-                dst.write(f"{status}\t{expire}\t{serial}\t{subject}\n")
-            elif len(parts) >= 4:
-                status, expire, serial, subject = parts[:4]
-                dst.write(f"{status}\t{expire}\t{serial}\t{subject}\n")
-            else:
-                dst.write(line)
+    def generate():
+        with src:
+            yield "# Status | Ablauf | Seriennummer | Subject\n"
+            yield "# ===========================================\n"
+            for line in src:
+                parts = line.strip().split("\t")
+                if len(parts) >= 6:
+                    status, expire, revdate, serial, _, subject = parts[:6]
+                    yield f"{status}\t{expire}\t{serial}\t{subject}\n"
+                elif len(parts) >= 4:
+                    status, expire, serial, subject = parts[:4]
+                    yield f"{status}\t{expire}\t{serial}\t{subject}\n"
+                else:
+                    yield line
+
+    return app.response_class(
+        generate(),
+        mimetype="text/plain",
+        headers={"Content-Disposition": "attachment; filename=cert_index.txt"},
+    )
 
-    return send_from_directory(
-        os.path.dirname(readable_index),
-        os.path.basename(readable_index),
-        as_attachment=True,
-        download_name="cert_index.txt"
+@app.route("/export")
+@login_required
+def export_bundle():
+    """
+    Mehrere Zertifikate als ZIP/tar.gz (gestreamt), inkl. ca.cert.pem und aktueller CRL.
+      ?serial=1A&serial=1B   bestimmte Seriennummern (auch kommagetrennt, auch archivierte)
+      ?cn=*.prod.bmgnet.loc  gültige Zertifikate mit passendem CN (Platzhalter * und ?)
+      (ohne beides)          alle gültigen Zertifikate aus issued/
+      ?variants=cert,fullchain,key,csr,p12   (Standard: cert,fullchain)
+      ?format=zip|tar.gz
+    """
+    fmt = request.args.get("format", "zip")
+    if fmt not in EXPORT_FORMATS:
+        abort(400, description=f"Unbekanntes Format: {fmt}")
+    try:
+        variants = parse_variants(request.args.get("variants"))
+    except ValueError as e:
+        abort(400, description=str(e))
+    if scan_progress.running:
+        flash("⏳ Zertifikate werden noch eingelesen – bitte gleich erneut versuchen.", "warning")
+        return redirect(url_for("dashboard"))
+
+    serials = [s.strip() for value in request.args.getlist("serial") for s in value.split(",") if s.strip()]
+    if serials:
+        certs = [e for e in serial_index.lookup_many(serials, include_archive=True) if e]
+    else:
+        pattern = request.args.get("cn", "").strip().lower()
+        certs = [c for c in _get_certificates(include_archive=False)
+                 if c["status"] == "V" and (not pattern or fnmatch.fnmatchcase((c["cn"] or "").lower(), pattern))]
+    if not certs:
+        flash("❌ Keine passenden Zertifikate für den Export gefunden.", "warning")
+        return redirect(url_for("dashboard"))
+
+    extra = [BundleMember("ca.cert.pem", path=os.path.join(app.config["CA_DIR"], "certs", "ca.cert.pem"))]
+    crl = crl_cache.get("ca.crl.pem")
+    if crl is not None:
+        mtime = crl.last_update.timestamp() if crl.last_update else None
+        extra.append(BundleMember("crl/ca.crl.pem", data=crl.data, mtime=mtime))
+
+    members = bundle_members(certs, app.config["ISSUED_DIR"], variants, store=archive_store, extra=extra)
+    filename = f"ca-export-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return app.response_class(
+        stream_bundle(members, fmt),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
 @app.route("/crl/<filename>")
 def serve_crl(filename):
-    """Öffentliche Bereitstellung der CRL-Datei."""
-    ca_dir = app.config["CA_DIR"]
-    crl_dir = os.path.join(ca_dir, "crl")
-    file_path = os.path.join(crl_dir, filename)
-
-    if not os.path.exists(file_path):
+    """Öffentliche Bereitstellung der CRL-Datei (aus dem Speicher, mit ETag/304)."""
+    entry = crl_cache.get(filename)
+    if entry is None:
         abort(404, description="CRL-Datei nicht gefunden.")
+    return crl_response(entry, request, max_age_cap=app.config["CRL_MAX_AGE"])
 
-    # MIME-Type für CRL (PEM oder DER)
-    if filename.endswith(".pem"):
-        mimetype = "application/x-pem-file"
-    elif filename.endswith(".crl") or filename.endswith(".der"):
-        mimetype = "application/pkix-crl"
+@app.route("/ocsp", methods=["POST"])
+@app.route("/ocsp/<path:encoded>", methods=["GET"])
+def ocsp_endpoint(encoded=None):
+    """Öffentlicher OCSP-Responder (RFC 6960): POST mit DER-Body oder GET mit Base64 im Pfad."""
+    if ocsp_responder is None:
+        abort(404)
+    if encoded is None:
+        der_request = request.get_data()
     else:
-        mimetype = "application/octet-stream"
-
-    return send_from_directory(crl_dir, filename, mimetype=mimetype)
+        try:
+            der_request = base64.b64decode(encoded)
+        except ValueError:
+            der_request = b""
+    der, next_update = ocsp_responder.respond(der_request)
+
+    response = app.response_class(der, mimetype="application/ocsp-response")
+    # GET-Antworten dürfen von Proxies bis nextUpdate zwischengespeichert werden (RFC 5019)
+    if encoded is not None and next_update is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max(0, int((next_update - datetime.now(timezone.utc)).total_seconds()))
+    return response
+
+def _collect_metrics():
+    """Kennzahlen, die die Caches und der Key-Pool ohnehin selbst zählen – gelesen beim Abruf."""
+    samples = []
+    if cert_cache is not None:
+        samples += cache_samples("certcache", cert_cache.hits, cert_cache.misses)
+    samples += cache_samples("crl", crl_cache.hits, crl_cache.reloads)
+    samples += cache_samples("docs", docs_cache.hits, docs_cache.renders)
+    if ocsp_responder is not None:
+        samples += cache_samples("ocsp", ocsp_responder.cache_hits, ocsp_responder.signed)
+        samples.append(("ca_ocsp_unknown_total", "counter", "OCSP-Anfragen für Seriennummern außerhalb von index.txt",
+                        [({}, ocsp_responder.unknown)]))
+    index = open_index(os.path.join(app.config["CA_DIR"], "index.txt"))
+    samples.append(("ca_index_loads_total", "counter", "Lesevorgänge der index.txt (full/incremental)", [
+        ({"mode": "full"}, index.full_loads), ({"mode": "incremental"}, index.incremental_loads)]))
+    if key_pool is not None:
+        pool = key_pool.metrics()
+        samples += [
+            ("ca_keypool_level", "gauge", "Vorrätige Schlüssel im Key-Pool", [({}, pool["level"])]),
+            ("ca_keypool_target", "gauge", "Zielgröße des Key-Pools", [({}, pool["target"])]),
+            ("ca_keypool_keys_total", "counter", "Key-Pool: erzeugt/entnommen/verfehlt/fehlgeschlagen", [
+                ({"event": "generated"}, pool["generated_total"]), ({"event": "taken"}, pool["taken_total"]),
+                ({"event": "miss"}, pool["misses_total"]), ({"event": "failure"}, pool["failures_total"])]),
+        ]
+    samples.append(("ca_archive_packed_sets", "gauge", "Gepackte Archiv-Sätze im Segment-Speicher",
+                    [({}, len(archive_store))]))
+    if job_queue is not None:
+        samples.append(("ca_jobs_active", "gauge", "Wartende und laufende Aufträge", [({}, job_queue.active_count())]))
+    samples.append(("ca_process_start_time_seconds", "gauge", "Startzeitpunkt (Unix-Zeit)", [({}, metrics.started)]))
+    return samples
+
+if metrics is not None:
+    metrics.collector(_collect_metrics)
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Kennzahlen im Prometheus-Textformat (Bearer-Token aus METRICS_TOKEN oder Anmeldung)."""
+    if metrics is None:
+        abort(404)
+    token = app.config["METRICS_TOKEN"]
+    if token:
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+            abort(401)
+    elif not current_user.is_authenticated:
+        return login_manager.unauthorized()
+    return app.response_class(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route("/cert/details/<serial>")
 @login_required
 def cert_details(serial):
-    issued_dir = app.config["ISSUED_DIR"]
-
-    cert_file = None
-    # Zertifikat anhand Seriennummer finden
-    for f in os.listdir(issued_dir):
-        if f.endswith(".cert.pem"):
-            full_path = os.path.join(issued_dir, f)
-            try:
-                result = subprocess.run(
-                    ["openssl", "x509", "-in", full_path, "-noout", "-serial"],
-                    capture_output=True, text=True, check=True
-                )
-                cert_serial = result.stdout.strip().split("=")[1].upper()
-                if cert_serial.lstrip("0") == serial.lstrip("0"):
-                    cert_file = full_path
-                    break
-            except subprocess.CalledProcessError:
-                continue
+    # Zertifikat über den Seriennummern-Index finden (auch im Archiv, auch gepackt)
+    entry = serial_index.lookup(serial, include_archive=True)
 
-    if not cert_file:
+    if not entry:
         return "Zertifikat nicht gefunden", 404
 
-    # Zertifikatsdetails abrufen
+    # Zertifikatsdetails abrufen (gepackte Zertifikate über stdin)
     try:
-        result = subprocess.run(
-            ["openssl", "x509", "-in", cert_file, "-text", "-noout"],
-            capture_output=True, text=True, check=True
-        )
+        if entry["path"]:
+            result = subprocess.run(
+                ["openssl", "x509", "-in", entry["path"], "-text", "-noout"],
+                capture_output=True, text=True, check=True
+            )
+        else:
+            pem = archive_store.read_member(entry["file"])
+            if pem is None:
+                return "Zertifikat nicht gefunden", 404
+            result = subprocess.run(
+                ["openssl", "x509", "-text", "-noout"],
+                input=pem.decode("ascii", "replace"), capture_output=True, text=True, check=True
+            )
         return f"<pre style='font-family: monospace; white-space: pre-wrap;'>{result.stdout}</pre>"
     except subprocess.CalledProcessError as e:
         return f"Fehler beim Lesen des Zertifikats: {e}", 500
@@ -466,24 +1121,24 @@ def cert_details(serial):
 @app.route("/docs/<doc_id>")
 @login_required
 def show_doc(doc_id):
-    """Zeigt eine Markdown-Datei im Template an."""
-    DOCS_DIR = Path(app.config["DOCS_DIR"])
-    file_path = DOCS_DIR / f"{doc_id}.md"
-    if not file_path.exists():
+    """Zeigt eine Markdown-Datei im Template an (gerendertes HTML gecacht, mit ETag)."""
+    doc = docs_cache.get(doc_id)
+    if doc is None:
         abort(404)
-    
-    # ✔ Markdown2 mit Extras: fenced code blocks, Tabellen etc.
-    md_extras = [
-        "fenced-code-blocks",   # ```bash ... ```
-        "tables",               # GitHub-Style Tabellen
-        "code-friendly",        # weniger aggressives Emphasis-Verhalten
-        "strike",               # ~~durchgestrichen~~
-        "smarty-pants",         # “Smart Quotes”, optionale Typografie
-        "cuddled-lists",        # Listen ohne Leerzeile
-    ]  
-    html = markdown2.markdown(file_path.read_text(encoding="utf-8"), extras=md_extras)
-    title = file_path.stem.replace("_", " ").capitalize()
-    return render_template("docs.html", title=title, content=Markup(html))
+
+    # ETag über Dokument, Menü und Benutzer – die Seite enthält Layout und Navigation
+    menu_ids = ",".join(d["id"] for d in docs_cache.menu())
+    etag = hashlib.sha256(
+        f"{doc.etag}|{menu_ids}|{current_user.get_id()}|{_DOCS_BOOT_ID}".encode("utf-8")
+    ).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.make_response(render_template("docs.html", title=doc.title, content=Markup(doc.html)))
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 @app.route("/docs/download/<doc_id>")
 @login_required
@@ -501,6 +1156,11 @@ def download_doc(doc_id):
         download_name=f"{doc_id}.md"
     )
 
+@app.template_filter("timestamp")
+def format_timestamp(value):
+    """Unix-Zeitstempel → lesbares lokales Datum (für Job-Übersicht)."""
+    return time.strftime("%d.%m.%Y %H:%M:%S", time.localtime(value)) if value else "–"
+
 @app.context_processor
 def inject_config():
     """Macht bestimmte Config-Werte in allen Templates verfügbar."""
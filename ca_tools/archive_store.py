@@ -0,0 +1,543 @@
+"""
+Gepackter Segment-Speicher für das Zertifikatsarchiv (ISSUED_DIR/archive/segments/).
+
+Ältere Dateisätze aus dem Archiv (key/csr/cert/fullchain/p12 eines Zertifikats)
+werden je Satz zlib-komprimiert an eine Segmentdatei angehängt (seg-000001.pack,
+nur Anhängen, neue Datei ab ARCHIVE_SEGMENT_MAX_MB). Zu jedem Satz steht eine
+Zeile in index.jsonl: Segment, Offset, Länge, Lage der einzelnen Dateien im
+entpackten Satz und die Zertifikats-Metadaten (CN, Seriennummer, Datum, SANs).
+
+- Listen lesen nur index.jsonl (inkrementell, wie index.txt) – kein Verzeichnis-Scan,
+  kein Dekodieren.
+- Downloads entpacken genau einen Satz (seek + read + decompress) und liefern daraus
+  die gewünschte Datei.
+- Jeder Eintrag im Segment beschreibt sich selbst (Kopf mit Namen und CRC), damit
+  sich index.jsonl jederzeit aus den Segmenten neu aufbauen lässt (reindex).
+
+Reihenfolge beim Packen: Segment schreiben + fsync → Index-Zeile + fsync → erst dann
+die losen Dateien löschen. Ein Absturz dazwischen hinterlässt höchstens ungenutzte
+Bytes im Segment oder einen doppelt gepackten Satz (der spätere Index-Eintrag gilt).
+
+CLI:
+    python -m ca_tools.archive_store pack [--older-than TAGE] [--dry-run]
+    python -m ca_tools.archive_store list | stats | verify | reindex
+    python -m ca_tools.archive_store extract <Dateiname> [-o Ziel]
+    python -m ca_tools.archive_store bench [--sets N]
+"""
+import fcntl
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from ca_tools.ca_index import normalize_serial
+from ca_tools.revoke import ARTIFACT_EXTENSIONS
+
+STORE_DIRNAME = "segments"
+INDEX_FILE = "index.jsonl"
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".pack"
+MAGIC = b"CAS1"
+_RECORD = struct.Struct(">4sII")   # Magic, Länge Kopf (JSON), Länge Nutzdaten (zlib)
+
+DEFAULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _open_private(path, truncate=False):
+    """Öffnet Segment/Index zum Anhängen (bzw. neu schreiben) – immer 0600, unabhängig von der umask."""
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_TRUNC if truncate else os.O_APPEND)
+    fd = os.open(path, flags, 0o600)
+    os.fchmod(fd, 0o600)   # auch bestehende Dateien älterer Versionen nachziehen
+    return os.fdopen(fd, "wb" if truncate else "ab")
+
+
+class PackedSet(NamedTuple):
+    base: str          # Basisname ohne Endung
+    segment: str       # Dateiname des Segments
+    offset: int        # Beginn der komprimierten Nutzdaten im Segment
+    length: int        # Länge der komprimierten Nutzdaten
+    crc: int           # CRC32 der entpackten Nutzdaten
+    members: dict      # Dateiname → [Start, Länge] im entpackten Satz
+    meta: dict         # cn, serial, created, expire, san (leer ohne .cert.pem)
+    packed: float      # Zeitpunkt des Packens
+
+    @property
+    def cert_file(self):
+        name = self.base + ".cert.pem"
+        return name if name in self.members else None
+
+
+def split_artifact(name):
+    """Dateiname → (Basisname, Endung) für bekannte Artefakte, sonst (None, None)."""
+    for ext in ARTIFACT_EXTENSIONS:
+        if name.endswith(ext):
+            return name[:-len(ext)], ext
+    return None, None
+
+
+class ArchiveStore:
+    def __init__(self, archive_dir, segment_max_bytes=DEFAULT_SEGMENT_MAX_BYTES):
+        self.archive_dir = archive_dir
+        self.store_dir = os.path.join(archive_dir, STORE_DIRNAME)
+        self.index_file = os.path.join(self.store_dir, INDEX_FILE)
+        self.segment_max_bytes = segment_max_bytes
+
+        self._lock = threading.Lock()
+        self._sets = {}          # Basisname → PackedSet
+        self._members = {}       # Dateiname → Basisname
+        self._serials = {}       # Seriennummer → Basisname
+        self._inode = None
+        self._offset = 0
+        self._mtime_ns = None
+        self.version = 0
+
+    # ---------- Index lesen (inkrementell, nur Anhängen) ----------
+
+    def _add(self, record):
+        packed = PackedSet(record["base"], record["segment"], record["offset"], record["length"],
+                           record["crc"], record["members"], record.get("meta") or {}, record["packed"])
+        old = self._sets.get(packed.base)
+        if old is not None:
+            for name in old.members:
+                self._members.pop(name, None)
+        self._sets[packed.base] = packed
+        for name in packed.members:
+            self._members[name] = packed.base
+        serial = normalize_serial(packed.meta.get("serial"))
+        if serial and serial != "UNKNOWN":
+            self._serials[serial] = packed.base
+
+    def refresh(self):
+        """Liest neue Zeilen aus index.jsonl. Liefert True bei Änderungen."""
+        with self._lock:
+            try:
+                st = os.stat(self.index_file)
+            except FileNotFoundError:
+                changed = bool(self._sets)
+                self._sets, self._members, self._serials = {}, {}, {}
+                self._inode, self._offset, self._mtime_ns = None, 0, None
+                if changed:
+                    self.version += 1
+                return changed
+            if st.st_ino == self._inode and st.st_size == self._offset and st.st_mtime_ns == self._mtime_ns:
+                return False
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self._sets, self._members, self._serials = {}, {}, {}
+                self._offset = 0
+            with open(self.index_file, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+            end = data.rfind(b"\n") + 1   # unvollständige letzte Zeile (Schreiben läuft) später lesen
+            for line in data[:end].splitlines():
+                try:
+                    self._add(json.loads(line))
+                except (ValueError, KeyError):
+                    continue   # defekte Zeile (z. B. nach Absturz) überspringen
+            self._offset += end
+            self._inode, self._mtime_ns = st.st_ino, st.st_mtime_ns
+            self.version += 1
+            return True
+
+    # ---------- Abfragen ----------
+
+    def sets(self):
+        """Alle gepackten Sätze (Momentaufnahme), nach Basisname absteigend wie die Verzeichnisliste."""
+        self.refresh()
+        return sorted(self._sets.values(), key=lambda s: s.base, reverse=True)
+
+    def __len__(self):
+        self.refresh()
+        return len(self._sets)
+
+    def find_member(self, name):
+        self.refresh()
+        base = self._members.get(name)
+        return self._sets.get(base) if base else None
+
+    def find_serial(self, serial):
+        self.refresh()
+        base = self._serials.get(normalize_serial(serial))
+        return self._sets.get(base) if base else None
+
+    def _payload(self, packed):
+        """Liest und entpackt genau einen Satz aus seinem Segment (seek + read)."""
+        with open(os.path.join(self.store_dir, packed.segment), "rb") as f:
+            f.seek(packed.offset)
+            payload = zlib.decompress(f.read(packed.length))
+        if zlib.crc32(payload) != packed.crc:
+            raise ValueError(f"CRC-Fehler in {packed.segment} für {packed.base}")
+        return payload
+
+    def read_set(self, packed):
+        """Entpackt einen Satz; liefert {Dateiname: Bytes}. ValueError bei beschädigten Daten."""
+        payload = self._payload(packed)
+        return {name: payload[start:start + size] for name, (start, size) in packed.members.items()}
+
+    def read_member(self, name):
+        """Inhalt einer einzelnen archivierten Datei oder None, wenn sie nicht gepackt ist."""
+        packed = self.find_member(name)
+        if packed is None:
+            return None
+        start, size = packed.members[name]
+        return self._payload(packed)[start:start + size]
+
+    def certificates(self, status_map):
+        """Archivierte Zertifikate im Format von list_certificates() (nur aus dem Index)."""
+        certs = []
+        for packed in self.sets():
+            meta = packed.meta
+            if not packed.cert_file or not meta:
+                continue
+            serial = meta.get("serial") or "unknown"
+            certs.append({
+                "cn": meta.get("cn"),
+                "status": status_map.get(serial, "V"),
+                "created": meta.get("created"),
+                "expire": meta.get("expire"),
+                "serial": serial,
+                "san": meta.get("san"),
+                "file": packed.cert_file,
+                "source": "archive",
+                "packed": True,
+            })
+        return certs
+
+    # ---------- Packen ----------
+
+    @contextmanager
+    def _pack_lock(self):
+        """Prozessübergreifende Sperre: nur ein Packvorgang gleichzeitig."""
+        # Segmente enthalten private Schlüssel – Verzeichnis nur für den Eigentümer
+        os.makedirs(self.store_dir, mode=0o700, exist_ok=True)
+        os.chmod(self.store_dir, 0o700)
+        with open(os.path.join(self.store_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _current_segment(self, incoming):
+        segments = sorted(n for n in os.listdir(self.store_dir)
+                          if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+        if segments:
+            last = segments[-1]
+            if os.path.getsize(os.path.join(self.store_dir, last)) + incoming <= self.segment_max_bytes:
+                return last
+            number = int(last[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1
+        else:
+            number = 1
+        return f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    def loose_sets(self, older_than_days=0, now=None):
+        """
+        Lose Dateisätze im Archiv, gruppiert nach Basisname: {Basis: [Dateinamen]}.
+        Alter nach ctime (Zeitpunkt des Verschiebens ins Archiv; rename erhält die mtime).
+        """
+        now = time.time() if now is None else now
+        groups, newest = {}, {}
+        try:
+            entries = list(os.scandir(self.archive_dir))
+        except FileNotFoundError:
+            return {}
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            base, _ = split_artifact(entry.name)
+            if base is None:
+                continue
+            groups.setdefault(base, []).append(entry.name)
+            newest[base] = max(newest.get(base, 0), entry.stat().st_ctime)
+        limit = now - older_than_days * 86400
+        return {b: sorted(names) for b, names in groups.items() if newest[b] <= limit}
+
+    def pack(self, groups, read_meta, log=None, dry_run=False):
+        """
+        Packt die Sätze {Basis: [Dateinamen]} und löscht danach die losen Dateien.
+        read_meta(cert_path) liefert die Metadaten (dict wie read_cert_info()).
+        Liefert (Anzahl Sätze, Bytes vorher, Bytes nachher).
+        """
+        packed_sets = bytes_before = bytes_after = 0
+        with self._pack_lock():
+            for base in sorted(groups):
+                names = groups[base]
+                paths = {n: os.path.join(self.archive_dir, n) for n in names}
+                try:
+                    contents = {}
+                    for name, path in paths.items():
+                        with open(path, "rb") as f:
+                            contents[name] = f.read()
+                except FileNotFoundError:
+                    continue   # zwischenzeitlich verschoben/gelöscht
+                cert_name = base + ".cert.pem"
+                meta = {}
+                if cert_name in paths:
+                    info = read_meta(paths[cert_name])
+                    meta = {k: info.get(k) for k in ("cn", "serial", "created", "expire", "san")}
+
+                payload, members, pos = bytearray(), {}, 0
+                for name in sorted(contents):
+                    members[name] = [pos, len(contents[name])]
+                    payload += contents[name]
+                    pos += len(contents[name])
+                compressed = zlib.compress(bytes(payload), 9)
+                bytes_before += sum(os.stat(p).st_blocks * 512 for p in paths.values())
+                bytes_after += len(compressed)
+                if log:
+                    log(f"{base}: {len(names)} Datei(en), {len(payload)} → {len(compressed)} Bytes")
+                if dry_run:
+                    packed_sets += 1
+                    continue
+
+                header = {"base": base, "members": members, "meta": meta,
+                          "crc": zlib.crc32(payload), "packed": time.time()}
+                header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+                record = _RECORD.pack(MAGIC, len(header_bytes), len(compressed)) + header_bytes + compressed
+
+                segment = self._current_segment(len(record))
+                segment_path = os.path.join(self.store_dir, segment)
+                with _open_private(segment_path) as f:
+                    start = f.seek(0, os.SEEK_END)
+                    f.write(record)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                line = dict(header, segment=segment, length=len(compressed),
+                            offset=start + _RECORD.size + len(header_bytes))
+                with _open_private(self.index_file) as f:
+                    f.write(json.dumps(line, separators=(",", ":")).encode("utf-8") + b"\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                for path in paths.values():
+                    os.remove(path)
+                packed_sets += 1
+        self.refresh()
+        return packed_sets, bytes_before, bytes_after
+
+    # ---------- Wartung ----------
+
+    def _iter_segment(self, segment):
+        """Liest alle Einträge eines Segments (für reindex/verify)."""
+        with open(os.path.join(self.store_dir, segment), "rb") as f:
+            while True:
+                start = f.tell()
+                head = f.read(_RECORD.size)
+                if len(head) < _RECORD.size:
+                    return
+                magic, header_len, payload_len = _RECORD.unpack(head)
+                if magic != MAGIC:
+                    raise ValueError(f"{segment}: ungültiger Eintrag bei Offset {start}")
+                header = json.loads(f.read(header_len))
+                offset = f.tell()
+                f.seek(payload_len, os.SEEK_CUR)
+                if f.tell() > os.fstat(f.fileno()).st_size:
+                    return   # abgeschnittener letzter Eintrag (Absturz beim Schreiben)
+                yield dict(header, segment=segment, offset=offset, length=payload_len)
+
+    def reindex(self):
+        """Baut index.jsonl aus den Segmenten neu auf. Liefert die Anzahl Einträge."""
+        with self._pack_lock():
+            lines = []
+            for segment in sorted(n for n in os.listdir(self.store_dir) if n.endswith(SEGMENT_SUFFIX)):
+                for record in self._iter_segment(segment):
+                    lines.append(json.dumps(record, separators=(",", ":")))
+            tmp = self.index_file + ".tmp"
+            with _open_private(tmp, truncate=True) as f:
+                f.write("".join(line + "\n" for line in lines).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.index_file)
+        self.refresh()
+        return len(lines)
+
+    def verify(self):
+        """Prüft alle Sätze (Entpacken + CRC). Liefert eine Liste von Fehlermeldungen."""
+        errors = []
+        for packed in self.sets():
+            try:
+                self.read_set(packed)
+            except (OSError, ValueError, zlib.error) as e:
+                errors.append(f"{packed.base}: {e}")
+        return errors
+
+    def footprint(self):
+        """Belegter Plattenplatz des Speichers in Bytes (Segmente + Index)."""
+        total = 0
+        try:
+            for entry in os.scandir(self.store_dir):
+                if entry.is_file():
+                    total += entry.stat().st_blocks * 512
+        except FileNotFoundError:
+            pass
+        return total
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def open_store(archive_dir):
+    """Prozessweit geteilte ArchiveStore-Instanz für ein Archivverzeichnis."""
+    path = os.path.abspath(archive_dir)
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = _STORES[path] = ArchiveStore(path)
+        return store
+
+
+# ---------- CLI ----------
+
+def _loose_footprint(directory):
+    files = total = 0
+    for entry in os.scandir(directory):
+        if entry.is_file(follow_symlinks=False):
+            files += 1
+            total += entry.stat().st_blocks * 512
+    return files, total
+
+
+def bench(sets, keep=False):
+    """Misst Verzeichnis-Scan, Listen und Platzbedarf vor/nach dem Packen an einer synthetischen CA."""
+    import random
+    import shutil
+    import tempfile
+
+    from ca_tools import benchmark
+    from ca_tools.list_certs import list_certificates, read_cert_info
+
+    base_dir = tempfile.mkdtemp(prefix="ca-archive-bench-")
+    try:
+        ca_dir, issued_dir, archive_dir = benchmark.build_ca(base_dir)
+        benchmark.populate(ca_dir, issued_dir, archive_dir, sets, revoked_share=1.0)
+
+        files, loose_bytes = _loose_footprint(archive_dir)
+        results = {"sets": sets, "loose": {"files": files, "bytes": loose_bytes}}
+        results["loose"]["scandir"] = benchmark.timed(lambda: list(os.scandir(archive_dir)))
+        results["loose"]["list_certificates"] = benchmark.timed(
+            lambda: list_certificates(ca_dir, issued_dir, include_archive=True))
+
+        store = ArchiveStore(archive_dir)
+        started = time.perf_counter()
+        count, _, _ = store.pack(store.loose_sets(), read_meta=read_cert_info)
+        results["pack_seconds"] = round(time.perf_counter() - started, 3)
+
+        names = [p.cert_file for p in store.sets()]
+        sample = random.Random(1).sample(names, min(200, len(names)))
+        results["packed"] = {
+            "sets": count,
+            "files": _loose_footprint(archive_dir)[0] + len(os.listdir(store.store_dir)),
+            "bytes": store.footprint(),
+            "list_certificates": benchmark.timed(
+                lambda: list_certificates(ca_dir, issued_dir, include_archive=True)),
+            "cold_index_load": benchmark.timed(lambda: len(ArchiveStore(archive_dir))),
+            "extract": benchmark.per_call(store.read_member, [(n,) for n in sample]),
+        }
+        results["savings"] = {
+            "bytes_ratio": round(results["packed"]["bytes"] / max(1, loose_bytes), 3),
+            "list_speedup": round(results["loose"]["list_certificates"]["median"]
+                                  / max(1e-6, results["packed"]["list_certificates"]["median"]), 1),
+        }
+        return results
+    finally:
+        if keep:
+            print(f"ℹ️  Benchmark-CA bleibt erhalten: {base_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    import argparse
+
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, base)
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Gepackter Segment-Speicher für das Zertifikatsarchiv")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_pack = sub.add_parser("pack", help="lose Dateisätze im Archiv packen (Migration)")
+    p_pack.add_argument("--older-than", type=float, default=Config.ARCHIVE_PACK_AFTER_DAYS,
+                        metavar="TAGE", help="nur Sätze, die seit mindestens TAGE im Archiv liegen")
+    p_pack.add_argument("--dry-run", action="store_true", help="nur anzeigen, nichts verändern")
+    sub.add_parser("list", help="gepackte Sätze auflisten")
+    sub.add_parser("stats", help="Anzahl und Platzbedarf")
+    sub.add_parser("verify", help="alle Sätze entpacken und CRC prüfen")
+    sub.add_parser("reindex", help="index.jsonl aus den Segmenten neu aufbauen")
+    p_extract = sub.add_parser("extract", help="eine Datei entpacken")
+    p_extract.add_argument("name", help="Dateiname, z. B. host__20250101120000.p12")
+    p_extract.add_argument("-o", "--output", help="Zieldatei (Standard: stdout)")
+    p_bench = sub.add_parser("bench", help="Benchmark mit synthetischer CA")
+    p_bench.add_argument("--sets", type=int, default=2000, help="Anzahl archivierter Dateisätze")
+    p_bench.add_argument("--keep", action="store_true", help="Benchmark-CA nicht löschen")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        print(json.dumps(bench(args.sets, keep=args.keep), indent=2))
+        return 0
+
+    store = ArchiveStore(Config.ARCHIVE_DIR, segment_max_bytes=Config.ARCHIVE_SEGMENT_MAX_MB * 1024 * 1024)
+
+    if args.command == "pack":
+        from ca_tools.cert_cache import CertCache
+        from ca_tools.list_certs import read_cert_info
+
+        cache = CertCache(Config.CERT_CACHE_FILE) if Config.CERT_CACHE_FILE else None
+
+        def read_meta(path):
+            st = os.stat(path)
+            info = cache.get(path, st.st_mtime_ns, st.st_size) if cache else None
+            return info or read_cert_info(path, Config.CERT_PARSER)
+
+        groups = store.loose_sets(older_than_days=args.older_than)
+        count, before, after = store.pack(groups, read_meta, log=print, dry_run=args.dry_run)
+        prefix = "🔎 Probelauf: " if args.dry_run else "✅ "
+        print(f"{prefix}{count} Dateisätze gepackt, {before} → {after} Bytes")
+        return 0
+
+    if args.command == "list":
+        for packed in store.sets():
+            meta = packed.meta
+            print(f"{meta.get('serial', '-'):>10}  {meta.get('expire', '-'):16}  {packed.base}  "
+                  f"({', '.join(sorted(packed.members))}) [{packed.segment}]")
+        return 0
+
+    if args.command == "stats":
+        loose = store.loose_sets()
+        print(f"Gepackte Sätze:  {len(store)}")
+        print(f"Platzbedarf:     {store.footprint()} Bytes")
+        print(f"Lose Sätze:      {len(loose)} ({sum(len(n) for n in loose.values())} Dateien)")
+        return 0
+
+    if args.command == "verify":
+        errors = store.verify()
+        for error in errors:
+            print(f"❌ {error}")
+        print(f"==> {len(store)} Sätze geprüft, {len(errors)} Fehler")
+        return 1 if errors else 0
+
+    if args.command == "reindex":
+        print(f"✅ {store.reindex()} Einträge indexiert")
+        return 0
+
+    if args.command == "extract":
+        data = store.read_member(args.name)
+        if data is None:
+            print(f"❌ {args.name} ist nicht gepackt", file=sys.stderr)
+            return 1
+        if args.output:
+            with open(args.output, "wb") as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+        return 0
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
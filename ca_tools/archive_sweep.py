@@ -0,0 +1,161 @@
+"""
+Archiv-Bereinigung (Ersatz für die Schleifen in archive_cert.sh).
+
+Verschiebt alle Dateisätze aus issued/, deren Zertifikat in index.txt als
+widerrufen (R) oder abgelaufen (E) markiert ist oder dort gar nicht vorkommt,
+in einem Durchgang ins Archiv – mit einem einzigen Einlesen von index.txt
+(geteilter CaIndex) und höchstens einem Dekodieren pro Zertifikat (mit
+Metadaten-Cache gar keinem für unveränderte Dateien). Protokoll wie bisher
+in ${CA_DIR}/cleanup.log.
+
+Aufruf:
+    python -m ca_tools.archive_sweep [--dry-run] [--no-cache]
+"""
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+from ca_tools.ca_index import normalize_serial, open_index
+from ca_tools.ca_lock import ca_write_lock
+from ca_tools.list_certs import _scan_directory, read_cert_info
+from ca_tools.revoke import archive_file_sets
+
+ARCHIVE_STATUSES = ("R", "E")
+REASON_UNINDEXED = "unindexed"
+
+LOG_FILENAME = "cleanup.log"
+
+
+def scan_issued(issued_dir, backend=None, cache=None):
+    """[(Basisname, Seriennummer oder "")] aller Zertifikate in issued/ – je Datei höchstens ein Dekodieren."""
+    if not os.path.isdir(issued_dir):
+        return []
+    return [
+        (name[:-len(".cert.pem")], normalize_serial(info["serial"]) if info["serial"] != "unknown" else "")
+        for name, info in _scan_directory(issued_dir, backend, cache)
+    ]
+
+
+def _recheck(issued_dir, base, backend=None):
+    """Seriennummer eines Satzes direkt aus der Datei (ohne Cache) oder "" – für die Prüfung unter der Sperre."""
+    path = os.path.join(issued_dir, base + ".cert.pem")
+    if not os.path.exists(path):
+        return None   # inzwischen verschoben (z. B. Widerruf)
+    serial = read_cert_info(path, backend)["serial"]
+    return normalize_serial(serial) if serial != "unknown" else ""
+
+
+def find_candidates(status, scanned):
+    """
+    Liefert [(Basisname, Grund)] für alle Sätze, die ins Archiv gehören.
+    Grund ist der Index-Status ("R"/"E") oder "unindexed" (kein Eintrag oder Zertifikat nicht lesbar).
+    """
+    candidates = []
+    for base, serial in scanned:
+        current = status.get(serial) if serial else None
+        if current in ARCHIVE_STATUSES:
+            candidates.append((base, current))
+        elif current is None:
+            candidates.append((base, REASON_UNINDEXED))
+    return candidates
+
+
+def sweep(ca_dir, issued_dir, archive_dir, backend=None, cache=None, dry_run=False, log=None):
+    """
+    Verschiebt R/E- und nicht indizierte Dateisätze ins Archiv.
+
+    Die Zertifikate werden außerhalb der CA-Schreibsperre gelesen; Index-Abgleich und
+    Verschieben laufen unter der Sperre, damit weder eine parallele Ausstellung (Zertifikat
+    schon da, Index-Zeile noch nicht) noch ein Widerruf (verschiebt selbst) dazwischenkommt.
+    Liefert ein dict mit moved [{base, reason, files}], kept, seconds und dry_run.
+    """
+    started = time.perf_counter()
+    index = open_index(os.path.join(ca_dir, "index.txt"))
+    scanned = scan_issued(issued_dir, backend, cache)
+
+    moved = []
+    with nullcontext() if dry_run else ca_write_lock(ca_dir):
+        # status_map() lädt index.txt erst hier (bzw. nur neue Zeilen) – unter der Sperre
+        status = index.status_map()
+        candidates = find_candidates(status, scanned)
+        # "unindexed" kann auch ein Zertifikat sein, das issue_server_cert.sh beim Scan gerade schrieb
+        # (halbe Datei → keine Seriennummer). Unter der Sperre ist es vollständig: neu lesen und neu einordnen.
+        rechecked = []
+        for base, reason in candidates:
+            if reason == REASON_UNINDEXED:
+                serial = _recheck(issued_dir, base, backend)
+                if serial is None:
+                    continue
+                rechecked.extend(find_candidates(status, [(base, serial)]))
+            else:
+                rechecked.append((base, reason))
+        candidates = rechecked
+        files = {}
+        if candidates and not dry_run:
+            files = archive_file_sets(issued_dir, archive_dir, [base for base, _ in candidates])
+        for base, reason in candidates:
+            moved.append({"base": base, "reason": reason, "files": files.get(base, [])})
+            if log:
+                log(_describe(base, reason, archive_dir, dry_run))
+
+    return {
+        "moved": moved,
+        "kept": len(scanned) - len(moved),
+        "seconds": round(time.perf_counter() - started, 4),
+        "dry_run": dry_run,
+    }
+
+
+def _describe(base, reason, archive_dir, dry_run):
+    prefix = "(Probelauf) " if dry_run else ""
+    if reason == REASON_UNINDEXED:
+        return f"{prefix}⚠️  {base}.* nicht im index.txt – verschiebe ins Archiv."
+    return f"{prefix}📦 [{reason}] Verschiebe {base}.* nach {archive_dir}"
+
+
+def main(argv=None):
+    import argparse
+
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, base)
+    from config import Config
+    from ca_tools.cert_cache import CertCache
+
+    parser = argparse.ArgumentParser(
+        description="Widerrufene, abgelaufene und nicht indizierte Zertifikate aus issued/ ins Archiv verschieben")
+    parser.add_argument("--dry-run", action="store_true", help="nur anzeigen, nichts verschieben")
+    parser.add_argument("--no-cache", action="store_true", help="Metadaten-Cache nicht verwenden")
+    args = parser.parse_args(argv)
+
+    cache = None
+    if Config.CERT_CACHE_FILE and not args.no_cache:
+        try:
+            cache = CertCache(Config.CERT_CACHE_FILE)
+        except Exception as e:  # z. B. fehlende Schreibrechte im Cron-Kontext – dann ohne Cache
+            print(f"ℹ️  Metadaten-Cache nicht verfügbar ({e}) – lese Zertifikate direkt.", file=sys.stderr)
+
+    log_file = os.path.join(Config.CA_DIR, LOG_FILENAME)
+    lines = []
+
+    def log(text):
+        print(text)
+        lines.append(text)
+
+    report = sweep(Config.CA_DIR, Config.ISSUED_DIR, Config.ARCHIVE_DIR, backend=Config.CERT_PARSER,
+                   cache=cache, dry_run=args.dry_run, log=log)
+    summary = (f"{len(report['moved'])} Dateisätze {'würden verschoben' if args.dry_run else 'verschoben'}, "
+               f"{report['kept']} bleiben aktiv ({report['seconds']:.3f} s)")
+    print(f"✅ {summary}")
+
+    if not args.dry_run:
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(f"🧹 Cleanup gestartet: {time.strftime('%c')}\n")
+            for line in lines:
+                f.write(line + "\n")
+            f.write(f"✅ Cleanup abgeschlossen: {time.strftime('%c')} – {summary}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Lastmessung für die CRL-Auslieferung: bisheriger Handler (exists + send_from_directory)
+gegen den In-Memory-Cache mit ETag/304.
+
+    python -m ca_tools.bench_crl [--requests 5000] [--threads 4] [--crl-dir DIR | --synthetic N] [--json]
+
+Gemessen wird über Flasks Test-Client (ohne Netzwerk), jeweils für:
+  legacy        – alter Handler, volle Antwort
+  cached        – Cache, volle Antwort
+  cached_gzip   – Cache, PEM mit Accept-Encoding: gzip
+  cached_304    – Cache, bedingte Anfrage mit If-None-Match
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, abort, request, send_from_directory
+
+from ca_tools.crl_cache import CrlCache, crl_response
+
+
+def write_synthetic_crl(crl_dir, revoked=10000):
+    """Erzeugt eine Wegwerf-CRL (PEM + DER) mit `revoked` Einträgen, signiert mit einem Test-Schlüssel."""
+    from datetime import datetime, timedelta, timezone
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    now = datetime.now(timezone.utc)
+    builder = (
+        x509.CertificateRevocationListBuilder()
+        .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Benchmark CA")]))
+        .last_update(now)
+        .next_update(now + timedelta(days=30))
+    )
+    for serial in range(0x1000, 0x1000 + revoked):
+        builder = builder.add_revoked_certificate(
+            x509.RevokedCertificateBuilder().serial_number(serial).revocation_date(now).build()
+        )
+    crl = builder.sign(key, hashes.SHA256())
+    os.makedirs(crl_dir, exist_ok=True)
+    with open(os.path.join(crl_dir, "ca.crl.pem"), "wb") as f:
+        f.write(crl.public_bytes(serialization.Encoding.PEM))
+    with open(os.path.join(crl_dir, "ca.crl"), "wb") as f:
+        f.write(crl.public_bytes(serialization.Encoding.DER))
+
+
+def legacy_app(crl_dir):
+    """Nachbau des bisherigen serve_crl als Vergleichsbasis."""
+    app = Flask("bench_crl_legacy")
+
+    @app.route("/crl/<filename>")
+    def serve_crl(filename):
+        file_path = os.path.join(crl_dir, filename)
+        if not os.path.exists(file_path):
+            abort(404)
+        if filename.endswith(".pem"):
+            mimetype = "application/x-pem-file"
+        elif filename.endswith(".crl") or filename.endswith(".der"):
+            mimetype = "application/pkix-crl"
+        else:
+            mimetype = "application/octet-stream"
+        return send_from_directory(crl_dir, filename, mimetype=mimetype)
+
+    return app
+
+
+def cached_app(crl_dir, max_age_cap=3600):
+    app = Flask("bench_crl_cached")
+    cache = CrlCache(crl_dir)
+
+    @app.route("/crl/<filename>")
+    def serve_crl(filename):
+        entry = cache.get(filename)
+        if entry is None:
+            abort(404)
+        return crl_response(entry, request, max_age_cap=max_age_cap)
+
+    return app
+
+
+def run(app, path, requests_total, threads, headers=None, expect=200):
+    """Führt requests_total GETs mit threads parallelen Clients aus; liefert Anfragen/s."""
+    per_thread = max(1, requests_total // threads)
+
+    def worker(_):
+        client = app.test_client()
+        for _ in range(per_thread):
+            response = client.get(path, headers=headers or {})
+            if response.status_code != expect:
+                raise RuntimeError(f"{path}: HTTP {response.status_code} statt {expect}")
+            response.close()
+        return per_thread
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        done = sum(pool.map(worker, range(threads)))
+    seconds = time.perf_counter() - start
+    return {"requests": done, "seconds": round(seconds, 3), "rps": round(done / seconds, 1)}
+
+
+def benchmark(crl_dir, requests_total=5000, threads=4):
+    results = {}
+    for filename in ("ca.crl.pem", "ca.crl"):
+        if not os.path.isfile(os.path.join(crl_dir, filename)):
+            continue
+        path = f"/crl/{filename}"
+        legacy, cached = legacy_app(crl_dir), cached_app(crl_dir)
+        etag = cached.test_client().get(path).headers["ETag"]
+
+        results[filename] = {
+            "legacy": run(legacy, path, requests_total, threads),
+            "cached": run(cached, path, requests_total, threads),
+            "cached_304": run(cached, path, requests_total, threads,
+                              headers={"If-None-Match": etag}, expect=304),
+        }
+        if filename.endswith(".pem"):
+            results[filename]["cached_gzip"] = run(cached, path, requests_total, threads,
+                                                   headers={"Accept-Encoding": "gzip"})
+        base = results[filename]["legacy"]["rps"]
+        for name, r in results[filename].items():
+            r["speedup"] = round(r["rps"] / base, 2) if base else None
+    return results
+
+
+def main(argv=None):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Lastmessung der CRL-Auslieferung (vorher/nachher)")
+    parser.add_argument("--crl-dir", default=os.path.join(Config.CA_DIR, "crl"))
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="statt der echten CRL eine Test-CRL mit N widerrufenen Einträgen verwenden")
+    parser.add_argument("--requests", type=int, default=5000, help="Anfragen pro Messung")
+    parser.add_argument("--threads", type=int, default=4, help="parallele Clients")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory(prefix="bench_crl_") as tmp:
+            write_synthetic_crl(tmp, args.synthetic)
+            results = benchmark(tmp, args.requests, args.threads)
+    else:
+        results = benchmark(args.crl_dir, args.requests, args.threads)
+    if not results:
+        print(f"❌ Keine CRL in {args.crl_dir} gefunden.", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for filename, runs in results.items():
+            print(f"== {filename}")
+            for name, r in runs.items():
+                print(f"   {name:<12} {r['rps']:>10.1f} Anfragen/s   ({r['requests']} in {r['seconds']:.2f}s, x{r['speedup']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+Benchmark-Suite mit synthetischer CA konfigurierbarer Größe.
+
+Baut unter einem temporären BASE_DIR eine Wegwerf-CA mit init_root_ca.sh auf,
+erzeugt N Zertifikate (ein Teil widerrufen und archiviert) und misst:
+
+  - list_certificates() ohne/mit Archiv (kalt, sowie mit warmem Metadaten-Cache)
+  - Dashboard-Route und /api/certs über Flasks Test-Client
+  - Seriennummern-Lookups (revoke/renew/details) und /cert/details/<serial>
+  - CRL-Erzeugung (openssl ca -gencrl + DER-Export)
+  - Durchsatz von serve_crl (volle Antwort und 304)
+  - Ausstellung (nativ, optional zusätzlich per issue_server_cert.sh)
+
+Ergebnisse werden als JSON geschrieben, damit Läufe verglichen werden können.
+Benötigt nur openssl und die Python-Abhängigkeiten der App, kein Netzwerk.
+
+    python -m ca_tools.benchmark --certs 1000 --certs 10000 --output bench.json
+
+Jede Größe läuft in einem eigenen Prozess, weil die App ihre Konfiguration
+beim Import aus der Umgebung liest.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---------- Messhilfen -------------------------------------------------------
+
+def timed(func, repeat=3):
+    """Führt func repeat-mal aus; liefert min/median/max in Sekunden."""
+    runs = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - t)
+    return {"min": round(min(runs), 4), "median": round(statistics.median(runs), 4),
+            "max": round(max(runs), 4), "runs": repeat}
+
+
+def per_call(func, args_list):
+    """Mittlere Dauer pro Aufruf in Mikrosekunden über alle Argumente."""
+    t = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    seconds = time.perf_counter() - t
+    return {"calls": len(args_list), "seconds": round(seconds, 4),
+            "us_per_call": round(seconds / max(1, len(args_list)) * 1e6, 1)}
+
+
+def get_ok(client, url):
+    """GET über den Test-Client; Fehlerstatus bricht den Lauf ab statt still mitgemessen zu werden."""
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url}: HTTP {response.status_code}")
+    return response
+
+
+# ---------- Synthetische CA --------------------------------------------------
+
+def build_ca(base_dir):
+    """Legt config.env an und initialisiert die CA mit init_root_ca.sh (wie bei einer Neuinstallation)."""
+    shutil.copytree(os.path.join(REPO_DIR, "ca_tools_bash"), os.path.join(base_dir, "ca_tools_bash"))
+    ca_dir = os.path.join(base_dir, "ca")
+    env = {
+        "BASE_DIR": base_dir,
+        "CA_DIR": ca_dir,
+        "ISSUED_DIR": os.path.join(base_dir, "issued"),
+        "ARCHIVE_DIR": os.path.join(base_dir, "issued", "archive"),
+        "EXPORT_DIR": os.path.join(ca_dir, "apache-crl"),
+        "CA_PASS_FILE": os.path.join(ca_dir, "private", "ca.pass"),
+        "CA_CONF_FILE": os.path.join(ca_dir, "openssl.cnf"),
+        "CA_COUNTRY": "AT", "CA_STATE": "Vienna", "CA_LOCALITY": "Vienna",
+        "CA_ORG": "Benchmark", "CA_COMMON_NAME": "Benchmark Root CA", "CA_EMAIL": "bench@example.invalid",
+        "CA_CRL_URI": "URI:http://127.0.0.1/crl/ca.crl", "CA_CRL_URI2": "URI:http://127.0.0.1/crl/ca.crl",
+        "CA_KEY_BITS": "4096", "CA_VALID_DAYS": "3650",
+        "CERT_DAYS": "825", "CERT_KEY_BITS": "2048", "CERT_KEY_ALGO": "rsa",
+    }
+    with open(os.path.join(base_dir, "config.env"), "w") as f:
+        for key, value in env.items():
+            f.write(f'{key}="{value}"\n')
+    os.makedirs(os.path.join(ca_dir, "private"), exist_ok=True)
+    with open(env["CA_PASS_FILE"], "w") as f:
+        f.write("benchmark\n")
+    os.chmod(env["CA_PASS_FILE"], 0o600)
+
+    subprocess.run(["bash", os.path.join(base_dir, "ca_tools_bash", "init_root_ca.sh")],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return ca_dir, env["ISSUED_DIR"], env["ARCHIVE_DIR"]
+
+
+def populate(ca_dir, issued_dir, archive_dir, count, revoked_share=0.1):
+    """
+    Erzeugt count Zertifikate mit vollständigem Dateisatz (key/csr/cert/fullchain/p12).
+
+    Gleiche Ausgabe wie issuer.sign_csr (Extensions, index.txt, newcerts/, serial), aber
+    mit einem geteilten Ed25519-Schlüssel und EINEM Schreibvorgang für index.txt –
+    sonst wäre der Aufbau von 10k Zertifikaten quadratisch. Ein Anteil wird
+    anschließend widerrufen und samt Dateien archiviert.
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.serialization import pkcs12
+    from cryptography.x509.oid import NameOID
+
+    from ca_tools import issuer
+    from ca_tools.revoke import archive_file_sets, mark_revoked
+
+    ca = issuer.load_ca(ca_dir)
+    key = issuer.generate_key("ed25519")
+    key_pem = issuer.private_key_pem(key)
+    csr = issuer.build_csr(key, "bench")
+    csr_pem = csr.public_bytes(serialization.Encoding.PEM)
+    p12 = pkcs12.serialize_key_and_certificates(b"bench", key, None, [ca["cert"]],
+                                                serialization.NoEncryption())
+    sign_hash = issuer._hash_for(ca["key"])
+
+    with open(os.path.join(ca_dir, "serial")) as f:
+        serial = int(f.read().strip(), 16)
+    os.makedirs(issued_dir, exist_ok=True)
+    newcerts_dir = os.path.join(ca_dir, "newcerts")
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    lines, serials, basenames = [], [], {}
+    stamp = now.strftime("%Y%m%d%H%M%S")
+    for i in range(count):
+        cn = f"host{i:05d}.bench.loc"
+        # Ablaufdaten über ~2 Jahre verteilen (wichtig für Sortierung/Ablaufabfragen)
+        not_after = now + timedelta(days=1 + (i * 7) % 800)
+        builder = (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)]))
+            .issuer_name(ca["cert"].subject)
+            .public_key(csr.public_key())
+            .serial_number(serial)
+            .not_valid_before(now)
+            .not_valid_after(not_after)
+        )
+        builder = issuer._v3_server_extensions(
+            builder, csr, ca["cert"], [cn, f"www.{cn}", f"*.svc{i % 50}.bench.loc"], [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"]
+        )
+        cert_pem = builder.sign(ca["key"], sign_hash).public_bytes(serialization.Encoding.PEM)
+        serial_hex = issuer.format_serial(serial)
+
+        base = issuer.make_basename(cn, stamp)
+        paths = issuer.artifact_paths(issued_dir, base)
+        for name, data in (("key", key_pem), ("csr", csr_pem), ("cert", cert_pem),
+                           ("fullchain", cert_pem + ca["cert_pem"]), ("p12", p12)):
+            with open(paths[name], "wb") as f:
+                f.write(data)
+        with open(os.path.join(newcerts_dir, f"{serial_hex}.pem"), "wb") as f:
+            f.write(cert_pem)
+
+        lines.append(f"V\t{issuer.format_index_time(not_after)}\t\t{serial_hex}\tunknown\t/CN={cn}\n")
+        serials.append(serial_hex)
+        basenames[serial_hex] = base
+        serial += 1
+
+    with open(os.path.join(ca_dir, "index.txt"), "w") as f:
+        f.writelines(lines)
+    with open(os.path.join(ca_dir, "serial"), "w") as f:
+        f.write(issuer.format_serial(serial) + "\n")
+
+    rng = random.Random(42)
+    revoked = rng.sample(serials, int(count * revoked_share))
+    mark_revoked(os.path.join(ca_dir, "index.txt"), revoked, reason="superseded")
+    archive_file_sets(issued_dir, archive_dir, [basenames[s] for s in revoked])
+    return serials, revoked
+
+
+# ---------- Einzellauf (eigener Prozess) -------------------------------------
+
+def run_single(count, revoked_share, issue_count, requests_total, key_algo, key_bits, script_issue, keep):
+    base_dir = tempfile.mkdtemp(prefix=f"ca-bench-{count}-")
+    results = {"certs": count, "revoked_share": revoked_share}
+    try:
+        t = time.perf_counter()
+        ca_dir, issued_dir, archive_dir = build_ca(base_dir)
+        results["init_ca_seconds"] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        serials, revoked = populate(ca_dir, issued_dir, archive_dir, count, revoked_share)
+        results["populate_seconds"] = round(time.perf_counter() - t, 3)
+
+        # App erst jetzt importieren – Config liest BASE_DIR & Co. beim Import
+        os.environ.update({
+            "BASE_DIR": base_dir, "JOB_WORKERS": "0", "CERT_WATCHER": "off", "KEY_POOL_SIZE": "0",
+            "ISSUE_BACKEND": "python", "CERT_KEY_ALGO": key_algo, "CERT_KEY_BITS": str(key_bits),
+        })
+        sys.path.insert(0, REPO_DIR)
+        import app as webapp
+        from ca_tools.bench_crl import run as run_requests
+        from ca_tools.cert_cache import CertCache
+        from ca_tools.list_certs import list_certificates
+        from ca_tools.revoke import generate_crl
+        from ca_tools import issuer
+
+        while webapp.scan_progress.running:
+            time.sleep(0.05)
+
+        # --- list_certificates ---
+        listing = {}
+        for label, archive in (("without_archive", False), ("with_archive", True)):
+            listing[f"{label}_cold"] = timed(lambda: list_certificates(ca_dir, issued_dir, include_archive=archive))
+            cache = CertCache(os.path.join(base_dir, "config", f"bench-{label}.db"))
+            list_certificates(ca_dir, issued_dir, include_archive=archive, cache=cache)
+            listing[f"{label}_cached"] = timed(
+                lambda: list_certificates(ca_dir, issued_dir, include_archive=archive, cache=cache))
+        results["list_certificates"] = listing
+
+        # --- Dashboard über den Test-Client ---
+        client = webapp.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = "admin"
+            session["_fresh"] = True
+        results["routes"] = {
+            "dashboard": timed(lambda: get_ok(client, "/"), repeat=5),
+            "api_certs_first_page": timed(
+                lambda: get_ok(client, "/api/certs?draw=1&start=0&length=10&source=all"), repeat=5),
+            "api_certs_search": timed(
+                lambda: get_ok(client, "/api/certs?draw=1&start=0&length=10&source=all&search[value]=host00042"),
+                repeat=5),
+        }
+
+        # --- Seriennummern-Lookups (revoke/renew nur aktive, details auch archivierte) ---
+        rng = random.Random(7)
+        revoked_set = set(revoked)
+        active = [s for s in serials if s not in revoked_set]
+        active_sample = [(s,) for s in rng.sample(active, min(500, len(active)))]
+        any_sample = [(s,) for s in rng.sample(serials, min(500, len(serials)))]
+        results["serial_lookup"] = {
+            "revoke_renew": per_call(lambda s: webapp.serial_index.lookup(s), active_sample),
+            "details": per_call(lambda s: webapp.serial_index.lookup(s, include_archive=True), any_sample),
+            "details_route": per_call(lambda s: get_ok(client, f"/cert/details/{s}"), active_sample[:20]),
+        }
+
+        # --- CRL ---
+        results["crl_generation"] = timed(lambda: generate_crl(ca_dir), repeat=3)
+        crl = webapp.app.test_client().get("/crl/ca.crl.pem")
+        results["serve_crl"] = {
+            "crl_bytes": len(crl.data),
+            "full": run_requests(webapp.app, "/crl/ca.crl.pem", requests_total, 1),
+            "not_modified": run_requests(webapp.app, "/crl/ca.crl.pem", requests_total, 1,
+                                         headers={"If-None-Match": crl.headers["ETag"]}, expect=304),
+        }
+
+        # --- Ausstellung ---
+        issuance = {}
+        if issue_count:
+            issuance["python"] = timed(lambda: issuer.issue_certificate(
+                f"issue{time.perf_counter_ns()}.bench.loc", ["www.bench.loc"], ["10.99.0.1"],
+                ca_dir=ca_dir, issued_dir=issued_dir, key_algo=key_algo, key_bits=key_bits), repeat=issue_count)
+            if script_issue:
+                script = os.path.join(base_dir, "ca_tools_bash", "issue_server_cert.sh")
+                issuance["script"] = timed(lambda: subprocess.run(
+                    ["bash", script, "-c", f"script{time.perf_counter_ns()}.bench.loc", "-k", str(key_bits)],
+                    check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL), repeat=issue_count)
+        results["issuance"] = issuance
+        results["index_entries"] = len(webapp.open_index(os.path.join(ca_dir, "index.txt")))
+    finally:
+        if keep:
+            results["base_dir"] = base_dir
+        else:
+            shutil.rmtree(base_dir, ignore_errors=True)
+    return results
+
+
+# ---------- CLI ----------------------------------------------------------------
+
+def _openssl_version():
+    try:
+        return subprocess.run(["openssl", "version"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark mit synthetischer CA")
+    parser.add_argument("--certs", type=int, action="append",
+                        help="Anzahl Zertifikate (mehrfach angebbar, Standard: 1000 und 10000)")
+    parser.add_argument("--revoked", type=float, default=0.1, help="Anteil widerrufen+archiviert (Standard 0.1)")
+    parser.add_argument("--issue", type=int, default=5, help="Anzahl gemessener Ausstellungen (0 = aus)")
+    parser.add_argument("--script-issue", action="store_true", help="zusätzlich issue_server_cert.sh messen")
+    parser.add_argument("--key-algo", default="rsa", help="Schlüsselalgorithmus für die Ausstellung")
+    parser.add_argument("--key-bits", type=int, default=4096)
+    parser.add_argument("--requests", type=int, default=2000, help="Anfragen für serve_crl")
+    parser.add_argument("--output", default=None, help="JSON-Datei (Standard: bench-<Zeitstempel>.json)")
+    parser.add_argument("--keep", action="store_true", help="temporäre CA nicht löschen")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sizes = args.certs or [1000, 10000]
+
+    if args.single:
+        result = run_single(sizes[0], args.revoked, args.issue, args.requests,
+                            args.key_algo, args.key_bits, args.script_issue, args.keep)
+        json.dump(result, sys.stdout)
+        return 0
+
+    report = {
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "openssl": _openssl_version(),
+        "cpus": os.cpu_count(),
+        "runs": [],
+    }
+    for count in sizes:
+        print(f"==> {count} Zertifikate …", file=sys.stderr)
+        cmd = [sys.executable, "-m", "ca_tools.benchmark", "--single", "--certs", str(count),
+               "--revoked", str(args.revoked), "--issue", str(args.issue), "--key-algo", args.key_algo,
+               "--key-bits", str(args.key_bits), "--requests", str(args.requests)]
+        if args.script_issue:
+            cmd.append("--script-issue")
+        if args.keep:
+            cmd.append("--keep")
+        proc = subprocess.run(cmd, cwd=REPO_DIR, stdout=subprocess.PIPE, text=True)
+        if proc.returncode != 0:
+            print(f"❌ Lauf mit {count} Zertifikaten fehlgeschlagen", file=sys.stderr)
+            return proc.returncode
+        # Die App kann beim Import Meldungen ausgeben – das JSON steht in der letzten Zeile
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        report["runs"].append(run)
+        print(f"    Dashboard {run['routes']['dashboard']['median']:.3f}s, "
+              f"list(mit Archiv, kalt) {run['list_certificates']['with_archive_cold']['median']:.3f}s, "
+              f"Lookup {run['serial_lookup']['revoke_renew']['us_per_call']} µs, "
+              f"CRL {run['crl_generation']['median']:.3f}s, "
+              f"serve_crl {run['serve_crl']['full']['rps']} req/s", file=sys.stderr)
+
+    output = args.output or f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"==> Ergebnisse in {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
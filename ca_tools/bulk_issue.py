@@ -0,0 +1,242 @@
+"""
+Massenausstellung von Server-Zertifikaten (CSV/JSON → viele Zertifikate).
+
+Schlüsselerzeugung/CSR und das Verpacken (Fullchain, PKCS#12) laufen parallel
+in einem Worker-Pool; nur das Signieren samt index.txt/serial-Update läuft
+serialisiert im aufrufenden Prozess.
+
+CSV:  cn,dns,ips  – mehrere Werte pro Zelle mit ';' oder Leerzeichen trennen
+JSON: [{"cn": "...", "dns": ["..."], "ips": ["..."]}, ...]
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+
+from ca_tools import issuer
+
+_SPLIT = re.compile(r"[;,\s]+")
+
+
+def _split_values(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v for v in _SPLIT.split(str(value).strip()) if v]
+
+
+def parse_rows(text, fmt=None):
+    """
+    Liest Zeilen aus CSV- oder JSON-Text. fmt: "csv", "json" oder None (automatisch).
+    Liefert Liste von dicts mit cn, dns (Liste), ips (Liste).
+    """
+    text = text.lstrip("﻿")
+    if fmt is None:
+        fmt = "json" if text.lstrip().startswith(("[", "{")) else "csv"
+
+    if fmt == "json":
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("rows", [data])
+        return [
+            {"cn": str(item.get("cn", "")).strip(),
+             "dns": _split_values(item.get("dns")),
+             "ips": _split_values(item.get("ips"))}
+            for item in data
+        ]
+
+    rows = []
+    reader = csv.reader(io.StringIO(text))
+    for record in reader:
+        if not record or not "".join(record).strip() or record[0].lstrip().startswith("#"):
+            continue
+        if record[0].strip().lower() == "cn":
+            continue  # Kopfzeile
+        record += [""] * (3 - len(record))
+        rows.append({"cn": record[0].strip(),
+                     "dns": _split_values(record[1]),
+                     "ips": _split_values(record[2])})
+    return rows
+
+
+# ---------- Worker (laufen im Pool, müssen picklebar sein) -------------------
+
+def _prepare_worker(cn, key_algo, key_bits):
+    """Schlüssel + CSR erzeugen; liefert PEM-Bytes und Dauer."""
+    t = time.perf_counter()
+    key = issuer.generate_key(key_algo, key_bits)
+    csr = issuer.build_csr(key, cn)
+    return (issuer.private_key_pem(key), csr.public_bytes(serialization.Encoding.PEM),
+            time.perf_counter() - t)
+
+
+def _package_worker(paths, key_pem, csr_pem, cert_pem, ca_cert_pem, cn, datepass):
+    """Schlüssel, CSR, Zertifikat, Fullchain und PKCS#12 schreiben; liefert Dauer."""
+    t = time.perf_counter()
+    key = serialization.load_pem_private_key(key_pem, password=None)
+    cert = x509.load_pem_x509_certificate(cert_pem)
+    ca_cert = x509.load_pem_x509_certificate(ca_cert_pem)
+    issuer._write_atomic(paths["key"], key_pem, mode=0o600)
+    issuer._write_atomic(paths["csr"], csr_pem)
+    issuer.package_artifacts(paths, key, cert, cert_pem, ca_cert, ca_cert_pem, cn, datepass)
+    return time.perf_counter() - t
+
+
+def _make_pool(workers, kind):
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    if kind == "process":
+        # Kein fork: die Web-App ist mehrfädig (Watcher, Key-Pool, Jobs) – ein fork, während ein anderer
+        # Thread eine Sperre hält (Logging, SQLite, Import), kann den Kindprozess blockieren
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-issue")
+
+
+def format_result(r):
+    """Eine Ergebniszeile für CLI und Job-Log."""
+    mark = "✅" if r["ok"] else "❌"
+    detail = f"Serial {r['serial']}  {r['seconds']:.2f}s" if r["ok"] else r["error"]
+    return f"{mark} {r['row']:>4}  {r['cn']:<40} {detail}"
+
+
+# ---------- Ablauf -----------------------------------------------------------
+
+def bulk_issue(rows, ca_dir, issued_dir, days=825, key_algo="rsa", key_bits=4096,
+               workers=None, executor_kind="process", pass_file=None, progress=None):
+    """
+    Stellt alle Zeilen aus. Liefert einen Bericht:
+      results: je Zeile row, cn, ok, serial, basename, error, seconds
+      total/ok/failed, seconds (Gesamtzeit), certs_per_second
+
+    progress(result): wird für jede Zeile aufgerufen, sobald sie fertig oder fehlgeschlagen ist.
+    """
+    started = time.perf_counter()
+    os.makedirs(issued_dir, exist_ok=True)
+    results = [
+        {"row": i + 1, "cn": r["cn"], "ok": False, "serial": None, "basename": None,
+         "error": None, "seconds": 0.0}
+        for i, r in enumerate(rows)
+    ]
+
+    # 🔹 Validierung vor dem Start
+    prepared = {}
+    seen = set()
+    for i, row in enumerate(rows):
+        cn = row["cn"]
+        if not cn:
+            results[i]["error"] = "Common Name (CN) fehlt"
+            continue
+        if cn in seen:
+            results[i]["error"] = "CN mehrfach im Batch (gleiche Dateinamen)"
+            continue
+        try:
+            prepared[i] = issuer.normalize_sans(cn, row["dns"], row["ips"])
+        except issuer.IssueError as e:
+            results[i]["error"] = str(e)
+            continue
+        seen.add(cn)
+
+    def done(i):
+        if progress is not None:
+            progress(dict(results[i], seconds=round(results[i]["seconds"], 3)))
+
+    for i, r in enumerate(results):
+        if r["error"]:
+            done(i)
+
+    if prepared:
+        ca = issuer.load_ca(ca_dir, pass_file)  # CA-Schlüssel einmal für den ganzen Batch
+        with _make_pool(workers, executor_kind) as pool:
+            prep_futures = {
+                pool.submit(_prepare_worker, rows[i]["cn"], key_algo, key_bits): i for i in prepared
+            }
+            package_futures = {}
+
+            for fut in as_completed(prep_futures):
+                i = prep_futures[fut]
+                cn = rows[i]["cn"]
+                try:
+                    key_pem, csr_pem, prep_seconds = fut.result()
+                    # === Signieren: serialisiert im aufrufenden Prozess ===
+                    t = time.perf_counter()
+                    csr = x509.load_pem_x509_csr(csr_pem)
+                    dns_names, ip_addrs = prepared[i]
+                    cert, cert_pem, serial = issuer.sign_csr(csr, ca_dir, days, dns_names, ip_addrs, pass_file)
+                    results[i]["seconds"] += prep_seconds + time.perf_counter() - t
+                except Exception as e:  # Fehler einer Zeile darf den Batch nicht abbrechen
+                    results[i]["error"] = str(e)
+                    done(i)
+                    continue
+
+                stamp = time.strftime("%Y%m%d%H%M%S")
+                basename = issuer.make_basename(cn, stamp)
+                results[i].update(serial=serial, basename=basename)
+                paths = issuer.artifact_paths(issued_dir, basename)
+                package_futures[pool.submit(
+                    _package_worker, paths, key_pem, csr_pem, cert_pem, ca["cert_pem"], cn, stamp[:8]
+                )] = i
+
+            for fut in as_completed(package_futures):
+                i = package_futures[fut]
+                try:
+                    results[i]["seconds"] += fut.result()
+                    results[i]["ok"] = True
+                except Exception as e:
+                    results[i]["error"] = f"Zertifikat signiert, Ablage fehlgeschlagen: {e}"
+                done(i)
+
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for r in results if r["ok"])
+    for r in results:
+        r["seconds"] = round(r["seconds"], 3)
+    return {
+        "results": results,
+        "total": len(results),
+        "ok": ok,
+        "failed": len(results) - ok,
+        "seconds": round(elapsed, 3),
+        "certs_per_second": round(ok / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    """CLI: python -m ca_tools.bulk_issue hosts.csv [--workers N] [--json]"""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Zertifikate aus CSV/JSON in großer Zahl ausstellen")
+    parser.add_argument("file", help="CSV- oder JSON-Datei ('-' = stdin)")
+    parser.add_argument("--format", choices=["csv", "json"], help="Format erzwingen")
+    parser.add_argument("--workers", type=int, default=Config.BULK_WORKERS, help="Anzahl paralleler Worker")
+    parser.add_argument("--executor", choices=["process", "thread"], default=Config.BULK_EXECUTOR)
+    parser.add_argument("--json", action="store_true", help="Bericht als JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    text = sys.stdin.read() if args.file == "-" else open(args.file, encoding="utf-8").read()
+    rows = parse_rows(text, args.format)
+    report = bulk_issue(rows, Config.CA_DIR, Config.ISSUED_DIR, days=Config.CERT_DAYS,
+                        key_algo=Config.CERT_KEY_ALGO, key_bits=Config.CERT_KEY_BITS,
+                        workers=args.workers, executor_kind=args.executor)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        for r in report["results"]:
+            print(format_result(r))
+        print(f"\n==> {report['ok']}/{report['total']} ausgestellt in {report['seconds']:.2f}s "
+              f"({report['certs_per_second']} Zertifikate/s)")
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
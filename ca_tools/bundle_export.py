@@ -0,0 +1,248 @@
+"""
+Export mehrerer Zertifikate als ZIP oder tar.gz – gestreamt.
+
+Das Archiv wird beim Ausliefern erzeugt und blockweise an den Client gegeben;
+es entstehen keine temporären Dateien.
+
+- tar.gz: tarfile im Stream-Modus ("w|gz") schreibt in einen kleinen
+  Zwischenspeicher (_Sink), den der Generator nach jeder Datei leert. Die
+  Liste der Einträge wird laufend verworfen → konstanter Speicherbedarf.
+- ZIP: eigener schlanker Writer (_ZipStream) mit Datenbeschreibern. Das
+  Inhaltsverzeichnis am Ende ist Pflicht im ZIP-Format; gemerkt werden davon nur
+  die fertigen Bytes (~100 B pro Datei) statt ZipInfo-Objekten (~1 KB mit zipfile).
+
+Aufbau des Archivs:
+    ca.cert.pem
+    crl/ca.crl.pem
+    certs/<Basisname>.<Variante>        (aus issued/)
+    archive/<Basisname>.<Variante>      (aus dem Archiv, auch gepackt)
+"""
+import io
+import os
+import struct
+import tarfile
+import time
+import zlib
+from typing import NamedTuple
+
+FORMAT_ZIP = "zip"
+FORMAT_TGZ = "tar.gz"
+FORMATS = {
+    FORMAT_ZIP: "application/zip",
+    FORMAT_TGZ: "application/gzip",
+}
+
+# Variante → Dateiendung (Reihenfolge wie in der Zertifikatsliste)
+VARIANTS = {
+    "key": ".key.pem",
+    "csr": ".csr.pem",
+    "cert": ".cert.pem",
+    "fullchain": ".fullchain.pem",
+    "p12": ".p12",
+}
+DEFAULT_VARIANTS = ("cert", "fullchain")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class BundleMember(NamedTuple):
+    name: str             # Pfad im Archiv
+    path: str = None      # Datei auf der Platte …
+    data: bytes = None    # … oder Inhalt aus dem Speicher (gepackter Satz, CRL)
+    mtime: float = None
+
+
+def parse_variants(value):
+    """"cert,fullchain,key" → Tupel in fester Reihenfolge; ValueError bei unbekannten Varianten."""
+    if not value:
+        return DEFAULT_VARIANTS
+    wanted = {v.strip().lower() for v in value.split(",") if v.strip()}
+    unknown = wanted - set(VARIANTS)
+    if unknown:
+        raise ValueError(f"Unbekannte Variante(n): {', '.join(sorted(unknown))}")
+    return tuple(v for v in VARIANTS if v in wanted)
+
+
+def bundle_members(certs, issued_dir, variants=DEFAULT_VARIANTS, store=None, extra=()):
+    """
+    Zertifikats-dicts (file, source, packed) → BundleMember je vorhandener Variante,
+    danach die Einträge aus extra (CA-Zertifikat, CRL). Lazy: erst beim Streamen geprüft.
+    """
+    archive_dir = os.path.join(issued_dir, "archive")
+    seen = set()
+    for cert in certs:
+        name = cert.get("file") or ""
+        if not name.endswith(".cert.pem") or name in seen:
+            continue
+        seen.add(name)
+        base = name[:-len(".cert.pem")]
+        if cert.get("packed"):
+            packed = store.find_member(name) if store is not None else None
+            if packed is None:
+                continue
+            contents = store.read_set(packed)   # ein Satz = wenige KB, einmal entpackt für alle Varianten
+            for variant in variants:
+                member = base + VARIANTS[variant]
+                if member in contents:
+                    yield BundleMember(f"archive/{member}", data=contents[member], mtime=packed.packed)
+            continue
+        folder, directory = ("archive", archive_dir) if cert.get("source") == "archive" else ("certs", issued_dir)
+        for variant in variants:
+            member = base + VARIANTS[variant]
+            yield BundleMember(f"{folder}/{member}", path=os.path.join(directory, member))
+    yield from extra
+
+
+class _Sink:
+    """Nicht suchbares Schreibziel für tarfile; der Generator holt die Bytes mit drain() ab."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _open(member):
+    """Öffnet einen Eintrag → (Dateiobjekt, Größe, mtime) oder None, wenn die Datei fehlt."""
+    if member.data is not None:
+        return io.BytesIO(member.data), len(member.data), member.mtime or time.time()
+    try:
+        f = open(member.path, "rb")
+    except (FileNotFoundError, IsADirectoryError):
+        return None   # Variante nicht vorhanden oder zwischenzeitlich archiviert
+    st = os.fstat(f.fileno())
+    return f, st.st_size, member.mtime or st.st_mtime
+
+
+def _file_mode(name):
+    return 0o600 if name.endswith((".key.pem", ".p12")) else 0o644
+
+
+def _dos_time(mtime):
+    t = time.localtime(max(mtime, 315532800))   # ZIP kennt keine Zeiten vor 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+class _ZipStream:
+    """
+    Minimaler ZIP-Writer für nicht suchbare Ausgaben (Deflate, Größen/CRC im
+    Datenbeschreiber hinter den Daten, ZIP64-Endsatz ab 65535 Einträgen bzw. 4 GiB).
+    """
+
+    _LOCAL = struct.Struct("<IHHHHHIIIHH")
+    _DESCRIPTOR = struct.Struct("<IIII")
+    _CENTRAL = struct.Struct("<IHHHHHHIIIHHHHHII")
+    _END = struct.Struct("<IHHHHIIH")
+    _END64 = struct.Struct("<IQHHIIQQQQ")
+    _LOCATOR64 = struct.Struct("<IIQI")
+    _FLAGS = 0x08 | 0x800   # Datenbeschreiber, Dateinamen in UTF-8
+
+    def __init__(self):
+        self.offset = 0
+        self.count = 0
+        self.central = bytearray()   # fertige Einträge des Inhaltsverzeichnisses
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def entry(self, name, src, mtime):
+        """Generator über die Bytes eines Eintrags (Kopf, komprimierte Daten, Datenbeschreiber)."""
+        encoded = name.encode("utf-8")
+        dos_time, dos_date = _dos_time(mtime)
+        start = self.offset
+        yield self._emit(self._LOCAL.pack(0x04034B50, 20, self._FLAGS, 8, dos_time, dos_date,
+                                          0, 0, 0, len(encoded), 0) + encoded)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        crc = size = compressed = 0
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                compressed += len(data)
+                yield self._emit(data)
+        data = compressor.flush()
+        compressed += len(data)
+        yield self._emit(data + self._DESCRIPTOR.pack(0x08074B50, crc, compressed, size))
+
+        extra = b""
+        local_offset = start
+        if start >= 0xFFFFFFFF:
+            extra = struct.pack("<HHQ", 0x0001, 8, start)
+            local_offset = 0xFFFFFFFF
+        self.central += self._CENTRAL.pack(
+            0x02014B50, (3 << 8) | 20, 45 if extra else 20, self._FLAGS, 8, dos_time, dos_date,
+            crc, compressed, size, len(encoded), len(extra), 0, 0, 0,
+            (0o100000 | _file_mode(name)) << 16, local_offset) + encoded + extra
+        self.count += 1
+
+    def close(self):
+        """Inhaltsverzeichnis und Endsatz."""
+        cd_offset, cd_size = self.offset, len(self.central)
+        tail = bytes(self.central)
+        self.central = bytearray()
+        if self.count >= 0xFFFF or cd_offset >= 0xFFFFFFFF:
+            end64 = cd_offset + cd_size
+            tail += self._END64.pack(0x06064B50, 44, 45, 45, 0, 0, self.count, self.count, cd_size, cd_offset)
+            tail += self._LOCATOR64.pack(0x07064B50, 0, end64, 1)
+            tail += self._END.pack(0x06054B50, 0, 0, 0xFFFF, 0xFFFF, min(cd_size, 0xFFFFFFFF), 0xFFFFFFFF, 0)
+        else:
+            tail += self._END.pack(0x06054B50, 0, 0, self.count, self.count, cd_size, cd_offset, 0)
+        return self._emit(tail)
+
+
+def _stream_zip(members):
+    zf = _ZipStream()
+    for member in members:
+        opened = _open(member)
+        if opened is None:
+            continue
+        src, _, mtime = opened
+        with src:
+            yield from zf.entry(member.name, src, mtime)
+    yield zf.close()
+
+
+def _stream_tar(members, sink):
+    # "w|gz": Stream-Modus ohne Zurückspringen; die Größe kommt aus fstat der geöffneten Datei
+    with tarfile.open(fileobj=sink, mode="w|gz") as tar:
+        for member in members:
+            opened = _open(member)
+            if opened is None:
+                continue
+            src, size, mtime = opened
+            with src:
+                info = tarfile.TarInfo(member.name)
+                info.size = size
+                info.mtime = int(mtime)
+                info.mode = _file_mode(member.name)
+                tar.addfile(info, src)
+            tar.members = []   # Einträge nicht sammeln (nur für spätere Lesezugriffe nötig)
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def stream_bundle(members, fmt=FORMAT_ZIP):
+    """Generator über die Bytes des Archivs (ZIP oder tar.gz)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unbekanntes Format: {fmt}")
+    stream = _stream_zip(members) if fmt == FORMAT_ZIP else _stream_tar(members, _Sink())
+    for data in stream:
+        if data:
+            yield data
@@ -0,0 +1,186 @@
+"""
+Gemeinsamer Parser für die openssl-CA-Datenbank (CA_DIR/index.txt).
+
+Jede Zeile wird einmal in einen kompakten IndexEntry (Status, Ablauf,
+Widerruf, Seriennummer, Datei, Subject) zerlegt und unter der normalisierten
+Seriennummer abgelegt. Da `openssl ca` nur Zeilen anhängt oder die Datei per
+rename komplett ersetzt, liest refresh() inkrementell: gleiche Inode und
+gewachsene Datei → nur die neuen Zeilen ab dem gemerkten Offset; neue Inode,
+geschrumpfte oder in-place geänderte Datei → alles neu.
+
+open_index() liefert pro Datei eine prozessweit geteilte Instanz.
+"""
+import os
+import threading
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+
+def normalize_serial(serial):
+    """Normalisiert eine Seriennummer: Großbuchstaben, ohne führende Nullen."""
+    return (serial or "").strip().upper().lstrip("0")
+
+
+def parse_index_time(value):
+    """ASN.1-Zeit aus index.txt (UTCTime oder GeneralizedTime) → datetime (UTC)."""
+    fmt = "%y%m%d%H%M%SZ" if len(value) == 13 else "%Y%m%d%H%M%SZ"
+    return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+
+
+class IndexEntry(NamedTuple):
+    status: str      # V / E / R
+    expires: str     # ASN.1-Zeit wie in index.txt
+    revoked: str     # "<ASN.1-Zeit>[,<Grund>]" oder ""
+    serial: str      # normalisiert
+    filename: str
+    subject: str
+
+    @property
+    def expires_at(self):
+        try:
+            return parse_index_time(self.expires)
+        except ValueError:
+            return None
+
+    @property
+    def revoked_at(self):
+        when = self.revoked.partition(",")[0]
+        try:
+            return parse_index_time(when) if when else None
+        except ValueError:
+            return None
+
+    @property
+    def reason(self):
+        return self.revoked.partition(",")[2] or None
+
+
+def parse_line(line):
+    """Eine index.txt-Zeile → IndexEntry oder None (Leer-/Fehlzeilen)."""
+    parts = line.rstrip("\r\n").split("\t")
+    if len(parts) < 4 or not parts[0].strip() or not parts[3].strip():
+        return None
+    subject = parts[5] if len(parts) >= 6 else ""
+    filename = parts[4] if len(parts) >= 5 else ""
+    return IndexEntry(parts[0].strip(), parts[1], parts[2], normalize_serial(parts[3]), filename, subject)
+
+
+class CaIndex:
+    """Seriennummer → IndexEntry, inkrementell aus index.txt nachgeladen."""
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inode = None
+        self._offset = 0
+        self._mtime_ns = None
+        self._tail = b""          # letzte vollständig gelesene Zeile (Erkennung von In-place-Änderungen)
+        self._status_map = None
+        self.version = 0          # steigt bei jeder inhaltlichen Änderung
+
+        # Kennzahlen
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    def _read_from(self, offset, reset):
+        with open(self.index_file, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Nur vollständige Zeilen übernehmen – openssl kann gerade schreiben
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return 0, reset
+        entries = {} if reset else self._entries
+        for raw in data[:end].splitlines():
+            entry = parse_line(raw.decode("utf-8", errors="replace"))
+            if entry is not None:
+                entries[entry.serial] = entry
+        self._entries = entries
+        self._tail = data[:end].splitlines(keepends=True)[-1]
+        return end, True
+
+    def _tail_unchanged(self):
+        if not self._tail:
+            return True
+        with open(self.index_file, "rb") as f:
+            f.seek(self._offset - len(self._tail))
+            return f.read(len(self._tail)) == self._tail
+
+    def refresh(self, force=False):
+        """Lädt Änderungen nach. Liefert True, wenn sich der Inhalt geändert hat."""
+        with self._lock:
+            try:
+                st = os.stat(self.index_file)
+            except FileNotFoundError:
+                changed = bool(self._entries) or self._inode is not None
+                self._entries, self._inode, self._offset, self._tail = {}, None, 0, b""
+                if changed:
+                    self._status_map = None
+                    self.version += 1
+                return changed
+
+            same_file = st.st_ino == self._inode and st.st_size >= self._offset
+            if not force and same_file and st.st_size == self._offset and st.st_mtime_ns == self._mtime_ns:
+                return False
+
+            if (not force and same_file and st.st_size > self._offset and self._tail_unchanged()):
+                consumed, changed = self._read_from(self._offset, reset=False)
+                self._offset += consumed
+                self.incremental_loads += 1
+            else:
+                self._tail = b""
+                consumed, changed = self._read_from(0, reset=True)
+                if not consumed:
+                    self._entries = {}
+                self._offset = consumed
+                self.full_loads += 1
+                changed = True
+
+            self._inode, self._mtime_ns = st.st_ino, st.st_mtime_ns
+            if changed:
+                self._status_map = None
+                self.version += 1
+            return changed
+
+    # ---------- Abfragen (jeweils mit automatischem refresh) ----------
+
+    def get(self, serial):
+        """IndexEntry zur Seriennummer oder None."""
+        self.refresh()
+        return self._entries.get(normalize_serial(serial))
+
+    def status(self, serial, default=None):
+        entry = self.get(serial)
+        return entry.status if entry else default
+
+    def status_map(self):
+        """Seriennummer → Status (V/E/R); wird nur bei Änderungen neu aufgebaut."""
+        self.refresh()
+        with self._lock:
+            if self._status_map is None:
+                self._status_map = {s: e.status for s, e in self._entries.items()}
+            return self._status_map
+
+    def entries(self):
+        """Alle Einträge (Momentaufnahme) in Dateireihenfolge."""
+        self.refresh()
+        return list(self._entries.values())
+
+    def __len__(self):
+        self.refresh()
+        return len(self._entries)
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def open_index(index_file):
+    """Prozessweit geteilte CaIndex-Instanz für eine index.txt."""
+    path = os.path.abspath(index_file)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(path)
+        if index is None:
+            index = _INDEXES[path] = CaIndex(path)
+        return index
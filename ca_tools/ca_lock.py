@@ -0,0 +1,68 @@
+"""
+Schreibsperre für die CA-Datenbank (index.txt, serial, newcerts/) und die CRL.
+
+Eine fcntl-Dateisperre (flock) auf ${CA_DIR}/.ca.lock – sie wirkt über
+Prozessgrenzen hinweg: mehrere gunicorn-Worker, CLI-Werkzeuge und die
+Shell-Skripte (flock(1) auf dieselbe Datei) schreiben nie gleichzeitig.
+Innerhalb eines Threads ist die Sperre reentrant, damit z. B. Revoke + CRL
+in einem Block laufen können; andere Threads desselben Prozesses warten, weil
+jede Sperre über einen eigenen Dateideskriptor läuft.
+
+Nur die eigentlichen Schreibschritte laufen unter der Sperre – Schlüssel-
+erzeugung, CSR und PKCS#12 laufen parallel auf allen Kernen.
+"""
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+
+LOCK_FILENAME = ".ca.lock"
+
+_held = threading.local()   # Pfad → Tiefe der im aktuellen Thread gehaltenen Sperren
+
+
+def lock_path(ca_dir):
+    return os.path.join(ca_dir, LOCK_FILENAME)
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """
+    Exklusive flock-Sperre auf path (Datei wird bei Bedarf angelegt).
+    Liefert True; mit blocking=False False, wenn die Sperre gerade woanders gehalten wird.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def ca_write_lock(ca_dir):
+    """Sperre für alle Operationen, die die CA-Datenbank oder die CRL verändern."""
+    depth = getattr(_held, "depth", None)
+    if depth is None:
+        depth = _held.depth = {}
+    path = os.path.realpath(lock_path(ca_dir))
+    if depth.get(path):
+        depth[path] += 1
+        try:
+            yield
+        finally:
+            depth[path] -= 1
+        return
+    with file_lock(path):
+        depth[path] = 1
+        try:
+            yield
+        finally:
+            del depth[path]
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+
+from ca_tools.sqlite_schema import schema_transaction
+
+# Version des Tabellenlayouts – bei Änderungen erhöhen, dann wird der Cache neu aufgebaut
+SCHEMA_VERSION = 1
+
+CACHED_FIELDS = ("cn", "serial", "created", "expire", "san")
+
+
+class CertCache:
+    """
+    Persistenter Metadaten-Cache für Zertifikatsdateien (SQLite).
+
+    Schlüssel ist (Pfad, mtime, Größe): Solange sich eine .cert.pem nicht ändert,
+    werden CN, Seriennummer, Datumswerte und SANs aus der Datenbank geliefert,
+    statt das Zertifikat erneut zu dekodieren. Der Status (V/E/R) wird bewusst
+    NICHT gespeichert, sondern beim Lesen aus index.txt ergänzt.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        # Kennzahlen
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        with self._connect() as conn:
+            self._ensure_schema(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self, conn):
+        # Versionsprüfung und Neuanlage exklusiv – sonst verwirft ein parallel startender Worker
+        # die gerade von einem anderen angelegte Tabelle
+        with schema_transaction(conn):
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS certs")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS certs (
+                    path      TEXT PRIMARY KEY,
+                    directory TEXT NOT NULL,
+                    mtime_ns  INTEGER NOT NULL,
+                    size      INTEGER NOT NULL,
+                    cn        TEXT,
+                    serial    TEXT,
+                    created   TEXT,
+                    expire    TEXT,
+                    san       TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS certs_directory ON certs (directory)")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def load_directory(self, directory):
+        """Liefert alle gespeicherten Einträge eines Verzeichnisses: Pfad → Zeile."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM certs WHERE directory = ?", (directory,)
+            ).fetchall()
+        return {row["path"]: row for row in rows}
+
+    def get(self, path, mtime_ns, size):
+        """Liefert die gespeicherten Felder einer Datei, falls mtime und Größe passen."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM certs WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (path, mtime_ns, size),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {k: row[k] for k in CACHED_FIELDS}
+
+    def record(self, hits, misses):
+        """Zählt Treffer/Fehlgriffe eines Verzeichnis-Scans (load_directory + Vergleich beim Aufrufer)."""
+        self.hits += hits
+        self.misses += misses
+
+    def update(self, directory, updates=(), removed=()):
+        """
+        Schreibt neu gelesene Einträge und löscht entfernte Pfade.
+
+        updates: Liste von (path, mtime_ns, size, info)
+        removed: Liste von Pfaden
+        """
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO certs "
+                "(path, directory, mtime_ns, size, cn, serial, created, expire, san) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (path, directory, mtime_ns, size, *(info[k] for k in CACHED_FIELDS))
+                    for path, mtime_ns, size, info in updates
+                ],
+            )
+            conn.executemany("DELETE FROM certs WHERE path = ?", [(p,) for p in removed])
+
+    def sync_directory(self, directory, updates, existing_paths):
+        """
+        Wie update(), entfernt aber zusätzlich alle Einträge des Verzeichnisses,
+        deren Datei nicht mehr in existing_paths enthalten ist.
+        """
+        stale = [p for p in self.load_directory(directory) if p not in existing_paths]
+        self.update(directory, updates, stale)
+
+    def clear(self):
+        """Leert den Cache vollständig (z. B. nach Wechsel des Parser-Backends)."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM certs")
@@ -0,0 +1,45 @@
+# Spalten der Zertifikatstabelle in der Reihenfolge von cert_list.html
+COLUMNS = ["cn", "status", "created", "expire", "serial", "san"]
+
+SEARCH_FIELDS = ("cn", "serial", "san", "created", "expire", "file")
+
+
+def _sort_key(column):
+    if column == "serial":
+        # Hex-Seriennummern numerisch sortieren (kürzer = kleiner)
+        return lambda c: (len(c.get("serial") or ""), c.get("serial") or "")
+    return lambda c: (c.get(column) or "").lower()
+
+
+def query_certificates(certs, search="", source="all", status="", order_column=2,
+                       order_dir="desc", start=0, length=10):
+    """
+    Filtert, sortiert und paginiert eine Zertifikatsliste (serverseitig für DataTables).
+
+    source: "active", "archive" oder "all"
+    status: "" (alle) oder eine Kombination aus V/E/R, z. B. "VE"
+    length: Anzahl Zeilen pro Seite, -1 = alle
+
+    Liefert (Anzahl nach Filter, Zeilen der angeforderten Seite).
+    """
+    rows = certs
+    if source in ("active", "archive"):
+        rows = [c for c in rows if c.get("source") == source]
+    if status:
+        wanted = set(status.upper())
+        rows = [c for c in rows if c.get("status") in wanted]
+
+    terms = (search or "").lower().split()
+    if terms:
+        def matches(c):
+            haystack = " ".join(str(c.get(f) or "") for f in SEARCH_FIELDS).lower()
+            return all(t in haystack for t in terms)
+        rows = [c for c in rows if matches(c)]
+
+    if 0 <= order_column < len(COLUMNS):
+        rows = sorted(rows, key=_sort_key(COLUMNS[order_column]), reverse=(order_dir == "desc"))
+
+    total = len(rows)
+    start = max(start, 0)
+    page = rows[start:] if length is None or length < 0 else rows[start:start + length]
+    return total, page
@@ -0,0 +1,374 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from ca_tools.archive_store import open_store
+from ca_tools.ca_index import open_index
+from ca_tools.list_certs import _scan_directory, make_executor, read_cert_info
+
+# --- inotify-Konstanten (linux/inotify.h) ---
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    """Lädt inotify aus der libc (nur Linux). Liefert None, wenn nicht verfügbar."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class CertInventory:
+    """
+    In-Memory-Bestand aller Zertifikate aus issued/ und issued/archive/ plus
+    Status aus index.txt. Wird vom CertWatcher inkrementell aktualisiert,
+    so dass Dashboard-Anfragen nur noch aus dem Speicher lesen.
+    """
+
+    def __init__(self, ca_dir, issued_dir, backend=None, cache=None,
+                 workers=0, executor_kind="thread", load=True):
+        self.index_file = os.path.join(ca_dir, "index.txt")
+        self.ca_dir = ca_dir
+        self.issued_dir = issued_dir
+        self.archive_dir = os.path.join(issued_dir, "archive")
+        self.backend = backend
+        self.cache = cache
+        self.workers = workers
+        self.executor_kind = executor_kind
+
+        self._lock = threading.Lock()
+        self._files = {self.issued_dir: {}, self.archive_dir: {}}  # dir → {Dateiname: info}
+        self._status_map = {}
+        self._snapshot = {}  # include_archive → fertige Liste
+        self.store = open_store(self.archive_dir)   # gepackte Archiv-Sätze
+        self._store_version = None
+        self._recorders = []  # laufende reload(): Änderungen währenddessen (für das Nachspielen)
+        self.version = 0     # steigt bei jeder Änderung des Bestands
+        if load:
+            self.reload()
+
+    # ---------- Laden ----------
+
+    def _read_index(self):
+        return open_index(self.index_file).status_map()
+
+    def _scan(self, directory, executor=None, progress=None):
+        if not os.path.isdir(directory):
+            return {}
+        return dict(_scan_directory(directory, self.backend, self.cache, executor, progress))
+
+    def _record(self, directory, names=None, index=False):
+        """Merkt Änderungen für laufende reload()-Vorgänge vor (Aufruf unter self._lock)."""
+        for recorded in self._recorders:
+            if index:
+                recorded["index"] = True
+            elif names is None:
+                recorded["rescan"].add(directory)
+            else:
+                recorded["names"].setdefault(directory, set()).update(names)
+
+    def reload(self, progress=None):
+        """
+        Liest alles vollständig neu ein (Start, inotify-Überlauf). Ereignisse, die der Watcher
+        währenddessen anwendet, würden von der älteren Momentaufnahme überschrieben – sie werden
+        deshalb mitgeschrieben und danach gegen den aktuellen Stand auf der Platte nachgespielt.
+        """
+        recorded = {"names": {}, "rescan": set(), "index": False}
+        with self._lock:
+            self._recorders.append(recorded)
+        if progress is not None:
+            progress.start()
+        executor = make_executor(self.workers, self.executor_kind)
+        try:
+            files = {d: self._scan(d, executor, progress) for d in (self.issued_dir, self.archive_dir)}
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if progress is not None:
+                progress.finish()
+        status_map = self._read_index()
+        with self._lock:
+            self._recorders.remove(recorded)
+            self._files = files
+            self._status_map = status_map
+            self._snapshot = {}
+            self.version += 1
+
+        for directory in recorded["rescan"]:
+            self.rescan_directory(directory)
+        for directory, names in recorded["names"].items():
+            if directory not in recorded["rescan"]:
+                self.apply_changes(directory, names)
+        if recorded["index"]:
+            self.reload_index()
+
+    def rescan_directory(self, directory):
+        files = self._scan(directory)
+        with self._lock:
+            self._files[directory] = files
+            self._snapshot = {}
+            self.version += 1
+            self._record(directory)
+
+    def reload_index(self):
+        status_map = self._read_index()
+        with self._lock:
+            self._status_map = status_map
+            self._snapshot = {}
+            self.version += 1
+            self._record(None, index=True)
+
+    # ---------- Einzelereignisse ----------
+
+    def _read_file(self, path):
+        """Liest eine einzelne Datei (aus dem Cache, falls unverändert). None = nicht vorhanden."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        info = self.cache.get(path, st.st_mtime_ns, st.st_size) if self.cache else None
+        if info is None:
+            info = read_cert_info(path, self.backend)
+            if self.cache is not None and info["serial"] != "unknown":
+                self.cache.update(os.path.dirname(path), [(path, st.st_mtime_ns, st.st_size, info)])
+        return info
+
+    def apply_changes(self, directory, names):
+        """
+        Übernimmt geänderte Dateinamen eines Verzeichnisses. Für jeden Namen zählt
+        nur der aktuelle Zustand auf der Platte – dadurch lassen sich beliebig viele
+        Ereignisse (create/move/delete) pro Datei zu einem Schritt zusammenfassen.
+        """
+        updated, removed = {}, []
+        for name in names:
+            if not name.endswith(".cert.pem"):
+                continue
+            info = self._read_file(os.path.join(directory, name))
+            if info is None:
+                removed.append(name)
+            else:
+                updated[name] = info
+
+        if not updated and not removed:
+            return
+        if self.cache is not None and removed:
+            self.cache.update(directory, removed=[os.path.join(directory, n) for n in removed])
+        with self._lock:
+            files = dict(self._files.get(directory, {}))
+            files.update(updated)
+            for name in removed:
+                files.pop(name, None)
+            self._files[directory] = files
+            self._snapshot = {}
+            self.version += 1
+            self._record(directory, list(updated) + removed)
+
+    # ---------- Lesen ----------
+
+    def certificates(self, include_archive=False):
+        """Liefert die Zertifikatsliste im Format von list_certificates()."""
+        # Gepackte Sätze ändern sich ohne Ereignis im Archivverzeichnis → Index-Stand prüfen
+        self.store.refresh()
+        with self._lock:
+            if self.store.version != self._store_version:
+                self._snapshot.pop(True, None)
+                self._store_version = self.store.version
+                self.version += 1
+        with self._lock:
+            snapshot = self._snapshot.get(include_archive)
+            if snapshot is not None:
+                return [dict(c) for c in snapshot]
+
+            directories = [self.issued_dir]
+            packed = []
+            if include_archive:
+                directories.append(self.archive_dir)
+                packed = self.store.certificates(self._status_map)
+            packed_names = {c["file"] for c in packed}
+            certs = []
+            for directory in directories:
+                files = self._files.get(directory, {})
+                for f in sorted(files, reverse=True):
+                    if directory == self.archive_dir and f in packed_names:
+                        continue   # gepackt (lose Datei evtl. schon gelöscht, Ereignis noch unterwegs)
+                    info = files[f]
+                    certs.append({
+                        "cn": info["cn"],
+                        "status": self._status_map.get(info["serial"], "V"),
+                        "created": info["created"],
+                        "expire": info["expire"],
+                        "serial": info["serial"] or "unknown",
+                        "san": info["san"],
+                        "file": f,
+                        "source": "archive" if directory == self.archive_dir else "active",
+                    })
+            certs.extend(packed)
+            self._snapshot[include_archive] = certs
+            return [dict(c) for c in certs]
+
+
+class CertWatcher(threading.Thread):
+    """
+    Hintergrund-Thread, der issued/, issued/archive/ und index.txt beobachtet.
+
+    mode: "auto" (inotify unter Linux, sonst Polling), "inotify" oder "poll".
+    Ereignisse werden gesammelt und erst nach einer kurzen Ruhephase (debounce)
+    bzw. spätestens nach max_delay gebündelt angewendet – so bleibt auch ein
+    Massen-Verschieben ins Archiv ein einziger Aktualisierungsschritt.
+    """
+
+    def __init__(self, inventory, mode="auto", poll_interval=5.0, debounce=0.25, max_delay=2.0):
+        super().__init__(name="cert-watcher", daemon=True)
+        self.inventory = inventory
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._stop_event = threading.Event()
+        self.backend_used = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        libc = _load_inotify() if self.mode in ("auto", "inotify") else None
+        if libc is not None:
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self.backend_used = "inotify"
+                try:
+                    self._run_inotify(libc, fd)
+                finally:
+                    os.close(fd)
+                return
+        self.backend_used = "poll"
+        self._run_poll()
+
+    # ---------- inotify ----------
+
+    def _run_inotify(self, libc, fd):
+        inv = self.inventory
+        watches = {}  # wd → Verzeichnis
+
+        def add_watch(directory):
+            if not os.path.isdir(directory):
+                return
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                watches[wd] = directory
+
+        for directory in (inv.issued_dir, inv.archive_dir, inv.ca_dir):
+            add_watch(directory)
+
+        pending = {}          # Verzeichnis → Menge geänderter Namen
+        index_changed = False
+        full_reload = False
+        first_event = None
+
+        while not self._stop_event.is_set():
+            timeout = self.debounce if first_event is not None else 1.0
+            readable, _, _ = select.select([fd], [], [], timeout)
+
+            if readable:
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    data = b""
+                offset = 0
+                while offset + _EVENT_HEADER.size <= len(data):
+                    wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                    raw_name = data[offset + _EVENT_HEADER.size: offset + _EVENT_HEADER.size + length]
+                    offset += _EVENT_HEADER.size + length
+                    name = os.fsdecode(raw_name.rstrip(b"\0"))
+                    directory = watches.get(wd)
+
+                    if mask & IN_Q_OVERFLOW:
+                        full_reload = True
+                    elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                        if directory is not None:
+                            watches.pop(wd, None)
+                            full_reload = True
+                    elif directory == inv.ca_dir:
+                        if name == "index.txt":
+                            index_changed = True
+                    elif directory is not None:
+                        if mask & IN_ISDIR:
+                            # archive/ wurde nachträglich angelegt
+                            if os.path.join(directory, name) == inv.archive_dir:
+                                add_watch(inv.archive_dir)
+                                full_reload = True
+                        else:
+                            pending.setdefault(directory, set()).add(name)
+                if first_event is None and (pending or index_changed or full_reload):
+                    first_event = time.monotonic()
+                # Weiter sammeln, solange Ereignisse eintreffen und max_delay nicht erreicht ist
+                if first_event is not None and time.monotonic() - first_event < self.max_delay:
+                    continue
+
+            if first_event is None:
+                continue
+
+            if full_reload:
+                # Watches ggf. neu setzen (z. B. archive/ neu angelegt)
+                for directory in (inv.issued_dir, inv.archive_dir):
+                    if directory not in watches.values():
+                        add_watch(directory)
+                inv.reload()
+            else:
+                for directory, names in pending.items():
+                    inv.apply_changes(directory, names)
+                if index_changed:
+                    inv.reload_index()
+
+            pending, index_changed, full_reload, first_event = {}, False, False, None
+
+    # ---------- Polling-Fallback ----------
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _run_poll(self):
+        inv = self.inventory
+        watched = (inv.issued_dir, inv.archive_dir, inv.index_file)
+        sigs = {p: self._signature(p) for p in watched}
+
+        while not self._stop_event.wait(self.poll_interval):
+            for path in watched:
+                sig = self._signature(path)
+                if sig == sigs[path]:
+                    continue
+                sigs[path] = sig
+                if path == inv.index_file:
+                    inv.reload_index()
+                else:
+                    inv.rescan_directory(path)
@@ -0,0 +1,159 @@
+"""
+In-Memory-Cache für die öffentlich verteilten CRL-Dateien (crl/ca.crl.pem, crl/ca.crl).
+
+Die Bytes werden nur neu gelesen, wenn sich Inode, mtime oder Größe der Datei
+ändern. Zu jeder Datei werden ein starkes ETag (SHA-256 des Inhalts),
+Last-Modified (thisUpdate) und nextUpdate vorgehalten; für PEM optional
+zusätzlich eine gzip-Variante. crl_response() baut daraus eine Antwort mit
+Cache-Control und beantwortet If-None-Match/If-Modified-Since mit 304.
+"""
+import gzip
+import hashlib
+import os
+import stat
+import threading
+from datetime import datetime, timezone
+
+from cryptography import x509
+from flask import Response
+from werkzeug.http import http_date, quote_etag
+
+MIMETYPES = {
+    ".pem": "application/x-pem-file",
+    ".crl": "application/pkix-crl",
+    ".der": "application/pkix-crl",
+}
+
+
+def _utc(dt):
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class CrlEntry:
+    """Geladene CRL-Datei samt Validatoren."""
+
+    def __init__(self, filename, data, signature, compress=False):
+        self.filename = filename
+        self.data = data
+        self.signature = signature
+        self.mimetype = MIMETYPES.get(os.path.splitext(filename)[1], "application/octet-stream")
+        self.etag = hashlib.sha256(data).hexdigest()[:32]
+        self.gzip_data = gzip.compress(data, mtime=0) if compress else None
+
+        self.last_update = None
+        self.next_update = None
+        try:
+            if data.lstrip().startswith(b"-----BEGIN"):
+                crl = x509.load_pem_x509_crl(data)
+            else:
+                crl = x509.load_der_x509_crl(data)
+            self.last_update = _utc(getattr(crl, "last_update_utc", None) or crl.last_update)
+            next_update = getattr(crl, "next_update_utc", None) or crl.next_update
+            self.next_update = _utc(next_update) if next_update else None
+        except ValueError:
+            # Keine gültige CRL (z. B. andere Datei im crl/-Verzeichnis) → Validatoren nur aus Datei
+            pass
+        if self.last_update is None:
+            self.last_update = datetime.fromtimestamp(signature[1] / 1e9, tz=timezone.utc)
+
+        # Feste Header je Kodierung (ETag pro Kodierung, damit Caches die Varianten nicht verwechseln)
+        common = [("Last-Modified", http_date(self.last_update))]
+        if self.next_update is not None:
+            common.append(("Expires", http_date(self.next_update)))
+        if self.gzip_data is not None:
+            common.append(("Vary", "Accept-Encoding"))
+        self.headers = common + [("ETag", quote_etag(self.etag))]
+        self.headers_gzip = common + [("ETag", quote_etag(self.etag + "-gz")), ("Content-Encoding", "gzip")]
+
+    def max_age(self, cap=None, now=None):
+        """Sekunden bis nextUpdate (höchstens cap), mindestens 0."""
+        if self.next_update is None:
+            return cap or 0
+        now = now or datetime.now(timezone.utc)
+        seconds = max(0, int((self.next_update - now).total_seconds()))
+        return min(seconds, cap) if cap else seconds
+
+
+class CrlCache:
+    """
+    Hält die Dateien aus <CA_DIR>/crl im Speicher; pro Anfrage nur ein stat().
+    """
+
+    def __init__(self, crl_dir, compress_pem=True):
+        self.crl_dir = crl_dir
+        self.compress_pem = compress_pem
+        self._lock = threading.Lock()
+        self._entries = {}
+
+        # Kennzahlen
+        self.hits = 0
+        self.reloads = 0
+
+    @staticmethod
+    def _signature(st):
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def get(self, filename):
+        """CrlEntry für einen Dateinamen in crl/ oder None (auch bei ungültigen Namen)."""
+        if not filename or filename != os.path.basename(filename) or filename.startswith("."):
+            return None
+        path = os.path.join(self.crl_dir, filename)
+        try:
+            sig = self._signature(os.stat(path))
+        except (FileNotFoundError, NotADirectoryError):
+            with self._lock:
+                self._entries.pop(filename, None)
+            return None
+
+        entry = self._entries.get(filename)
+        if entry is not None and entry.signature == sig:
+            self.hits += 1
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and entry.signature == sig:
+                return entry
+            try:
+                with open(path, "rb") as f:
+                    # Signatur von genau der geöffneten Datei – wird sie währenddessen per rename
+                    # ersetzt, passen Daten und Signatur trotzdem zusammen
+                    st = os.fstat(f.fileno())
+                    if not stat.S_ISREG(st.st_mode):
+                        return None
+                    data = f.read()
+            except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+                self._entries.pop(filename, None)
+                return None
+            sig = self._signature(st)
+            entry = CrlEntry(filename, data, sig, compress=self.compress_pem and filename.endswith(".pem"))
+            self._entries[filename] = entry
+            self.reloads += 1
+            return entry
+
+
+def crl_response(entry, request, max_age_cap=None):
+    """
+    HTTP-Antwort für eine CRL: starkes ETag, Last-Modified, Expires/Cache-Control
+    aus nextUpdate, 304 bei passenden Validatoren, gzip für PEM falls vom Client akzeptiert.
+    Header werden pro Eintrag vorberechnet; pro Anfrage ändert sich nur max-age.
+    """
+    use_gzip = entry.gzip_data is not None and "gzip" in request.accept_encodings
+    etag = entry.etag + ("-gz" if use_gzip else "")
+
+    headers = list(entry.headers_gzip if use_gzip else entry.headers)
+    headers.append(("Cache-Control", f"public, max-age={entry.max_age(max_age_cap)}"))
+
+    # If-None-Match hat Vorrang vor If-Modified-Since (RFC 9110, 13.2.2)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since:
+        not_modified = entry.last_update.replace(microsecond=0) <= request.if_modified_since
+    else:
+        not_modified = False
+    if not_modified:
+        return Response(status=304, headers=headers)
+
+    data = entry.gzip_data if use_gzip else entry.data
+    headers.append(("Content-Length", str(len(data))))
+    return Response(data, mimetype=entry.mimetype, headers=headers)
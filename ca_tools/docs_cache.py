@@ -0,0 +1,102 @@
+"""
+Cache für die Markdown-Dokumentation (DOCS_DIR).
+
+- Menü (Liste der *.md) wird nur neu aufgebaut, wenn sich die mtime des
+  Verzeichnisses ändert (Datei hinzugefügt, gelöscht, umbenannt).
+- Gerendertes HTML wird pro Datei gehalten, Schlüssel (mtime, Größe); bei
+  Änderung der Datei wird automatisch neu gerendert.
+- markdown2 wird erst beim ersten Rendern importiert, damit Start und
+  Dashboard die Importkosten nicht tragen.
+"""
+import hashlib
+import os
+import threading
+
+# ✔ Markdown2 mit Extras: fenced code blocks, Tabellen etc.
+MD_EXTRAS = [
+    "fenced-code-blocks",   # ```bash ... ```
+    "tables",               # GitHub-Style Tabellen
+    "code-friendly",        # weniger aggressives Emphasis-Verhalten
+    "strike",               # ~~durchgestrichen~~
+    "smarty-pants",         # “Smart Quotes”, optionale Typografie
+    "cuddled-lists",        # Listen ohne Leerzeile
+]
+
+
+def doc_title(stem):
+    return stem.replace("_", " ").capitalize()
+
+
+class RenderedDoc:
+    def __init__(self, doc_id, html, signature):
+        self.doc_id = doc_id
+        self.title = doc_title(doc_id)
+        self.html = html
+        self.signature = signature
+        self.etag = hashlib.sha256(html.encode("utf-8")).hexdigest()[:32]
+
+
+class DocsCache:
+    def __init__(self, docs_dir):
+        self.docs_dir = docs_dir
+        self._lock = threading.Lock()
+        self._menu = []
+        self._menu_sig = None
+        self._docs = {}
+
+        # Kennzahlen
+        self.renders = 0
+        self.hits = 0
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def menu(self):
+        """Liste der Dokumente (id, title, filename), sortiert nach Dateiname."""
+        sig = self._signature(self.docs_dir)
+        if sig == self._menu_sig:
+            return self._menu
+        with self._lock:
+            docs = []
+            if sig is not None:
+                for name in sorted(os.listdir(self.docs_dir)):
+                    if name.endswith(".md") and os.path.isfile(os.path.join(self.docs_dir, name)):
+                        stem = name[:-3]
+                        docs.append({"id": stem, "title": doc_title(stem), "filename": name})
+            self._menu, self._menu_sig = docs, sig
+            return docs
+
+    def path(self, doc_id):
+        """Pfad zur Markdown-Datei oder None (auch bei ungültiger ID)."""
+        if not doc_id or doc_id != os.path.basename(doc_id) or doc_id.startswith("."):
+            return None
+        path = os.path.join(self.docs_dir, f"{doc_id}.md")
+        return path if os.path.isfile(path) else None
+
+    def get(self, doc_id):
+        """RenderedDoc (aus dem Cache, falls die Datei unverändert ist) oder None."""
+        path = self.path(doc_id)
+        sig = self._signature(path) if path else None
+        if sig is None:
+            self._docs.pop(doc_id, None)
+            return None
+
+        doc = self._docs.get(doc_id)
+        if doc is not None and doc.signature == sig:
+            self.hits += 1
+            return doc
+
+        import markdown2  # erst beim ersten Rendern laden
+
+        with open(path, encoding="utf-8") as f:
+            html = markdown2.markdown(f.read(), extras=MD_EXTRAS)
+        doc = RenderedDoc(doc_id, html, sig)
+        with self._lock:
+            self._docs[doc_id] = doc
+        self.renders += 1
+        return doc
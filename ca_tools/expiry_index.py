@@ -0,0 +1,146 @@
+"""
+Ablauf-Index über notAfter aus index.txt.
+
+Hält alle nicht widerrufenen Einträge des geteilten CaIndex nach Ablaufzeit
+sortiert (zwei parallele Listen: Zeitstempel und IndexEntry). Abfragen wie
+"läuft in N Tagen ab", "bereits abgelaufen" oder "die nächsten K" sind damit
+eine binäre Suche plus das Kopieren des Ergebnisses – ohne Zertifikatsdateien
+zu öffnen und ohne openssl.
+
+Neu sortiert wird nur, wenn sich index.txt geändert hat (CaIndex.version);
+bereits umgerechnete Ablaufzeiten werden pro Seriennummer wiederverwendet.
+"""
+import bisect
+import calendar
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def index_time_to_epoch(value):
+    """ASN.1-Zeit aus index.txt (YYMMDDHHMMSSZ oder YYYYMMDDHHMMSSZ) → Unix-Zeit; None bei Fehlern."""
+    try:
+        if len(value) == 13:
+            year = int(value[0:2])
+            year += 2000 if year < 50 else 1900   # RFC 5280: UTCTime 50–99 = 19xx
+            rest = value[2:]
+        elif len(value) == 15:
+            year = int(value[0:4])
+            rest = value[4:]
+        else:
+            return None
+        return calendar.timegm((year, int(rest[0:2]), int(rest[2:4]),
+                                int(rest[4:6]), int(rest[6:8]), int(rest[8:10]), 0, 0, 0))
+    except ValueError:
+        return None
+
+
+def subject_cn(subject):
+    """CN aus einem openssl-Subject ("/C=DE/O=…/CN=host") oder der ganze String ohne CN."""
+    for part in reversed(subject.split("/")):
+        if part.startswith("CN="):
+            return part[3:]
+    return subject
+
+
+class ExpiryIndex:
+    """Sortierte Sicht (Ablaufzeit, Eintrag) auf einen CaIndex; widerrufene Zertifikate sind ausgenommen."""
+
+    def __init__(self, ca_index):
+        self.index = ca_index
+        self._lock = threading.Lock()
+        self._version = None
+        self._epochs = {}      # Seriennummer → (expires-String, Unix-Zeit)
+        # (Ablaufzeiten aufsteigend, IndexEntry in derselben Reihenfolge) – als ein Tupel in einem
+        # Schritt ersetzt, damit Leser ohne Sperre nie neue Schlüssel mit alten Einträgen mischen
+        self._snapshot_data = ([], [])
+
+        # Kennzahlen
+        self.rebuilds = 0
+
+    def _refresh(self):
+        self.index.refresh()
+        if self.index.version == self._version:
+            return
+        with self._lock:
+            version = self.index.version
+            if version == self._version:
+                return
+            epochs = {}
+            pairs = []
+            for entry in self.index.entries():
+                if entry.status == "R":
+                    continue
+                known = self._epochs.get(entry.serial)
+                if known is not None and known[0] == entry.expires:
+                    epoch = known[1]
+                else:
+                    epoch = index_time_to_epoch(entry.expires)
+                    if epoch is None:
+                        continue
+                epochs[entry.serial] = (entry.expires, epoch)
+                pairs.append((epoch, entry.serial, entry))
+            pairs.sort(key=lambda p: (p[0], p[1]))
+            self._epochs = epochs
+            self._snapshot_data = ([p[0] for p in pairs], [p[2] for p in pairs])
+            self._version = version
+            self.rebuilds += 1
+
+    def _snapshot(self):
+        self._refresh()
+        return self._snapshot_data
+
+    # ---------- Abfragen ----------
+
+    def expiring_within(self, days, now=None, limit=None):
+        """Gültige Zertifikate mit Ablauf in [jetzt, jetzt + days], früheste zuerst."""
+        now = time.time() if now is None else now
+        keys, entries = self._snapshot()
+        lo = bisect.bisect_left(keys, now)
+        hi = bisect.bisect_right(keys, now + days * 86400)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return entries[lo:hi]
+
+    def expired(self, now=None):
+        """Bereits abgelaufene (nicht widerrufene) Zertifikate, zuletzt abgelaufene zuerst."""
+        now = time.time() if now is None else now
+        keys, entries = self._snapshot()
+        return entries[:bisect.bisect_left(keys, now)][::-1]
+
+    def next_to_expire(self, k, now=None):
+        """Die nächsten k Zertifikate, die ablaufen werden (k=None: alle noch gültigen)."""
+        now = time.time() if now is None else now
+        keys, entries = self._snapshot()
+        lo = bisect.bisect_left(keys, now)
+        return entries[lo:] if k is None else entries[lo:lo + k]
+
+    def counts(self, windows=(7, 30, 90), now=None):
+        """Anzahl abgelaufener und in den jeweiligen Fenstern (Tage) ablaufender Zertifikate – nur binäre Suche."""
+        now = time.time() if now is None else now
+        keys, _ = self._snapshot()
+        lo = bisect.bisect_left(keys, now)
+        result = {"expired": lo, "valid": len(keys) - lo}
+        for days in windows:
+            result[str(days)] = bisect.bisect_right(keys, now + days * 86400) - lo
+        return result
+
+    def epoch(self, serial):
+        """Ablaufzeit (Unix-Zeit) einer Seriennummer aus dem Index oder None."""
+        self._refresh()
+        known = self._epochs.get(serial)
+        return known[1] if known else None
+
+
+def describe(entry, epoch, now=None, file=None):
+    """IndexEntry → dict für die JSON-API (Ablauf im Format der Zertifikatsliste)."""
+    now = time.time() if now is None else now
+    return {
+        "serial": entry.serial,
+        "cn": subject_cn(entry.subject),
+        "subject": entry.subject,
+        "status": entry.status,
+        "expire": datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M"),
+        "days_left": int((epoch - now) // 86400),
+        "file": file,
+    }
@@ -0,0 +1,384 @@
+"""
+Native Ausstellung von Server-Zertifikaten (ohne issue_server_cert.sh).
+
+Erzeugt dieselben Artefakte wie das Skript –
+<CN>__<STAMP>.{key,csr,cert,fullchain}.pem und .p12 (Passwort = YYYYMMDD) –
+mit denselben v3_server-Erweiterungen und SAN-Deduplizierung. index.txt,
+serial und newcerts/ werden so geschrieben, wie `openssl ca` es tut, so dass
+Skripte und Web-App weiterhin gemischt verwendet werden können.
+
+Der CA-Schlüssel wird pro Prozess nur einmal geladen und entschlüsselt.
+"""
+import argparse
+import ipaddress
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed448, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+from ca_tools.ca_lock import ca_write_lock
+
+_CA_CACHE = {}
+_CA_CACHE_LOCK = threading.Lock()
+
+
+class IssueError(Exception):
+    """Fehler bei der nativen Zertifikatsausstellung."""
+
+
+# ---------- Hilfsfunktionen --------------------------------------------------
+
+def make_basename(cn, stamp):
+    """
+    Dateiname-Basis wie im Skript: `echo "$CN" | tr -c '[:alnum:].-' '_'`
+    ersetzt jedes andere Byte (inkl. des Zeilenumbruchs von echo) durch '_',
+    daher endet der CN-Teil immer mit '_' und es folgt '_<STAMP>'.
+    """
+    raw = (cn + "\n").encode("utf-8")
+    cleaned = "".join(
+        chr(b) if (chr(b).isascii() and chr(b).isalnum()) or chr(b) in ".-" else "_"
+        for b in raw
+    )
+    return f"{cleaned}_{stamp}"
+
+
+def dedupe_dns(cn, dns_list):
+    """CN immer als DNS-SAN, Duplikate entfernt und sortiert (wie `sort -u`)."""
+    return sorted({d for d in [cn, *dns_list] if d})
+
+
+def format_serial(serial):
+    """Seriennummer als Hex mit gerader Stellenzahl (wie openssl in index.txt/serial)."""
+    h = format(serial, "X")
+    return "0" + h if len(h) % 2 else h
+
+
+def format_index_time(dt):
+    """ASN.1-Zeit für index.txt: UTCTime bis 2049, danach GeneralizedTime."""
+    dt = dt.astimezone(timezone.utc)
+    if dt.year < 2050:
+        return dt.strftime("%y%m%d%H%M%SZ")
+    return dt.strftime("%Y%m%d%H%M%SZ")
+
+
+def _write_atomic(path, data, mode=None):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    if mode is not None:
+        os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+
+def _replace_with_backup(path, data):
+    """Schreibt wie openssl: <file>.new → <file>, alte Version bleibt als <file>.old."""
+    new_path = path + ".new"
+    with open(new_path, "wb") as f:
+        f.write(data)
+    if os.path.exists(path):
+        os.replace(path, path + ".old")
+    os.replace(new_path, path)
+
+
+# ---------- CA laden (einmal pro Prozess) -----------------------------------
+
+def load_ca(ca_dir, pass_file=None):
+    """
+    Lädt CA-Zertifikat und entschlüsselten CA-Schlüssel. Das Ergebnis wird
+    pro Prozess zwischengespeichert und nur bei geänderten Dateien neu geladen.
+    """
+    cert_file = os.path.join(ca_dir, "certs", "ca.cert.pem")
+    key_file = os.path.join(ca_dir, "private", "ca.key.pem")
+    pass_file = pass_file or os.path.join(ca_dir, "private", "ca.pass")
+
+    try:
+        sig = (os.path.getmtime(cert_file), os.path.getmtime(key_file))
+    except FileNotFoundError as e:
+        raise IssueError(f"CA-Datei nicht gefunden: {e.filename}")
+
+    with _CA_CACHE_LOCK:
+        cached = _CA_CACHE.get(ca_dir)
+        if cached and cached["sig"] == sig:
+            return cached
+
+        with open(cert_file, "rb") as f:
+            ca_cert_pem = f.read()
+        ca_cert = x509.load_pem_x509_certificate(ca_cert_pem)
+
+        password = None
+        if os.path.exists(pass_file):
+            with open(pass_file, "rb") as f:
+                # openssl -passin file: liest nur die erste Zeile
+                password = f.read().splitlines()[0] if os.path.getsize(pass_file) else b""
+        with open(key_file, "rb") as f:
+            try:
+                ca_key = serialization.load_pem_private_key(f.read(), password=password)
+            except (TypeError, ValueError) as e:
+                raise IssueError(f"CA-Schlüssel konnte nicht geladen werden: {e}")
+
+        cached = {"sig": sig, "cert": ca_cert, "cert_pem": ca_cert_pem, "key": ca_key}
+        _CA_CACHE[ca_dir] = cached
+        return cached
+
+
+# ---------- Schlüssel / CSR --------------------------------------------------
+
+def generate_key(algo="rsa", bits=4096):
+    algo = (algo or "rsa").lower()
+    if algo == "rsa":
+        return rsa.generate_private_key(public_exponent=65537, key_size=int(bits))
+    if algo == "ed25519":
+        return ed25519.Ed25519PrivateKey.generate()
+    if algo == "ed448":
+        return ed448.Ed448PrivateKey.generate()
+    raise IssueError(f"Nicht unterstützter Schlüsselalgorithmus: {algo}")
+
+
+def load_pool_key(key_file, pass_file=None):
+    """Lädt einen (verschlüsselten) Schlüssel aus dem Key-Pool."""
+    password = None
+    if pass_file:
+        with open(pass_file, "rb") as f:
+            password = f.read().splitlines()[0]
+    with open(key_file, "rb") as f:
+        return serialization.load_pem_private_key(f.read(), password=password)
+
+
+def _hash_for(key):
+    # Ed25519/Ed448 signieren ohne separaten Hash
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed448.Ed448PrivateKey)):
+        return None
+    return hashes.SHA256()
+
+
+def build_csr(key, cn):
+    return (
+        x509.CertificateSigningRequestBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)]))
+        .sign(key, _hash_for(key))
+    )
+
+
+# ---------- Signieren --------------------------------------------------------
+
+def _v3_server_extensions(builder, csr, ca_cert, dns_names, ip_addrs):
+    """Entspricht der [v3_server]-Sektion, die issue_server_cert.sh als extfile schreibt."""
+    builder = (
+        builder
+        .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=False)
+        .add_extension(x509.KeyUsage(
+            digital_signature=True, content_commitment=False, key_encipherment=True,
+            data_encipherment=False, key_agreement=False, key_cert_sign=False,
+            crl_sign=False, encipher_only=False, decipher_only=False,
+        ), critical=True)
+        .add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.SERVER_AUTH]), critical=False)
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(csr.public_key()), critical=False)
+    )
+    try:
+        ca_ski = ca_cert.extensions.get_extension_for_class(x509.SubjectKeyIdentifier).value
+        aki = x509.AuthorityKeyIdentifier.from_issuer_subject_key_identifier(ca_ski)
+    except x509.ExtensionNotFound:
+        aki = x509.AuthorityKeyIdentifier.from_issuer_public_key(ca_cert.public_key())
+    builder = builder.add_extension(aki, critical=False)
+
+    names = [x509.DNSName(d) for d in dns_names]
+    names += [x509.IPAddress(ipaddress.ip_address(ip)) for ip in ip_addrs]
+    return builder.add_extension(x509.SubjectAlternativeName(names), critical=False)
+
+
+def sign_csr(csr, ca_dir, days, dns_names, ip_addrs, pass_file=None):
+    """
+    Signiert einen CSR mit der CA und aktualisiert serial, index.txt und newcerts/
+    kompatibel zu `openssl ca`. Läuft unter der CA-Schreibsperre.
+    """
+    ca = load_ca(ca_dir, pass_file)
+    serial_file = os.path.join(ca_dir, "serial")
+    index_file = os.path.join(ca_dir, "index.txt")
+    newcerts_dir = os.path.join(ca_dir, "newcerts")
+
+    # policy_loose + preserve=no: openssl ca übernimmt nur den CN ins Subject
+    cn = csr.subject.get_attributes_for_oid(NameOID.COMMON_NAME)[0].value
+
+    with ca_write_lock(ca_dir):
+        with open(serial_file, "r") as f:
+            serial = int(f.read().strip(), 16)
+
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        not_after = now + timedelta(days=int(days))
+        builder = (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)]))
+            .issuer_name(ca["cert"].subject)
+            .public_key(csr.public_key())
+            .serial_number(serial)
+            .not_valid_before(now)
+            .not_valid_after(not_after)
+        )
+        builder = _v3_server_extensions(builder, csr, ca["cert"], dns_names, ip_addrs)
+        cert = builder.sign(ca["key"], _hash_for(ca["key"]))
+        cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+
+        serial_hex = format_serial(serial)
+        line = f"V\t{format_index_time(not_after)}\t\t{serial_hex}\tunknown\t/CN={cn}\n"
+
+        os.makedirs(newcerts_dir, exist_ok=True)
+        _write_atomic(os.path.join(newcerts_dir, f"{serial_hex}.pem"), cert_pem)
+
+        existing = b""
+        if os.path.exists(index_file):
+            with open(index_file, "rb") as f:
+                existing = f.read()
+        _replace_with_backup(index_file, existing + line.encode("utf-8"))
+        attr_file = index_file + ".attr"
+        if not os.path.exists(attr_file):
+            _replace_with_backup(attr_file, b"unique_subject = no\n")
+        _replace_with_backup(serial_file, (format_serial(serial + 1) + "\n").encode())
+
+    return cert, cert_pem, serial_hex
+
+
+# ---------- Gesamter Ablauf --------------------------------------------------
+
+def normalize_sans(cn, dns_list=(), ip_list=()):
+    """Bereitet DNS-/IP-SANs wie das Skript auf und prüft die IP-Adressen."""
+    dns_names = dedupe_dns(cn, [d.strip() for d in dns_list])
+    ip_addrs = [i.strip() for i in ip_list if i and i.strip()]
+    for ip in ip_addrs:
+        try:
+            ipaddress.ip_address(ip)
+        except ValueError:
+            raise IssueError(f"Ungültige IP-Adresse: {ip}")
+    return dns_names, ip_addrs
+
+
+def artifact_paths(issued_dir, basename):
+    return {
+        "key": os.path.join(issued_dir, f"{basename}.key.pem"),
+        "csr": os.path.join(issued_dir, f"{basename}.csr.pem"),
+        "cert": os.path.join(issued_dir, f"{basename}.cert.pem"),
+        "fullchain": os.path.join(issued_dir, f"{basename}.fullchain.pem"),
+        "p12": os.path.join(issued_dir, f"{basename}.p12"),
+    }
+
+
+def private_key_pem(key):
+    """Unverschlüsselter PKCS#8-Schlüssel wie von `openssl genpkey`."""
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def package_artifacts(paths, key, cert, cert_pem, ca_cert, ca_cert_pem, cn, datepass):
+    """Schreibt Zertifikat, Fullchain und PKCS#12 (Passwort = YYYYMMDD)."""
+    _write_atomic(paths["cert"], cert_pem)
+    _write_atomic(paths["fullchain"], cert_pem + ca_cert_pem)
+    p12 = pkcs12.serialize_key_and_certificates(
+        cn.encode("utf-8"), key, cert, [ca_cert],
+        serialization.BestAvailableEncryption(datepass.encode()),
+    )
+    _write_atomic(paths["p12"], p12)
+
+
+def issue_certificate(cn, dns_list=(), ip_list=(), ca_dir=None, issued_dir=None, days=825,
+                      key_algo="rsa", key_bits=4096, pool_key=None, pool_pass_file=None,
+                      pass_file=None):
+    """
+    Stellt ein Server-Zertifikat im Prozess aus.
+
+    Liefert dict mit Pfaden (key, csr, cert, fullchain, p12), serial, p12_pass,
+    basename und timings (Sekunden je Schritt).
+    """
+    cn = (cn or "").strip()
+    if not cn:
+        raise IssueError("Common Name (CN) darf nicht leer sein!")
+    dns_names, ip_addrs = normalize_sans(cn, dns_list, ip_list)
+
+    timings = {}
+    t0 = time.perf_counter()
+    os.makedirs(issued_dir, exist_ok=True)
+
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    datepass = stamp[:8]  # p12-Passwort = YYYYMMDD
+    basename = make_basename(cn, stamp)
+    paths = artifact_paths(issued_dir, basename)
+
+    # === Schlüssel ===
+    if pool_key:
+        key = load_pool_key(pool_key, pool_pass_file)
+    else:
+        key = generate_key(key_algo, key_bits)
+    _write_atomic(paths["key"], private_key_pem(key), mode=0o600)
+    if pool_key and os.path.exists(pool_key):
+        os.remove(pool_key)
+    timings["key"] = time.perf_counter() - t0
+
+    # === CSR ===
+    t = time.perf_counter()
+    csr = build_csr(key, cn)
+    _write_atomic(paths["csr"], csr.public_bytes(serialization.Encoding.PEM))
+    timings["csr"] = time.perf_counter() - t
+
+    # === Signieren (serialisiert) ===
+    t = time.perf_counter()
+    cert, cert_pem, serial_hex = sign_csr(csr, ca_dir, days, dns_names, ip_addrs, pass_file)
+    timings["sign"] = time.perf_counter() - t
+
+    # === Zertifikat, Fullchain + PKCS#12 ===
+    t = time.perf_counter()
+    ca = load_ca(ca_dir, pass_file)
+    package_artifacts(paths, key, cert, cert_pem, ca["cert"], ca["cert_pem"], cn, datepass)
+    timings["package"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - t0
+
+    return dict(paths=paths, serial=serial_hex, p12_pass=datepass, basename=basename, timings=timings)
+
+
+def format_result(result):
+    """Ausgabe im Stil von issue_server_cert.sh (für Logs und CLI)."""
+    p = result["paths"]
+    return "\n".join([
+        "==> Fertig.",
+        f"Key:        {p['key']}",
+        f"CSR:        {p['csr']}",
+        f"Cert:       {p['cert']}",
+        f"Fullchain:  {p['fullchain']}",
+        f"P12:        {p['p12']}",
+        f"P12-Pass:   {result['p12_pass']}",
+        f"Serial:     {result['serial']}",
+        f"Dauer:      {result['timings']['total'] * 1000:.0f} ms",
+    ])
+
+
+def main(argv=None):
+    """CLI analog zu issue_server_cert.sh: python -m ca_tools.issuer -c <CN> [-d ...] [-i ...]"""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Server-Zertifikat nativ (ohne openssl-Subprozesse) ausstellen")
+    parser.add_argument("-c", dest="cn", required=True, help="Common Name")
+    parser.add_argument("-d", dest="dns", action="append", default=[], help="DNS-SAN (mehrfach)")
+    parser.add_argument("-i", dest="ips", action="append", default=[], help="IP-SAN (mehrfach)")
+    parser.add_argument("-D", dest="days", type=int, default=Config.CERT_DAYS, help="Gültigkeit in Tagen")
+    parser.add_argument("-o", dest="outdir", default=Config.ISSUED_DIR, help="Ausgabeverzeichnis")
+    parser.add_argument("-k", dest="bits", type=int, default=Config.CERT_KEY_BITS, help="Schlüssellänge (RSA)")
+    args = parser.parse_args(argv)
+
+    try:
+        result = issue_certificate(args.cn, args.dns, args.ips, ca_dir=Config.CA_DIR, issued_dir=args.outdir,
+                                   days=args.days, key_algo=Config.CERT_KEY_ALGO, key_bits=args.bits)
+    except (IssueError, OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    print(format_result(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
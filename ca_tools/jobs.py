@@ -0,0 +1,257 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from ca_tools.sqlite_schema import add_column, schema_transaction
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+SCHEMA_VERSION = 2
+
+
+class JobError(Exception):
+    """Erwarteter Fehler einer Operation – die Meldung wird dem Benutzer angezeigt."""
+
+
+class JobQueue:
+    """
+    Lokale Job-Queue für CA-Operationen (create/renew/revoke …).
+
+    - begrenzter Worker-Pool (ThreadPoolExecutor), kein externer Broker
+    - Zustand und Log jedes Jobs persistent in SQLite
+    - nach einem Neustart werden wartende Jobs erneut eingereiht; Jobs, die beim
+      Absturz liefen, werden als fehlgeschlagen markiert (keine Doppel-Ausstellung)
+    - mehrere Worker-Prozesse teilen sich die Datenbank: ein Job wird atomar
+      übernommen (queued → running) und trägt seinen Prozess (runner); beim Start
+      eines Workers gelten nur Jobs toter Prozesse als abgebrochen
+    - ausgeführt wird nur in dem Prozess, der start() aufruft (Leader); alle anderen
+      reihen nur ein, der Leader holt neue Jobs per Abfrage (poll_interval) ab
+
+    Handler werden per register(kind, func) bekannt gemacht; func(params, log)
+    liefert eine Erfolgsmeldung oder wirft JobError.
+    """
+
+    def __init__(self, db_file, workers=2, poll_interval=1.0):
+        self.db_file = db_file
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._executor = None       # erst mit start() – ohne führt dieser Prozess keine Jobs aus
+        self._scheduled = set()     # lokal eingeplante Job-IDs (nicht doppelt einplanen)
+        self._stop = threading.Event()
+        self._poll_thread = None
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        with self._connect() as conn:
+            self._ensure_schema(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self, conn):
+        # Alle Worker legen die Tabelle beim Import an – nacheinander, siehe sqlite_schema
+        with schema_transaction(conn):
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id       TEXT PRIMARY KEY,
+                    kind     TEXT NOT NULL,
+                    label    TEXT,
+                    params   TEXT NOT NULL,
+                    state    TEXT NOT NULL,
+                    message  TEXT,
+                    log      TEXT NOT NULL DEFAULT '',
+                    created  REAL NOT NULL,
+                    started  REAL,
+                    finished REAL,
+                    runner   TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created)")
+            add_column(conn, "jobs", "runner", "TEXT")   # Schema 1 → 2
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def register(self, kind, func):
+        self._handlers[kind] = func
+
+    def start(self):
+        """Ausführung in diesem Prozess starten: Neustart-Aufräumen, danach neue Jobs regelmäßig abholen."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ca-job")
+            self.resume()
+            self._poll_thread = threading.Thread(target=self._poll, name="ca-job-poll", daemon=True)
+            self._poll_thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self._schedule_queued()
+            except sqlite3.Error:
+                pass   # z. B. Datenbank kurz gesperrt – beim nächsten Durchlauf erneut
+
+    def _schedule_queued(self):
+        with self._connect() as conn:
+            queued = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE state = ? ORDER BY created", (STATE_QUEUED,)
+            )]
+        for job_id in queued:
+            self._schedule(job_id)
+        return len(queued)
+
+    def _schedule(self, job_id):
+        if self._executor is None:
+            return
+        with self._lock:
+            if job_id in self._scheduled:
+                return
+            self._scheduled.add(job_id)
+        self._executor.submit(self._run_scheduled, job_id)
+
+    def _run_scheduled(self, job_id):
+        try:
+            self._run(job_id)
+        finally:
+            with self._lock:
+                self._scheduled.discard(job_id)
+
+    @staticmethod
+    def _runner_id():
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def _runner_alive(runner):
+        """Läuft der Prozess (runner = "host:pid") noch? Fremde Hosts gelten als lebendig."""
+        host, _, pid = (runner or "").rpartition(":")
+        if not pid.isdigit() or host != socket.gethostname():
+            return bool(runner)
+        pid = int(pid)
+        if pid == os.getpid():
+            return False   # alte PID eines abgestürzten Vorgängers, die jetzt dieser Prozess trägt
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def resume(self):
+        """
+        Nach einem (Neu-)Start: Jobs abgestürzter Prozesse als abgebrochen markieren,
+        wartende erneut einreihen. Jobs, die ein anderer Worker gerade ausführt, bleiben unberührt.
+        """
+        with self._lock, self._connect() as conn:
+            orphaned = [row["id"] for row in conn.execute(
+                "SELECT id, runner FROM jobs WHERE state = ?", (STATE_RUNNING,)
+            ) if not self._runner_alive(row["runner"])]
+            conn.executemany(
+                "UPDATE jobs SET state = ?, message = ?, finished = ? WHERE id = ? AND state = ?",
+                [(STATE_FAILED, "Abgebrochen (Neustart während der Ausführung)", time.time(), job_id, STATE_RUNNING)
+                 for job_id in orphaned],
+            )
+        return self._schedule_queued()
+
+    # ---------- Einreihen / Ausführen ----------
+
+    def submit(self, kind, params, label=""):
+        """Reiht einen Job ein und liefert seine ID (kehrt sofort zurück)."""
+        if kind not in self._handlers:
+            raise ValueError(f"Unbekannter Job-Typ: {kind}")
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, label, params, state, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, label, json.dumps(params), STATE_QUEUED, time.time()),
+            )
+        self._schedule(job_id)   # im Leader sofort, sonst beim nächsten Abholen durch den Leader
+        return job_id
+
+    def _append_log(self, job_id, text):
+        if not text:
+            return
+        if not text.endswith("\n"):
+            text += "\n"
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET log = log || ? WHERE id = ?", (text, job_id))
+
+    def _set_state(self, job_id, state, message=None, **times):
+        fields = ["state = ?"]
+        values = [state]
+        if message is not None:
+            fields.append("message = ?")
+            values.append(message)
+        for name, value in times.items():
+            fields.append(f"{name} = ?")
+            values.append(value)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(fields)} WHERE id = ?", (*values, job_id))
+
+    def _claim(self, job_id):
+        """queued → running, atomar über alle Prozesse; False, wenn ein anderer Worker schneller war."""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET state = ?, started = ?, runner = ? WHERE id = ? AND state = ?",
+                (STATE_RUNNING, time.time(), self._runner_id(), job_id, STATE_QUEUED),
+            ).rowcount == 1
+
+    def _run(self, job_id):
+        if not self._claim(job_id):
+            return
+        job = self.get(job_id)
+        handler = self._handlers.get(job["kind"])
+
+        def log(text):
+            self._append_log(job_id, text)
+
+        try:
+            if handler is None:
+                raise JobError(f"Kein Handler für Job-Typ {job['kind']}")
+            message = handler(job["params"], log)
+            self._set_state(job_id, STATE_DONE, message or "Erledigt", finished=time.time())
+        except JobError as e:
+            self._set_state(job_id, STATE_FAILED, str(e), finished=time.time())
+        except Exception as e:  # unerwartete Fehler ebenfalls im Job festhalten
+            log(f"Unerwarteter Fehler: {e!r}")
+            self._set_state(job_id, STATE_FAILED, f"Unerwarteter Fehler: {e}", finished=time.time())
+
+    # ---------- Abfragen ----------
+
+    @staticmethod
+    def _row_to_dict(row):
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        end = job["finished"] or time.time()
+        job["duration"] = round(end - job["started"], 2) if job["started"] else None
+        return job
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list(self, limit=100):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, kind, label, params, state, message, created, started, finished, runner "
+                "FROM jobs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._row_to_dict(r) for r in rows]
+
+    def active_count(self):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", (STATE_QUEUED, STATE_RUNNING)
+            ).fetchone()[0]
@@ -0,0 +1,192 @@
+import os
+import secrets
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class KeyPool:
+    """
+    Pool vorab erzeugter privater Schlüssel für die Zertifikatsausstellung.
+
+    Ein Hintergrund-Thread hält den Pool für den konfigurierten Algorithmus
+    (CERT_KEY_ALGO/CERT_KEY_BITS) auf Zieltiefe. Die Schlüssel liegen AES-256
+    verschlüsselt (Passphrase in <pool_dir>/.pool.pass) mit Rechten 0600 im
+    Pool-Verzeichnis. take() entnimmt einen Schlüssel per atomarem rename –
+    dadurch auch mit mehreren Worker-Prozessen sicher.
+    """
+
+    def __init__(self, pool_dir, algo="rsa", bits=4096, target=5):
+        self.algo = algo.lower()
+        self.bits = int(bits)
+        self.target = int(target)
+        suffix = f"{self.algo}-{self.bits}" if self.algo == "rsa" else self.algo
+        self.pool_dir = os.path.join(pool_dir, suffix)
+        self.pass_file = os.path.join(pool_dir, ".pool.pass")
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Kennzahlen
+        self.generated_total = 0
+        self.taken_total = 0
+        self.misses_total = 0
+        self.failures_total = 0
+        self.last_generation_seconds = None
+        self._generated_at = deque(maxlen=100)  # Zeitstempel der letzten Erzeugungen
+
+        # Rechte explizit setzen – die prozessweite umask bleibt unberührt (andere Threads schreiben parallel)
+        os.makedirs(self.pool_dir, mode=0o700, exist_ok=True)
+        os.chmod(pool_dir, 0o700)
+        os.chmod(self.pool_dir, 0o700)
+        if not os.path.exists(self.pass_file):
+            self._create_pass_file()
+        os.chmod(self.pass_file, 0o600)
+
+    def _create_pass_file(self):
+        """
+        Passphrase vollständig in eine eigene Datei schreiben und per link() veröffentlichen –
+        starten mehrere Worker gleichzeitig, gewinnt einer, und keiner sieht eine leere Datei.
+        """
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.pass_file), prefix=".pool.pass.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:     # mkstemp legt mit 0600 an
+                f.write(secrets.token_urlsafe(32) + "\n")
+            try:
+                os.link(tmp, self.pass_file)
+            except FileExistsError:
+                pass   # anderer Prozess war schneller – dessen Passphrase gilt
+        finally:
+            os.remove(tmp)
+
+    def _cleanup_stale(self, max_age=3600):
+        """Entfernt Reste abgebrochener Erzeugungen/Entnahmen (.tmp/.claimed) nach einem Absturz."""
+        now = time.time()
+        for name in os.listdir(self.pool_dir):
+            if not name.endswith((".tmp", ".claimed")):
+                continue
+            path = os.path.join(self.pool_dir, name)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # ---------- Pool-Inhalt ----------
+
+    def _ready_keys(self):
+        try:
+            names = [n for n in os.listdir(self.pool_dir) if n.endswith(".key.pem")]
+        except FileNotFoundError:
+            return []
+        return sorted(names)
+
+    def level(self):
+        """Anzahl verfügbarer Schlüssel im Pool."""
+        return len(self._ready_keys())
+
+    def _generate_one(self):
+        """Erzeugt einen verschlüsselten Schlüssel (zuerst als .tmp, dann atomar umbenannt)."""
+        name = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex}"
+        tmp_path = os.path.join(self.pool_dir, name + ".tmp")
+        final_path = os.path.join(self.pool_dir, name + ".key.pem")
+
+        cmd = ["openssl", "genpkey"]
+        if self.algo == "rsa":
+            cmd += ["-algorithm", "RSA", "-pkeyopt", f"rsa_keygen_bits:{self.bits}"]
+        else:
+            cmd += ["-algorithm", self.algo]
+        cmd += ["-aes256", "-pass", f"file:{self.pass_file}", "-out", tmp_path]
+
+        started = time.monotonic()
+        try:
+            # umask nur für den openssl-Kindprozess: die Datei entsteht direkt mit 0600
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, umask=0o077)
+            os.chmod(tmp_path, 0o600)
+            os.rename(tmp_path, final_path)
+        except (subprocess.CalledProcessError, OSError):
+            with self._lock:
+                self.failures_total += 1
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        with self._lock:
+            self.generated_total += 1
+            self.last_generation_seconds = time.monotonic() - started
+            self._generated_at.append(time.time())
+        return True
+
+    def take(self):
+        """
+        Entnimmt einen Schlüssel aus dem Pool.
+        Liefert den Pfad einer verschlüsselten Schlüsseldatei (gehört ab jetzt dem
+        Aufrufer, der sie nach Gebrauch löscht) oder None, wenn der Pool leer ist.
+        """
+        for name in self._ready_keys():
+            src = os.path.join(self.pool_dir, name)
+            claimed = os.path.join(self.pool_dir, name[:-len(".key.pem")] + ".claimed")
+            try:
+                os.rename(src, claimed)
+            except FileNotFoundError:
+                continue  # bereits von einem anderen Prozess entnommen
+            with self._lock:
+                self.taken_total += 1
+            self._wakeup.set()
+            return claimed
+
+        with self._lock:
+            self.misses_total += 1
+        self._wakeup.set()
+        return None
+
+    # ---------- Hintergrund-Auffüllung ----------
+
+    def _run(self):
+        while not self._stop.is_set():
+            while self.level() < self.target and not self._stop.is_set():
+                if not self._generate_one():
+                    break  # bei Fehler nicht in einer Schleife hängen
+            self._wakeup.wait(timeout=30)
+            self._wakeup.clear()
+
+    def start(self):
+        """Startet den Auffüll-Thread (idempotent) – nur im Leader, daher räumt auch nur er auf."""
+        if self._thread is None or not self._thread.is_alive():
+            self._cleanup_stale()
+            self._thread = threading.Thread(target=self._run, name="key-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def metrics(self):
+        """Füllstand und Auffüllrate für Monitoring/API."""
+        now = time.time()
+        with self._lock:
+            recent = [t for t in self._generated_at if now - t <= 3600]
+            if len(recent) >= 2:
+                span = max(recent[-1] - recent[0], 1e-6)
+                rate = (len(recent) - 1) / span * 60.0
+            else:
+                rate = 0.0
+            return {
+                "algo": self.algo,
+                "bits": self.bits if self.algo == "rsa" else None,
+                "level": self.level(),
+                "target": self.target,
+                "generated_total": self.generated_total,
+                "taken_total": self.taken_total,
+                "misses_total": self.misses_total,
+                "failures_total": self.failures_total,
+                "refill_rate_per_min": round(rate, 2),
+                "last_generation_seconds": (round(self.last_generation_seconds, 3)
+                                            if self.last_generation_seconds is not None else None),
+            }
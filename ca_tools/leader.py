@@ -0,0 +1,57 @@
+"""
+Leader-Wahl zwischen mehreren Prozessen derselben Installation (z. B. gunicorn-Worker).
+
+Hintergrunddienste wie Kaltstart-Scan, Watcher, Key-Pool-Auffüllung, Job-Ausführung
+und automatische Erneuerung sollen genau einmal laufen. Der erste Prozess, der die
+flock-Sperre auf lock_file bekommt, hält sie bis zu seinem Ende und startet die
+Dienste; alle anderen versuchen es in regelmäßigen Abständen erneut. Stirbt der
+Leader (Absturz, Neustart, gunicorn-Reload), gibt der Kernel die Sperre frei und
+ein anderer Prozess übernimmt.
+"""
+import fcntl
+import os
+import threading
+
+
+class LeaderElection:
+    """Dateisperre als Leader-Wahl; on_elected() läuft genau einmal, sobald dieser Prozess gewählt ist."""
+
+    def __init__(self, lock_file, on_elected, retry_interval=10.0):
+        self.lock_file = lock_file
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._fd = None
+        self._stop = threading.Event()
+
+    def _try_acquire(self):
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # Deskriptor bleibt bis zum Prozessende offen – solange gilt die Sperre
+        self._fd = fd
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self.is_leader = True
+        return True
+
+    def start(self):
+        """Sofort einmal versuchen; sonst im Hintergrund weiter, bis die Sperre frei wird."""
+        os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+        if self._try_acquire():
+            self.on_elected()
+        else:
+            threading.Thread(target=self._retry, name="leader-election", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _retry(self):
+        while not self._stop.wait(self.retry_interval):
+            if self._try_acquire():
+                self.on_elected()
+                return
@@ -1,9 +1,295 @@
 import os
 import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from itertools import repeat
 
-def list_certificates(ca_dir, issued_dir, include_archive=False):
+from ca_tools.archive_store import open_store
+from ca_tools.ca_index import open_index
+from ca_tools.cert_cache import CACHED_FIELDS
+
+# Optional: cryptography für das Parsen im Prozess (ein Lesezugriff pro Zertifikat).
+# Ist das Paket nicht installiert, wird automatisch auf openssl-Subprozesse zurückgefallen.
+try:
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    x509 = None
+
+BACKEND_CRYPTOGRAPHY = "cryptography"
+BACKEND_OPENSSL = "openssl"
+
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def default_backend():
+    """Liefert das bevorzugte Parser-Backend (cryptography, falls installiert)."""
+    return BACKEND_CRYPTOGRAPHY if x509 is not None else BACKEND_OPENSSL
+
+
+def _empty_cert_info():
+    return {
+        "cn": "unknown",
+        "serial": "unknown",
+        "created": "unbekannt",
+        "expire": "unbekannt",
+        "san": "",
+    }
+
+
+def _format_general_name(name):
+    """Formatiert einen SAN-Eintrag so, wie ihn openssl ausgibt (z. B. 'DNS:host')."""
+    if isinstance(name, x509.DNSName):
+        return f"DNS:{name.value}"
+    if isinstance(name, x509.IPAddress):
+        return f"IP Address:{name.value}"
+    if isinstance(name, x509.RFC822Name):
+        return f"email:{name.value}"
+    if isinstance(name, x509.UniformResourceIdentifier):
+        return f"URI:{name.value}"
+    return str(name.value)
+
+
+def _read_cert_cryptography(cert_path):
+    """Liest alle benötigten Felder mit einem einzigen Dateizugriff über cryptography."""
+    info = _empty_cert_info()
+    try:
+        with open(cert_path, "rb") as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+    except (OSError, ValueError):
+        info["san"] = "(Fehler beim Lesen des Zertifikats)"
+        return info
+
+    # === Subject / CN ===
+    cn_attrs = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+    if cn_attrs:
+        info["cn"] = str(cn_attrs[-1].value).strip()
+
+    # === Seriennummer (hex, ohne führende Nullen, Großbuchstaben) ===
+    info["serial"] = format(cert.serial_number, "X")
+
+    # === notBefore / notAfter ===
+    # cryptography >= 42 bietet timezone-aware Varianten, ältere Versionen nur naive UTC
+    not_before = getattr(cert, "not_valid_before_utc", None) or cert.not_valid_before
+    not_after = getattr(cert, "not_valid_after_utc", None) or cert.not_valid_after
+    info["created"] = not_before.strftime(DATE_FORMAT)
+    info["expire"] = not_after.strftime(DATE_FORMAT)
+
+    # === SANs (subjectAltName) ===
+    try:
+        san_ext = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName)
+        info["san"] = ", ".join(_format_general_name(n) for n in san_ext.value)
+    except x509.ExtensionNotFound:
+        info["san"] = "(keine SANs)"
+
+    return info
+
+
+def _read_cert_openssl(cert_path):
+    """Fallback: liest die Felder über einzelne openssl-x509-Aufrufe."""
+    info = _empty_cert_info()
+
+    try:
+        # === Subject / CN ===
+        subj = subprocess.check_output(
+            ["openssl", "x509", "-in", cert_path, "-noout", "-subject"],
+            text=True
+        ).strip()
+        match = re.search(r"CN\s*=?\s*([^/]+)", subj)
+        if match:
+            info["cn"] = match.group(1).strip()
+
+        # === Seriennummer ===
+        info["serial"] = subprocess.check_output(
+            ["openssl", "x509", "-in", cert_path, "-noout", "-serial"],
+            text=True
+        ).strip().replace("serial=", "").lstrip("0").upper()
+
+        # === Erstellungsdatum (notBefore) ===
+        nb_raw = subprocess.check_output(
+            ["openssl", "x509", "-in", cert_path, "-noout", "-startdate"],
+            text=True
+        ).strip().replace("notBefore=", "")
+        try:
+            nb_dt = datetime.strptime(nb_raw, "%b %d %H:%M:%S %Y GMT")
+            info["created"] = nb_dt.strftime(DATE_FORMAT)
+        except ValueError:
+            info["created"] = nb_raw
+
+        # === Ablaufdatum (notAfter) ===
+        na_raw = subprocess.check_output(
+            ["openssl", "x509", "-in", cert_path, "-noout", "-enddate"],
+            text=True
+        ).strip().replace("notAfter=", "")
+        try:
+            na_dt = datetime.strptime(na_raw, "%b %d %H:%M:%S %Y GMT")
+            info["expire"] = na_dt.strftime(DATE_FORMAT)
+        except ValueError:
+            info["expire"] = na_raw
+
+        # === SANs (subjectAltName) ===
+        try:
+            san_output = subprocess.check_output(
+                ["openssl", "x509", "-in", cert_path, "-noout", "-ext", "subjectAltName"],
+                text=True
+            )
+            san_raw = san_output.replace("X509v3 Subject Alternative Name:", "").replace("\n", "")
+            info["san"] = ", ".join(p.strip() for p in san_raw.split(",") if p.strip())
+        except subprocess.CalledProcessError:
+            info["san"] = "(keine SANs)"
+
+    except subprocess.CalledProcessError:
+        info["san"] = "(Fehler beim Lesen des Zertifikats)"
+
+    return info
+
+
+def read_cert_info(cert_path, backend=None):
+    """
+    Liest CN, Seriennummer, notBefore, notAfter und SANs eines Zertifikats.
+
+    backend: "cryptography" (Standard, ein Lesezugriff im Prozess) oder
+             "openssl" (fünf openssl-x509-Aufrufe, wie bisher).
+    """
+    backend = backend or default_backend()
+    if backend == BACKEND_CRYPTOGRAPHY and x509 is not None:
+        return _read_cert_cryptography(cert_path)
+    if backend not in (BACKEND_CRYPTOGRAPHY, BACKEND_OPENSSL):
+        raise ValueError(f"Unbekanntes Parser-Backend: {backend}")
+    return _read_cert_openssl(cert_path)
+
+
+class ScanProgress:
+    """
+    Fortschritt eines (Kaltstart-)Scans, threadsicher abfragbar.
+    total wächst je Verzeichnis um die Anzahl der zu lesenden Zertifikate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+        self.total = 0
+        self.done = 0
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        with self._lock:
+            self.running = True
+            self.total = 0
+            self.done = 0
+            self.started = time.time()
+            self.finished = None
+
+    def add_total(self, n):
+        with self._lock:
+            self.total += n
+
+    def advance(self, n=1):
+        with self._lock:
+            self.done += n
+
+    def finish(self):
+        with self._lock:
+            self.running = False
+            self.finished = time.time()
+
+    def as_dict(self):
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                "running": self.running,
+                "total": self.total,
+                "done": self.done,
+                "percent": round(100.0 * self.done / self.total, 1) if self.total else (0.0 if self.running else 100.0),
+                "elapsed": round(end - self.started, 2) if self.started else 0.0,
+            }
+
+
+def make_executor(workers, kind="thread"):
+    """Erzeugt einen Thread- oder Prozess-Pool für das Parsen (None bei workers <= 1)."""
+    if not workers or workers <= 1:
+        return None
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind != "thread":
+        raise ValueError(f"Unbekannter Pool-Typ: {kind}")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cert-scan")
+
+
+def _unchanged(path, st):
+    try:
+        now = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return (now.st_ino, now.st_mtime_ns, now.st_size) == (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _scan_directory(directory, backend=None, cache=None, executor=None, progress=None):
+    """
+    Liest alle .cert.pem eines Verzeichnisses (absteigend sortiert) und liefert
+    Liste von (Dateiname, info). Mit Cache werden nur neue/geänderte Dateien
+    dekodiert; alle anderen kommen aus dem Metadaten-Cache. Mit executor werden
+    die zu lesenden Dateien parallel dekodiert, die Reihenfolge bleibt erhalten.
+    """
+    cached = cache.load_directory(directory) if cache is not None else {}
+    existing = set()
+    results = []
+    misses = []  # (Position in results, Pfad, stat)
+
+    entries = sorted(
+        (e for e in os.scandir(directory) if e.name.endswith(".cert.pem")),
+        key=lambda e: e.name,
+        reverse=True,
+    )
+    for entry in entries:
+        st = None
+        if cache is not None:
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue  # zwischenzeitlich verschoben/gelöscht
+            existing.add(entry.path)
+            row = cached.get(entry.path)
+            if row is not None and row["mtime_ns"] == st.st_mtime_ns and row["size"] == st.st_size:
+                results.append((entry.name, {k: row[k] for k in CACHED_FIELDS}))
+                continue
+
+        misses.append((len(results), entry.path, st))
+        results.append((entry.name, None))
+
+    if cache is not None:
+        cache.record(len(results) - len(misses), len(misses))
+    if progress is not None:
+        progress.add_total(len(misses))
+
+    paths = [path for _, path, _ in misses]
+    if executor is not None and len(paths) > 1:
+        parsed = executor.map(read_cert_info, paths, repeat(backend), chunksize=16)
+    else:
+        parsed = (read_cert_info(path, backend) for path in paths)
+
+    updates = []
+    for (pos, path, st), info in zip(misses, parsed):
+        results[pos] = (results[pos][0], info)
+        # Fehlerhafte/halb geschriebene Dateien nicht cachen – auch nicht, wenn sich die Datei
+        # während des Lesens geändert hat (dann gehört info nicht zu mtime/Größe aus st)
+        if cache is not None and info["serial"] != "unknown" and _unchanged(path, st):
+            updates.append((path, st.st_mtime_ns, st.st_size, info))
+        if progress is not None:
+            progress.advance()
+
+    if cache is not None and (updates or set(cached) - existing):
+        cache.sync_directory(directory, updates, existing)
+
+    return results
+
+
+def list_certificates(ca_dir, issued_dir, include_archive=False, backend=None, cache=None,
+                      workers=0, executor_kind="thread", progress=None):
     """
     Liest Zertifikate aus dem issued-Verzeichnis (und optional dem Archiv)
     und liefert folgende Daten:
@@ -13,20 +299,15 @@ def list_certificates(ca_dir, issued_dir, include_archive=False):
       - Erstellungsdatum (notBefore)
       - Ablaufdatum (notAfter)
       - SANs (subjectAltName)
+
+    backend: siehe read_cert_info() – "cryptography" oder "openssl".
+    cache:   optionaler CertCache; unveränderte Dateien werden dann nicht neu gelesen.
+    workers: > 1 verteilt das Parsen auf einen Pool ("thread" oder "process"),
+             die Sortierung je Verzeichnis bleibt unverändert.
+    progress: optionales ScanProgress-Objekt für Fortschrittsanzeigen.
     """
-    index_file = os.path.join(ca_dir, "index.txt")
-    status_map = {}
-
-    # 🔹 Status aus index.txt einlesen (Serial → Status)
-    if os.path.exists(index_file):
-        with open(index_file, "r") as f:
-            for line in f:
-                parts = line.strip().split("\t")
-                if len(parts) >= 4:
-                    serial = parts[3].strip()
-                    status = parts[0].strip()
-                    if serial and status:
-                        status_map[serial.lstrip("0").upper()] = status
+    # 🔹 Status aus index.txt (Serial → Status, geteilter inkrementeller Parser)
+    status_map = open_index(os.path.join(ca_dir, "index.txt")).status_map()
 
     # 🔹 optional auch archivierte Zertifikate mit einbeziehen
     directories = [issued_dir]
@@ -35,88 +316,42 @@ def list_certificates(ca_dir, issued_dir, include_archive=False):
         directories.append(archive_dir)
 
     certs = []
+    scanned = []
 
-    for directory in directories:
-        for f in sorted(os.listdir(directory), reverse=True):
-            if not f.endswith(".cert.pem"):
-                continue
-
-            cert_path = os.path.join(directory, f)
-            cn = "unknown"
-            serial = "unknown"
-            not_before = "unbekannt"
-            not_after = "unbekannt"
-            san_text = ""
-            status = "unknown"
-
-            try:
-                # === Subject / CN ===
-                subj = subprocess.check_output(
-                    ["openssl", "x509", "-in", cert_path, "-noout", "-subject"],
-                    text=True
-                ).strip()
-                match = re.search(r"CN\s*=?\s*([^/]+)", subj)
-                if match:
-                    cn = match.group(1).strip()
-
-                # === Seriennummer ===
-                serial = subprocess.check_output(
-                    ["openssl", "x509", "-in", cert_path, "-noout", "-serial"],
-                    text=True
-                ).strip().replace("serial=", "").lstrip("0").upper()
-
-                # === Erstellungsdatum (notBefore) ===
-                nb_raw = subprocess.check_output(
-                    ["openssl", "x509", "-in", cert_path, "-noout", "-startdate"],
-                    text=True
-                ).strip().replace("notBefore=", "")
-                try:
-                    nb_dt = datetime.strptime(nb_raw, "%b %d %H:%M:%S %Y GMT")
-                    not_before = nb_dt.strftime("%Y-%m-%d %H:%M")
-                except ValueError:
-                    not_before = nb_raw
-
-                # === Ablaufdatum (notAfter) ===
-                na_raw = subprocess.check_output(
-                    ["openssl", "x509", "-in", cert_path, "-noout", "-enddate"],
-                    text=True
-                ).strip().replace("notAfter=", "")
-                try:
-                    na_dt = datetime.strptime(na_raw, "%b %d %H:%M:%S %Y GMT")
-                    not_after = na_dt.strftime("%Y-%m-%d %H:%M")
-                except ValueError:
-                    not_after = na_raw
-
-                # === SANs (subjectAltName) ===
-                try:
-                    san_output = subprocess.check_output(
-                        ["openssl", "x509", "-in", cert_path, "-noout", "-ext", "subjectAltName"],
-                        text=True
-                    )
-                    san_text = (
-                        san_output.replace("X509v3 Subject Alternative Name:", "")
-                        .replace("\n", "")
-                        .replace(",", ", ")
-                        .strip()
-                    )
-                except subprocess.CalledProcessError:
-                    san_text = "(keine SANs)"
-
-            except subprocess.CalledProcessError:
-                san_text = "(Fehler beim Lesen des Zertifikats)"
+    if progress is not None:
+        progress.start()
+    executor = make_executor(workers, executor_kind)
+    try:
+        for directory in directories:
+            scanned.append((directory, _scan_directory(directory, backend, cache, executor, progress)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if progress is not None:
+            progress.finish()
 
+    for directory, entries in scanned:
+        for f, info in entries:
             # === Status bestimmen ===
-            status = status_map.get(serial, "V")
+            status = status_map.get(info["serial"], "V")
 
             certs.append({
-                "cn": cn,
+                "cn": info["cn"],
                 "status": status,
-                "created": not_before,
-                "expire": not_after,
-                "serial": serial or "unknown",
-                "san": san_text,
+                "created": info["created"],
+                "expire": info["expire"],
+                "serial": info["serial"] or "unknown",
+                "san": info["san"],
                 "file": f,
                 "source": "archive" if directory == archive_dir else "active"
             })
 
-    return certs
\ No newline at end of file
+    # 🔹 gepackte Archiv-Sätze nur aus dem Segment-Index (ohne Dekodieren)
+    #    (gepackt gewinnt, falls ein Satz nach einem Abbruch noch zusätzlich lose vorliegt)
+    if include_archive:
+        packed = open_store(archive_dir).certificates(status_map)
+        if packed:
+            names = {c["file"] for c in packed}
+            certs = [c for c in certs if c["source"] != "archive" or c["file"] not in names] + packed
+
+    return certs
@@ -0,0 +1,497 @@
+"""
+Laufzeit-Kennzahlen im Prometheus-Textformat (/metrics).
+
+- Latenz-Histogramme pro Route (Flask-Endpunkt + Methode) und Anfragen pro Statuscode
+- Anzahl und Dauer aller Subprozesse, getaggt nach Befehl
+  ("openssl x509", "openssl ca", "issue_script", …)
+- Treffer/Fehlgriffe der Caches (über registrierte Collector-Funktionen)
+- Zähler für Ausstellungen und Widerrufe
+- optional ein Log für langsame Anfragen inkl. der darin verbrauchten Subprozess-Zeit
+
+Ohne METRICS_ENABLED wird nichts davon installiert: keine Request-Hooks und
+kein Wrapper um subprocess.run – die Anwendung läuft wie bisher.
+
+Subprozesse in einem ProcessPoolExecutor (SCAN_EXECUTOR=process) laufen in
+eigenen Prozessen und werden daher nicht mitgezählt.
+
+Mehrere Worker-Prozesse (gunicorn): mit MultiprocessStore schreibt jeder Prozess
+seine Zähler und Histogramme alle paar Sekunden nach <METRICS_DIR>/<pid>.json;
+/metrics summiert beim Abruf alle Dateien, egal welcher Worker antwortet. Dateien
+beendeter Prozesse werden in dead.json zusammengefasst, damit Zähler nicht
+zurückspringen. Werte, die Objekte selbst zählen (Collector: Caches, Key-Pool …),
+sind je Prozess verschieden und erscheinen mit Label pid – nur für laufende Prozesse.
+"""
+import atexit
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+from ca_tools.ca_lock import file_lock
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+DEFAULT_FLUSH_INTERVAL = 5.0   # Sekunden zwischen zwei Schreibvorgängen je Prozess
+DEAD_FILE = "dead.json"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_INF_LABEL = 'le="+Inf"'
+
+logger = logging.getLogger("ca_tools.metrics")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def snapshot(self):
+        """Labels → Wert (Kopie, für den gemeinsamen Speicher)."""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(total, values):
+        for labels, value in values.items():
+            total[labels] = total.get(labels, 0) + value
+
+    def render(self, values=None):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        items = sorted((self.snapshot() if values is None else values).items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}   # Labels → [Zähler je Bucket…, Summe, Anzahl]
+
+    def observe(self, seconds, *labels):
+        n = len(self.buckets)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * n + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            series[n] += seconds
+            series[n + 1] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def snapshot(self):
+        """Labels → [Zähler je Bucket…, Summe, Anzahl] (Kopie, für den gemeinsamen Speicher)."""
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+    @staticmethod
+    def merge(total, values):
+        for labels, series in values.items():
+            current = total.get(labels)
+            if current is None:
+                total[labels] = list(series)
+            elif len(current) == len(series):   # andere Bucket-Grenzen (ältere Version) → verwerfen
+                total[labels] = [a + b for a, b in zip(current, series)]
+
+    def render(self, values=None):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        n = len(self.buckets)
+        items = sorted((self.snapshot() if values is None else values).items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                le = 'le="%s"' % _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, _INF_LABEL)} {series[n + 1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[n]!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[n + 1]}"
+
+
+class Registry:
+    """Sammlung von Zählern/Histogrammen plus Collector-Funktionen, die beim Abruf gelesen werden."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """
+        Registriert eine Funktion, die beim Abruf [(name, typ, hilfe, [(labels-dict, wert), …]), …]
+        liefert – für Kennzahlen, die die Objekte ohnehin selbst zählen (Caches, Key-Pool …).
+        """
+        self._collectors.append(func)
+        return func
+
+    def snapshot(self):
+        """Zähler und Histogramme als JSON-taugliches dict: Name → [[Labels, Wert], …]."""
+        return {metric.name: [[list(labels), value] for labels, value in metric.snapshot().items()]
+                for metric in self._metrics}
+
+    def collect(self):
+        """Ergebnisse aller Collector-Funktionen (defekte werden übersprungen)."""
+        collected = []
+        for func in self._collectors:
+            try:
+                collected.extend(func())
+            except Exception:  # ein defekter Collector darf /metrics nicht unbrauchbar machen
+                logger.exception("Collector %r fehlgeschlagen", func)
+        return collected
+
+    def render(self, store=None):
+        """
+        Textformat für /metrics. Mit store (MultiprocessStore) werden Zähler/Histogramme über
+        alle Prozesse summiert und Collector-Werte je laufendem Prozess mit Label pid ausgegeben.
+        """
+        others = store.read_others() if store is not None else []
+        lines = []
+        for metric in self._metrics:
+            values = metric.snapshot()
+            for data in others:
+                metric.merge(values, {tuple(labels): value
+                                      for labels, value in data.get("metrics", {}).get(metric.name, [])})
+            lines.extend(metric.render(values))
+
+        sources = [(os.getpid() if store is not None else None, self.collect())]
+        sources += [(data["pid"], data.get("collected", [])) for data in others if data.get("pid")]
+        families = {}
+        for pid, collected in sources:
+            for name, kind, documentation, samples in collected:
+                family = families.setdefault(name, (kind, documentation, []))
+                if pid is None:
+                    family[2].extend(samples)
+                else:
+                    family[2].extend((dict(labels, pid=str(pid)), value) for labels, value in samples)
+        for name, (kind, documentation, samples) in families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                names = sorted(labels)
+                lines.append(f"{name}{_format_labels(names, [labels[n] for n in names])} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiprocessStore:
+    """
+    Gemeinsamer Kennzahlen-Speicher mehrerer Prozesse: je Prozess eine JSON-Datei
+    (<pid>.json, atomar per rename ersetzt), summiert beim Abruf.
+    """
+
+    def __init__(self, directory, registry, interval=DEFAULT_FLUSH_INTERVAL):
+        self.directory = directory
+        self.registry = registry
+        self.interval = interval
+        self.pid = os.getpid()
+        self.file = os.path.join(directory, f"{self.pid}.json")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        # Datei eines früheren Prozesses mit derselben PID zuerst sichern, sonst überschreibt sie der erste flush
+        self._compact(force_own=True)
+        self.flush()
+        self._thread = threading.Thread(target=self._loop, name="metrics-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Kennzahlen konnten nicht geschrieben werden")
+
+    def flush(self):
+        data = {"pid": self.pid, "updated": time.time(), "metrics": self.registry.snapshot(),
+                "collected": self.registry.collect()}
+        _write_json(self.file, data)
+        self._compact()
+
+    def read_others(self):
+        """Daten aller anderen Prozesse (inkl. dead.json); Collector-Werte nur von laufenden Prozessen."""
+        others = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json") or name == os.path.basename(self.file):
+                continue
+            data = _read_json(os.path.join(self.directory, name))
+            if data is None:
+                continue
+            if data.get("pid") and not _pid_alive(data["pid"]):
+                data = dict(data, collected=[], pid=None)
+            others.append(data)
+        return others
+
+    def _compact(self, force_own=False):
+        """Dateien beendeter Prozesse in dead.json aufsummieren (nur Zähler/Histogramme)."""
+        with file_lock(os.path.join(self.directory, ".lock"), blocking=force_own) as locked:
+            if not locked:
+                return   # ein anderer Prozess räumt gerade auf
+            stale = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json") or name == DEAD_FILE:
+                    continue
+                try:
+                    pid = int(name[:-len(".json")])
+                except ValueError:
+                    continue
+                if (pid == self.pid and force_own) or (pid != self.pid and not _pid_alive(pid)):
+                    stale.append(os.path.join(self.directory, name))
+            if not stale:
+                return
+            dead_file = os.path.join(self.directory, DEAD_FILE)
+            dead = _read_json(dead_file) or {"metrics": {}}
+            metrics = {metric.name: metric for metric in self.registry._metrics}
+            for path in stale:
+                data = _read_json(path) or {}
+                for name, samples in data.get("metrics", {}).items():
+                    metric = metrics.get(name)
+                    if metric is None:
+                        continue
+                    total = {tuple(labels): value for labels, value in dead["metrics"].get(name, [])}
+                    metric.merge(total, {tuple(labels): value for labels, value in samples})
+                    dead["metrics"][name] = [[list(labels), value] for labels, value in total.items()]
+            _write_json(dead_file, dead)
+            for path in stale:
+                os.remove(path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+# ---------- Subprozesse ----------
+
+def command_tag(cmd, issue_script=None):
+    """
+    Kurzname eines Befehls für die Kennzahlen: "openssl <Unterbefehl>", "issue_script"
+    für das Ausstellungsskript, sonst der Programmname (bzw. Skriptname bei bash/sh).
+    """
+    if isinstance(cmd, (str, bytes)):
+        args = os.fsdecode(cmd).split()
+    else:
+        args = [os.fsdecode(a) for a in cmd]
+    if not args:
+        return "unknown"
+    program = os.path.basename(args[0])
+    if program in ("bash", "sh") and len(args) > 1:
+        args = args[1:]
+        program = os.path.basename(args[0])
+    if program == "openssl":
+        return f"openssl {args[1]}" if len(args) > 1 else "openssl"
+    if (issue_script and os.path.basename(issue_script) == program) or program == "issue_server_cert.sh":
+        return "issue_script"
+    return program
+
+
+_request_local = threading.local()
+_original_run = None
+
+
+def _subprocess_seconds():
+    """Für die laufende Anfrage verbrauchte Subprozess-Zeit (Sekunden, Anzahl) oder None."""
+    return getattr(_request_local, "subprocess", None)
+
+
+def install_subprocess_hook(metrics, issue_script=None):
+    """
+    Ersetzt subprocess.run durch eine zeitmessende Variante. Da subprocess.check_output
+    intern run() aufruft, sind auch diese Aufrufe erfasst. Mehrfacher Aufruf ist harmlos.
+    """
+    global _original_run
+    if _original_run is not None:
+        return
+    _original_run = original = subprocess.run
+
+    def run(*popenargs, **kwargs):
+        cmd = popenargs[0] if popenargs else kwargs.get("args", ())
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = original(*popenargs, **kwargs)
+            outcome = "ok" if result.returncode == 0 else "failed"
+            return result
+        except subprocess.CalledProcessError:
+            outcome = "failed"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            tag = command_tag(cmd, issue_script)
+            metrics.subprocess_seconds.observe(elapsed, tag)
+            metrics.subprocess_total.inc(tag, outcome)
+            acc = _subprocess_seconds()
+            if acc is not None:
+                acc[0] += elapsed
+                acc[1] += 1
+
+    subprocess.run = run
+
+
+# ---------- Anwendungs-Kennzahlen ----------
+
+class AppMetrics:
+    """Alle Kennzahlen der Web-Anwendung; install() hängt sich in Flask und subprocess ein."""
+
+    def __init__(self, slow_request_ms=0, shared_dir=None):
+        self.slow_request_ms = slow_request_ms
+        self.registry = Registry()
+        # Mehrere Worker: gemeinsamer Speicher, sonst zählt jeder Prozess für sich
+        self.store = MultiprocessStore(shared_dir, self.registry) if shared_dir else None
+        r = self.registry
+        self.request_seconds = r.histogram(
+            "ca_http_request_duration_seconds", "Bearbeitungszeit pro Route", ("endpoint", "method"))
+        self.requests_total = r.counter(
+            "ca_http_requests_total", "Anfragen pro Route und Statuscode", ("endpoint", "method", "status"))
+        self.slow_requests_total = r.counter(
+            "ca_http_slow_requests_total", "Anfragen über METRICS_SLOW_REQUEST_MS", ("endpoint",))
+        self.subprocess_seconds = r.histogram(
+            "ca_subprocess_duration_seconds", "Laufzeit externer Befehle", ("command",))
+        self.subprocess_total = r.counter(
+            "ca_subprocess_total", "Externe Befehle nach Ergebnis (ok/failed/error)", ("command", "outcome"))
+        self.issued_total = r.counter(
+            "ca_certificates_issued_total", "Ausstellungen nach Weg und Ergebnis", ("source", "outcome"))
+        self.revoked_total = r.counter(
+            "ca_certificates_revoked_total", "Widerrufene Seriennummern nach Ergebnis", ("outcome",))
+        self.operation_seconds = r.histogram(
+            "ca_operation_duration_seconds", "Dauer von create/renew/revoke (direkt oder als Job)",
+            ("operation", "outcome"))
+        self.started = time.time()
+
+    def collector(self, func):
+        return self.registry.collector(func)
+
+    def render(self):
+        return self.registry.render(self.store)
+
+    def install(self, app, issue_script=None):
+        """Request-Hooks registrieren, subprocess.run instrumentieren und den gemeinsamen Speicher starten."""
+        from flask import request
+
+        install_subprocess_hook(self, issue_script)
+        if self.store is not None:
+            self.store.start()
+
+        @app.before_request
+        def _metrics_start():
+            _request_local.started = time.perf_counter()
+            _request_local.subprocess = [0.0, 0]
+
+        @app.after_request
+        def _metrics_stop(response):
+            started = getattr(_request_local, "started", None)
+            if started is None:
+                return response
+            # Bei gestreamten Antworten (Downloads) ist das die Zeit bis zum Beginn der Auslieferung
+            elapsed = time.perf_counter() - started
+            endpoint = request.endpoint or "unmatched"
+            self.request_seconds.observe(elapsed, endpoint, request.method)
+            self.requests_total.inc(endpoint, request.method, str(response.status_code))
+            if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+                self.slow_requests_total.inc(endpoint)
+                sub_seconds, sub_count = _request_local.subprocess
+                logger.warning("🐢 Langsame Anfrage: %s %s → %s in %.0f ms (%d Subprozesse, %.0f ms)",
+                               request.method, request.full_path.rstrip("?"), response.status_code,
+                               elapsed * 1000, sub_count, sub_seconds * 1000)
+            _request_local.started = None
+            _request_local.subprocess = None
+            return response
+
+        return self
+
+
+def cache_samples(name, hits, misses):
+    """Collector-Hilfe: Treffer/Fehlgriffe und Trefferquote eines Caches."""
+    total = hits + misses
+    return [
+        ("ca_cache_hits_total", "counter", "Cache-Treffer", [({"cache": name}, hits)]),
+        ("ca_cache_misses_total", "counter", "Cache-Fehlgriffe (Neuladen/Neuberechnen)", [({"cache": name}, misses)]),
+        ("ca_cache_hit_ratio", "gauge", "Trefferquote seit Start", [({"cache": name}, hits / total if total else None)]),
+    ]
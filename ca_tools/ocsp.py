@@ -0,0 +1,194 @@
+"""
+OCSP-Responder (RFC 6960) für die CA – vollständig offline.
+
+Der Status (inkl. Widerrufszeit und Grund) kommt aus dem geteilten CaIndex
+über <CA_DIR>/index.txt, der Änderungen inkrementell nachlädt.
+Signierte Antworten werden pro Seriennummer zwischengespeichert, bis sich der
+Status ändert oder die Hälfte des Gültigkeitsfensters abgelaufen ist – wiederholte
+Anfragen brauchen also keine Signatur.
+
+Signiert wird mit dem CA-Schlüssel oder, falls konfiguriert, mit einem
+delegierten OCSP-Signer-Zertifikat (Extended Key Usage OCSPSigning); der Signer
+wird einmal geladen und erst bei geänderten Dateien neu eingelesen.
+
+Seriennummern, die nicht in index.txt stehen, bekommen die unsignierte Antwort
+"unauthorized" (wie im Lightweight-Profil, RFC 5019 2.2.3) statt eines signierten
+UNKNOWN – sonst kostet jede Anfrage mit erfundener Seriennummer eine Signatur.
+
+Test gegen eine lokale Instanz:
+    openssl ocsp -issuer ca/certs/ca.cert.pem -cert issued/<name>.cert.pem \\
+        -url http://127.0.0.1:5001/ocsp -CAfile ca/certs/ca.cert.pem -resp_text
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.x509 import ocsp
+
+from ca_tools.issuer import _hash_for, load_ca
+from ca_tools.ca_index import open_index
+
+# openssl-Bezeichnungen in index.txt → ReasonFlags
+_REASONS = {
+    "unspecified": x509.ReasonFlags.unspecified,
+    "keyCompromise": x509.ReasonFlags.key_compromise,
+    "CACompromise": x509.ReasonFlags.ca_compromise,
+    "affiliationChanged": x509.ReasonFlags.affiliation_changed,
+    "superseded": x509.ReasonFlags.superseded,
+    "cessationOfOperation": x509.ReasonFlags.cessation_of_operation,
+    "certificateHold": x509.ReasonFlags.certificate_hold,
+    "removeFromCRL": x509.ReasonFlags.remove_from_crl,
+}
+
+_HASHES = (hashes.SHA1(), hashes.SHA256(), hashes.SHA384(), hashes.SHA512())
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class OcspResponder:
+    """Beantwortet DER-kodierte OCSP-Anfragen für genau eine CA."""
+
+    def __init__(self, ca_dir, validity=3600, signer_cert_file=None, signer_key_file=None,
+                 echo_nonce=False):
+        self.ca_dir = ca_dir
+        self.validity = int(validity)
+        self.signer_cert_file = signer_cert_file
+        self.signer_key_file = signer_key_file
+        self.echo_nonce = echo_nonce
+        self.index = open_index(os.path.join(ca_dir, "index.txt"))
+
+        self._lock = threading.Lock()
+        # Seriennummer → (Statuseintrag, Algorithmus, DER, Erneuerung ab, nextUpdate); nur Seriennummern
+        # aus index.txt, damit beliebige Anfragen den Cache nicht unbegrenzt wachsen lassen
+        self._cache = {}
+        self._issuer_hashes = None
+        self._issuer_sig = None
+        self._delegated = None      # (Datei-Signaturen, Zertifikat, Schlüssel)
+
+        # Kennzahlen
+        self.cache_hits = 0
+        self.signed = 0
+        self.unknown = 0
+
+    # ---------- Signer / Aussteller ----------
+
+    def _refresh_issuer(self):
+        """Lädt die CA (zwischengespeichert in load_ca); bei neuer CA Hashes und Antworten verwerfen."""
+        ca = load_ca(self.ca_dir)
+        if ca is not self._issuer_sig:
+            self._issuer_hashes = {}
+            for algorithm in _HASHES:
+                req = ocsp.OCSPRequestBuilder().add_certificate(ca["cert"], ca["cert"], algorithm).build()
+                self._issuer_hashes[algorithm.name] = (req.issuer_name_hash, req.issuer_key_hash)
+            self._issuer_sig = ca
+            self._cache.clear()
+        return ca
+
+    def _signer(self):
+        """(Signer-Zertifikat, Signer-Schlüssel, mitzuliefernde Zertifikate)."""
+        ca = self._refresh_issuer()
+        if self.signer_cert_file and self.signer_key_file:
+            signature = tuple(_file_signature(path) for path in (self.signer_cert_file, self.signer_key_file))
+            if self._delegated is None or self._delegated[0] != signature:
+                with open(self.signer_cert_file, "rb") as f:
+                    signer_cert = x509.load_pem_x509_certificate(f.read())
+                with open(self.signer_key_file, "rb") as f:
+                    signer_key = serialization.load_pem_private_key(f.read(), password=None)
+                self._delegated = (signature, signer_cert, signer_key)
+            _, signer_cert, signer_key = self._delegated
+            return signer_cert, signer_key, [signer_cert]
+        return ca["cert"], ca["key"], None
+
+    # ---------- Antworten ----------
+
+    @staticmethod
+    def error(status):
+        return ocsp.OCSPResponseBuilder.build_unsuccessful(status).public_bytes(serialization.Encoding.DER)
+
+    def _build(self, req, entry, nonce=None):
+        signer_cert, signer_key, certs = self._signer()
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        next_update = now + timedelta(seconds=self.validity)
+
+        if entry.status == "R":
+            cert_status = ocsp.OCSPCertStatus.REVOKED
+            revoked_at = entry.revoked_at or now
+            reason = _REASONS.get(entry.reason) if entry.reason else None
+        else:
+            # V und E: nicht widerrufen (Ablauf prüft der Client selbst)
+            cert_status, revoked_at, reason = ocsp.OCSPCertStatus.GOOD, None, None
+
+        builder = ocsp.OCSPResponseBuilder().add_response_by_hash(
+            issuer_name_hash=req.issuer_name_hash,
+            issuer_key_hash=req.issuer_key_hash,
+            serial_number=req.serial_number,
+            algorithm=req.hash_algorithm,
+            cert_status=cert_status,
+            this_update=now,
+            next_update=next_update,
+            revocation_time=revoked_at,
+            revocation_reason=reason,
+        ).responder_id(ocsp.OCSPResponderEncoding.HASH, signer_cert)
+        if certs:
+            builder = builder.certificates(certs)
+        if nonce is not None:
+            builder = builder.add_extension(nonce, critical=False)
+
+        response = builder.sign(signer_key, _hash_for(signer_key))
+        self.signed += 1
+        return response.public_bytes(serialization.Encoding.DER), now, next_update
+
+    def respond(self, der_request):
+        """
+        Liefert (DER-Antwort, nextUpdate). nextUpdate ist None bei Fehlerantworten
+        und bei Antworten mit Nonce (nicht cachebar).
+        """
+        try:
+            req = ocsp.load_der_ocsp_request(der_request)
+        except ValueError:
+            return self.error(ocsp.OCSPResponseStatus.MALFORMED_REQUEST), None
+
+        with self._lock:
+            try:
+                self._refresh_issuer()
+            except Exception:
+                return self.error(ocsp.OCSPResponseStatus.INTERNAL_ERROR), None
+
+            # Nur Anfragen für diese CA beantworten
+            expected = self._issuer_hashes.get(req.hash_algorithm.name)
+            if expected != (req.issuer_name_hash, req.issuer_key_hash):
+                return self.error(ocsp.OCSPResponseStatus.UNAUTHORIZED), None
+
+            serial = format(req.serial_number, "X")
+            entry = self.index.get(serial)
+            if entry is None:
+                # Unbekannt: ohne Signatur ablehnen – die Seriennummer wählt der (unauthentifizierte) Anfragende
+                self.unknown += 1
+                return self.error(ocsp.OCSPResponseStatus.UNAUTHORIZED), None
+
+            nonce = None
+            if self.echo_nonce:
+                try:
+                    nonce = req.extensions.get_extension_for_class(x509.OCSPNonce).value
+                except x509.ExtensionNotFound:
+                    nonce = None
+            if nonce is not None:
+                der, _, _ = self._build(req, entry, nonce=nonce)
+                return der, None
+
+            now = datetime.now(timezone.utc)
+            cached = self._cache.get(serial)
+            if (cached and cached[0] == entry and cached[1] == req.hash_algorithm.name
+                    and now < cached[3]):
+                self.cache_hits += 1
+                return cached[2], cached[4]
+
+            der, this_update, next_update = self._build(req, entry)
+            refresh_at = this_update + timedelta(seconds=self.validity / 2)
+            self._cache[serial] = (entry, req.hash_algorithm.name, der, refresh_at, next_update)
+            return der, next_update
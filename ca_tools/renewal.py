@@ -0,0 +1,382 @@
+"""
+Automatische Erneuerung von Zertifikaten kurz vor Ablauf.
+
+Ein Hintergrund-Thread prüft in festen Abständen (AUTO_RENEW_INTERVAL) über den
+Ablauf-Index, welche gültigen Zertifikate in issued/ innerhalb des Fensters
+(AUTO_RENEW_WINDOW_DAYS) ablaufen, und erneuert sie mit exakt denselben CN-,
+DNS- und IP-Einträgen – gelesen aus dem Zertifikat selbst (cryptography), nicht
+aus der Textausgabe von openssl. Es laufen höchstens AUTO_RENEW_WORKERS
+Erneuerungen gleichzeitig; das Signieren selbst ist weiterhin über die
+CA-Schreibsperre serialisiert.
+
+Jede Erneuerung wird in SQLite protokolliert (Lauf, Seriennummer, Ergebnis,
+neue Seriennummer, Log). Nach einem Absturz werden offene Einträge beim
+nächsten Lauf fortgesetzt; wurde das Zertifikat vor dem Absturz bereits neu
+ausgestellt, erkennt der Lauf das am neueren Eintrag in index.txt und stellt
+kein zweites Mal aus.
+"""
+import ipaddress
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+
+from ca_tools.ca_lock import ca_write_lock, file_lock
+from ca_tools.expiry_index import subject_cn
+from ca_tools.revoke import archive_file_sets
+from ca_tools.sqlite_schema import schema_transaction
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_SKIPPED = "skipped"
+
+SCHEMA_VERSION = 1
+
+MAX_LOG_CHARS = 20000
+
+
+def read_renewal_params(cert_file):
+    """
+    CN, DNS-Namen und IP-Adressen eines Zertifikats für die Neuausstellung.
+    Liefert (cn, dns_list, ip_list); ValueError, wenn die Datei kein lesbares Zertifikat mit CN ist.
+    """
+    with open(cert_file, "rb") as f:
+        cert = x509.load_pem_x509_certificate(f.read())
+    names = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+    if not names:
+        raise ValueError(f"Zertifikat ohne CN: {cert_file}")
+    try:
+        san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+    except x509.ExtensionNotFound:
+        return names[0].value, [], []
+    dns_list = san.get_values_for_type(x509.DNSName)
+    ip_list = [str(ip) for ip in san.get_values_for_type(x509.IPAddress)
+               if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address))]
+    return names[0].value, dns_list, ip_list
+
+
+class RenewalHistory:
+    """Persistente Historie der automatischen Erneuerungen (Läufe und Einzelergebnisse)."""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        with self._connect() as conn:
+            self._ensure_schema(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self, conn):
+        with schema_transaction(conn):   # mehrere Worker beim Start nacheinander
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id         TEXT PRIMARY KEY,
+                    started    REAL NOT NULL,
+                    finished   REAL,
+                    candidates INTEGER NOT NULL DEFAULT 0,
+                    renewed    INTEGER NOT NULL DEFAULT 0,
+                    failed     INTEGER NOT NULL DEFAULT 0,
+                    skipped    INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS renewals (
+                    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id     TEXT NOT NULL,
+                    serial     TEXT NOT NULL,
+                    cn         TEXT,
+                    file       TEXT,
+                    expires    REAL,
+                    state      TEXT NOT NULL,
+                    attempts   INTEGER NOT NULL DEFAULT 0,
+                    message    TEXT,
+                    new_serial TEXT,
+                    archived   INTEGER NOT NULL DEFAULT 0,
+                    log        TEXT NOT NULL DEFAULT '',
+                    created    REAL NOT NULL,
+                    started    REAL,
+                    finished   REAL
+                )
+            """)
+            # Pro Seriennummer höchstens ein offener oder erfolgreicher Eintrag
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS renewals_active ON renewals (serial) "
+                "WHERE state IN ('pending', 'running', 'done')"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS renewals_created ON renewals (created)")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # ---------- Läufe ----------
+
+    def start_run(self):
+        run_id = uuid.uuid4().hex[:12]
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT INTO runs (id, started) VALUES (?, ?)", (run_id, time.time()))
+        return run_id
+
+    def finish_run(self, run_id):
+        with self._lock, self._connect() as conn:
+            counts = {row["state"]: row["n"] for row in conn.execute(
+                "SELECT state, COUNT(*) AS n FROM renewals WHERE run_id = ? GROUP BY state", (run_id,))}
+            conn.execute(
+                "UPDATE runs SET finished = ?, candidates = ?, renewed = ?, failed = ?, skipped = ? WHERE id = ?",
+                (time.time(), sum(counts.values()), counts.get(STATE_DONE, 0),
+                 counts.get(STATE_FAILED, 0), counts.get(STATE_SKIPPED, 0), run_id),
+            )
+
+    def resume(self):
+        """Abgebrochene Erneuerungen (Absturz/Neustart) wieder auf pending setzen – nur unter der Lauf-Sperre."""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE renewals SET state = ?, message = ? WHERE state = ?",
+                (STATE_PENDING, "Fortgesetzt nach Neustart", STATE_RUNNING),
+            ).rowcount
+
+    # ---------- Einträge ----------
+
+    def enqueue(self, run_id, serial, cn, file, expires, max_attempts):
+        """
+        Legt einen pending-Eintrag an. Bereits offene/erledigte Seriennummern werden
+        übersprungen, fehlgeschlagene nur bis max_attempts Versuchen erneut eingereiht.
+        """
+        with self._lock, self._connect() as conn:
+            attempts = conn.execute(
+                "SELECT COALESCE(SUM(attempts), 0) FROM renewals WHERE serial = ? AND state = ?",
+                (serial, STATE_FAILED),
+            ).fetchone()[0]
+            if attempts >= max_attempts:
+                return False
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO renewals (run_id, serial, cn, file, expires, state, attempts, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, serial, cn, file, expires, STATE_PENDING, 0, time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def pending(self):
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(
+                "SELECT * FROM renewals WHERE state = ? ORDER BY expires", (STATE_PENDING,))]
+
+    def claim(self, renewal_id, run_id):
+        """Setzt einen Eintrag atomar auf running; False, wenn ihn schon jemand anderes bearbeitet."""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE renewals SET state = ?, run_id = ?, attempts = attempts + 1, started = ? "
+                "WHERE id = ? AND state = ?",
+                (STATE_RUNNING, run_id, time.time(), renewal_id, STATE_PENDING),
+            ).rowcount == 1
+
+    def finish(self, renewal_id, state, message, log="", new_serial=None, archived=False):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE renewals SET state = ?, message = ?, log = ?, new_serial = ?, archived = ?, finished = ? "
+                "WHERE id = ?",
+                (state, message, log[-MAX_LOG_CHARS:], new_serial, int(archived), time.time(), renewal_id),
+            )
+
+    def list(self, limit=100):
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(
+                "SELECT id, run_id, serial, cn, file, expires, state, attempts, message, new_serial, archived, "
+                "created, started, finished FROM renewals ORDER BY created DESC, id DESC LIMIT ?", (limit,))]
+
+    def runs(self, limit=20):
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(
+                "SELECT * FROM runs ORDER BY started DESC LIMIT ?", (limit,))]
+
+    def get(self, renewal_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM renewals WHERE id = ?", (renewal_id,)).fetchone()
+        return dict(row) if row else None
+
+
+class AutoRenewer:
+    """
+    Planer für die automatische Erneuerung.
+
+    renew(cert_file, log) stellt ein Zertifikat mit den Daten aus cert_file neu aus
+    und liefert (ok, Meldung); log(text) sammelt die Ausgabe für die Historie.
+    """
+
+    def __init__(self, history, expiry_index, serial_index, renew, window_days=30, workers=2,
+                 interval=3600, archive_predecessor=False, archive_dir=None, max_attempts=3, initial_delay=30):
+        self.history = history
+        self.expiry_index = expiry_index
+        self.serial_index = serial_index
+        self.renew = renew
+        self.window_days = window_days
+        self.workers = max(1, workers)
+        self.interval = interval
+        self.archive_predecessor = archive_predecessor
+        self.archive_dir = archive_dir
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+
+        self._run_lock = threading.Lock()
+        # Über Prozesse hinweg (mehrere Worker mit eigenem Planer) läuft immer nur ein Lauf
+        self.lock_file = history.db_file + ".lock"
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run = None
+        self.last_error = None
+
+    # ---------- Hintergrund-Thread ----------
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="auto-renew", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def trigger(self):
+        """Nächsten Lauf sofort starten (kehrt sofort zurück)."""
+        if self._thread is not None and self._thread.is_alive():
+            self._wakeup.set()
+            return
+        # Prozess ohne eigenen Planer (nicht Leader): einmaliger Lauf, die Lauf-Sperre verhindert Doppelläufe
+        threading.Thread(target=self._run_guarded, name="auto-renew-trigger", daemon=True).start()
+
+    @property
+    def running(self):
+        if self._run_lock.locked():
+            return True
+        with file_lock(self.lock_file, blocking=False) as free:
+            return not free
+
+    def _loop(self):
+        # Erster Lauf kurz nach dem Start (Kaltstart-Scan und Warm-up zuerst), danach im Intervall
+        self._wakeup.wait(self.initial_delay)
+        self._wakeup.clear()
+        while not self._stop.is_set():
+            self._run_guarded()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def _run_guarded(self):
+        try:
+            self.run_once()
+            self.last_error = None
+        except Exception as e:  # der Planer darf nicht sterben
+            self.last_error = f"{type(e).__name__}: {e}"
+
+    # ---------- Ein Lauf ----------
+
+    def _newest_by_cn(self, now):
+        """CN → (Ablaufzeit, Seriennummer) des am längsten gültigen Zertifikats."""
+        newest = {}
+        for entry in self.expiry_index.next_to_expire(None, now=now):
+            if entry.status == "V":
+                newest[subject_cn(entry.subject)] = (self.expiry_index.epoch(entry.serial), entry.serial)
+        return newest
+
+    def candidates(self, now=None):
+        """
+        Gültige Zertifikate in issued/, die im Fenster ablaufen und das jüngste ihres CN sind
+        (gibt es bereits ein länger gültiges, wurde schon – z. B. von Hand – erneuert).
+        """
+        now = time.time() if now is None else now
+        issued = self.serial_index.issued_files()
+        newest = self._newest_by_cn(now)
+        found = []
+        for entry in self.expiry_index.expiring_within(self.window_days, now=now):
+            if entry.status != "V" or entry.serial not in issued:
+                continue
+            cn = subject_cn(entry.subject)
+            if newest.get(cn, (0, entry.serial))[1] != entry.serial:
+                continue
+            found.append((entry, cn, issued[entry.serial]))
+        return found
+
+    def run_once(self, now=None):
+        """Führt einen Lauf aus; liefert die Lauf-ID oder None, wenn bereits ein Lauf aktiv ist."""
+        if not self._run_lock.acquire(blocking=False):
+            return None
+        try:
+            with file_lock(self.lock_file, blocking=False) as acquired:
+                if not acquired:
+                    return None   # ein anderer Worker-Prozess führt gerade einen Lauf aus
+                # Unter der Lauf-Sperre sind "running"-Einträge Reste eines abgebrochenen Laufs
+                self.history.resume()
+                return self._run(now)
+        finally:
+            self._run_lock.release()
+
+    def _run(self, now):
+        now = time.time() if now is None else now
+        run_id = self.history.start_run()
+        for entry, cn, filename in self.candidates(now):
+            self.history.enqueue(run_id, entry.serial, cn, filename,
+                                 self.expiry_index.epoch(entry.serial), self.max_attempts)
+
+        pending = self.history.pending()
+        if pending:
+            newest = self._newest_by_cn(now)
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="auto-renew") as executor:
+                list(executor.map(lambda r: self._renew_one(run_id, r, newest), pending))
+        self.history.finish_run(run_id)
+        self.last_run = time.time()
+        return run_id
+
+    def _renew_one(self, run_id, renewal, newest):
+        if not self.history.claim(renewal["id"], run_id):
+            return
+        lines = []
+        issued_dir = self.serial_index.issued_dir
+        cert_file = os.path.join(issued_dir, renewal["file"])
+
+        # Fortsetzung nach Absturz: schon neu ausgestellt → nicht doppelt ausstellen
+        latest = newest.get(renewal["cn"])
+        if latest and latest[1] != renewal["serial"] and latest[0] > (renewal["expires"] or 0):
+            self._finish_success(renewal, cert_file, latest[1], ["Bereits erneuert – keine neue Ausstellung."])
+            return
+        if not os.path.exists(cert_file):
+            self.history.finish(renewal["id"], STATE_SKIPPED, "Zertifikatsdatei nicht mehr in issued/")
+            return
+
+        try:
+            ok, message = self.renew(cert_file, lines.append)
+        except Exception as e:  # unerwartete Fehler in der Historie festhalten
+            ok, message = False, f"Unerwarteter Fehler: {e}"
+        if not ok:
+            self.history.finish(renewal["id"], STATE_FAILED, message, log="\n".join(lines))
+            return
+        new_serial = self._find_successor(renewal)
+        self._finish_success(renewal, cert_file, new_serial, lines + [message])
+
+    def _find_successor(self, renewal):
+        """Seriennummer des neuesten gültigen Zertifikats mit gleichem CN (nach der Ausstellung)."""
+        for entry in reversed(self.expiry_index.next_to_expire(None)):
+            if entry.status == "V" and subject_cn(entry.subject) == renewal["cn"]:
+                return entry.serial if entry.serial != renewal["serial"] else None
+        return None
+
+    def _finish_success(self, renewal, cert_file, new_serial, lines):
+        archived = False
+        if self.archive_predecessor and self.archive_dir and new_serial:
+            base_name = renewal["file"].rsplit(".cert.pem", 1)[0]
+            # Wie Widerruf und Archiv-Bereinigung unter der CA-Schreibsperre – sonst kann ein
+            # paralleler Lauf denselben Dateisatz halb verschieben
+            with ca_write_lock(os.path.dirname(self.serial_index.index_file)):
+                if os.path.exists(cert_file):
+                    moved = archive_file_sets(self.serial_index.issued_dir, self.archive_dir, [base_name])
+                    lines.append(f"Vorgänger archiviert: {', '.join(moved[base_name])}")
+                    archived = True
+        self.history.finish(renewal["id"], STATE_DONE, f"Erneuert → {new_serial or '?'}",
+                            log="\n".join(lines), new_serial=new_serial, archived=archived)
@@ -0,0 +1,153 @@
+"""
+Sammel-Widerruf für die CA.
+
+Statt pro Zertifikat `openssl ca -revoke` + `-gencrl` + DER-Export aufzurufen,
+werden alle gewählten Seriennummern in einem Durchgang in index.txt als
+widerrufen markiert. Danach wird die CRL genau einmal neu signiert (PEM + DER)
+und alle betroffenen Dateisätze gemeinsam ins Archiv verschoben.
+
+Das index.txt-Format entspricht dem von openssl ca (Status R, Widerrufszeit
+im dritten Feld, optional ",<Grund>"), so dass openssl die Datenbank
+unverändert weiterverwenden kann.
+"""
+import os
+import subprocess
+from datetime import datetime, timezone
+
+from ca_tools.ca_index import normalize_serial
+from ca_tools.ca_lock import ca_write_lock
+from ca_tools.issuer import format_index_time, _replace_with_backup
+
+# Gültige Widerrufsgründe laut openssl ca -crl_reason
+REASONS = (
+    "unspecified", "keyCompromise", "CACompromise", "affiliationChanged",
+    "superseded", "cessationOfOperation", "certificateHold", "removeFromCRL",
+)
+
+ARTIFACT_EXTENSIONS = (".cert.pem", ".key.pem", ".csr.pem", ".fullchain.pem", ".p12")
+
+OUTCOME_REVOKED = "revoked"
+OUTCOME_ALREADY_REVOKED = "already_revoked"
+OUTCOME_NOT_FOUND = "not_found"
+
+
+def mark_revoked(index_file, serials, reason=None, when=None):
+    """
+    Markiert alle Seriennummern in einem Durchgang als widerrufen.
+    Liefert {normalisierte Seriennummer: Ergebnis}; index.txt wird höchstens einmal geschrieben.
+    """
+    if reason is not None and reason not in REASONS:
+        raise ValueError(f"Unbekannter Widerrufsgrund: {reason}")
+
+    wanted = {normalize_serial(s) for s in serials if normalize_serial(s)}
+    outcomes = {s: OUTCOME_NOT_FOUND for s in wanted}
+    revoked_at = format_index_time(when or datetime.now(timezone.utc))
+    if reason:
+        revoked_at += f",{reason}"
+
+    if not os.path.exists(index_file):
+        return outcomes
+
+    with open(index_file, "rb") as f:
+        lines = f.read().decode("utf-8").splitlines(keepends=True)
+
+    changed = False
+    for i, line in enumerate(lines):
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 6:
+            continue
+        serial = normalize_serial(fields[3])
+        if serial not in wanted:
+            continue
+        if fields[0] == "R":
+            outcomes[serial] = OUTCOME_ALREADY_REVOKED
+            continue
+        fields[0] = "R"
+        fields[2] = revoked_at
+        lines[i] = "\t".join(fields) + "\n"
+        outcomes[serial] = OUTCOME_REVOKED
+        changed = True
+
+    if changed:
+        _replace_with_backup(index_file, "".join(lines).encode("utf-8"))
+    return outcomes
+
+
+def generate_crl(ca_dir, log=None):
+    """
+    Erzeugt die CRL neu (crl/ca.crl.pem) und exportiert sie zusätzlich als DER (crl/ca.crl).
+    Unter der CA-Schreibsperre; beide Dateien werden per rename ersetzt, damit Leser
+    (auch andere Worker) nie eine halb geschriebene CRL sehen.
+    """
+    conf_file = os.path.join(ca_dir, "openssl.cnf")
+    ca_pass = os.path.join(ca_dir, "private", "ca.pass")
+    crl_file = os.path.join(ca_dir, "crl", "ca.crl.pem")
+    crl_der = os.path.join(ca_dir, "crl", "ca.crl")
+
+    with ca_write_lock(ca_dir):
+        for cmd, tmp, target in (
+            (["openssl", "ca", "-config", conf_file, "-gencrl", "-out", crl_file + ".tmp",
+              "-passin", f"file:{ca_pass}"], crl_file + ".tmp", crl_file),
+            # Auch CRL als DER exportieren (für Windows / Firewalls)
+            (["openssl", "crl", "-in", crl_file, "-outform", "DER", "-out", crl_der + ".tmp"],
+             crl_der + ".tmp", crl_der),
+        ):
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            if log:
+                log(f"$ {' '.join(cmd)}\n{result.stdout}")
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, cmd, output=result.stdout)
+            os.replace(tmp, target)
+    return crl_file, crl_der
+
+
+def archive_file_sets(issued_dir, archive_dir, basenames):
+    """
+    Verschiebt die Dateisätze (cert/key/csr/fullchain/p12) ins Archiv. Liefert {basename: [Dateien]}.
+
+    Die .cert.pem wird zuletzt verschoben: Listen sehen das Zertifikat so lange in issued/,
+    bis der ganze Satz im Archiv liegt (fehlende Varianten findet download_file im Archiv).
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    moved = {}
+    order = [ext for ext in ARTIFACT_EXTENSIONS if ext != ".cert.pem"] + [".cert.pem"]
+    for base_name in basenames:
+        files = []
+        for ext in order:
+            src = os.path.join(issued_dir, base_name + ext)
+            if os.path.exists(src):
+                os.rename(src, os.path.join(archive_dir, base_name + ext))
+                files.append(base_name + ext)
+        moved[base_name] = files
+    return moved
+
+
+def revoke_batch(ca_dir, issued_dir, archive_dir, entries, reason=None, log=None):
+    """
+    Widerruft mehrere Zertifikate mit einer einzigen CRL-Erzeugung.
+
+    entries: {Seriennummer: Basisname der Dateien in issued/ oder None}
+    Liefert eine Liste von dicts (serial, outcome, files) in der Reihenfolge der Eingabe.
+    """
+    with ca_write_lock(ca_dir):
+        outcomes = mark_revoked(os.path.join(ca_dir, "index.txt"), entries.keys(), reason=reason)
+
+        revoked = [s for s in entries if outcomes.get(normalize_serial(s)) == OUTCOME_REVOKED]
+        if revoked:
+            generate_crl(ca_dir, log=log)
+
+        # Auch bereits widerrufene Zertifikate, die noch in issued/ liegen, mit archivieren
+        to_archive = [
+            entries[s] for s in entries
+            if entries[s] and outcomes.get(normalize_serial(s)) != OUTCOME_NOT_FOUND
+        ]
+        moved = archive_file_sets(issued_dir, archive_dir, to_archive)
+
+    results = []
+    for serial, base_name in entries.items():
+        outcome = outcomes.get(normalize_serial(serial), OUTCOME_NOT_FOUND)
+        files = moved.get(base_name, []) if base_name else []
+        results.append({"serial": serial, "outcome": outcome, "files": files})
+        if log:
+            log(f"{serial}: {outcome}" + (f" → Archiv: {', '.join(files)}" if files else ""))
+    return results
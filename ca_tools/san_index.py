@@ -0,0 +1,285 @@
+"""
+Suchindex über Hostnamen und IP-Adressen der Zertifikate (CN + SANs).
+
+- DNS-Namen und CNs liegen in einem Trie nach umgekehrten Labels
+  (loc → bmgnet → prod → api). Ein Wildcard-SAN "*.prod.bmgnet.loc" hängt am
+  Knoten "prod.bmgnet.loc" und deckt – wie bei TLS (RFC 6125) – genau ein
+  weiteres Label ab: api.prod.bmgnet.loc ja, prod.bmgnet.loc und
+  a.b.prod.bmgnet.loc nein.
+- IP-SANs liegen sortiert als (Version, Zahlwert); eine Adresse oder ein
+  Präfix (10.0.4.0/24) ist eine binäre Suche.
+
+Aufgebaut wird aus den Zertifikats-Metadaten (list_certificates() bzw.
+CertInventory inkl. Metadaten-Cache) – ohne Zertifikate erneut zu dekodieren.
+
+Aufruf als CLI:
+    python -m ca_tools.san_index api.prod.bmgnet.loc 10.0.4.17 10.0.0.0/16 [--all] [--suffix] [--json]
+"""
+import bisect
+import ipaddress
+import os
+import socket
+import sys
+import threading
+
+MODE_HOST = "host"      # Welche Zertifikate decken diesen Hostnamen ab?
+MODE_SUFFIX = "suffix"  # Alle Namen unterhalb einer Domain (inkl. Wildcards)
+
+
+def normalize_hostname(name):
+    return (name or "").strip().rstrip(".").lower()
+
+
+def ip_key(value):
+    """IP-Adresse → (Version, Zahlwert) zum Sortieren; None, wenn es keine IP ist."""
+    value = value.strip()
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, value), "big")
+    except OSError:
+        pass
+    if ":" not in value:
+        return None
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    return address.version, int(address)
+
+
+def parse_san(san):
+    """SAN-String im openssl-Format ("DNS:a, IP Address:10.0.0.1") → (dns_list, ip_list)."""
+    dns, ips = [], []
+    for part in (san or "").split(","):
+        part = part.strip()
+        if part.startswith("DNS:"):
+            dns.append(part[4:])
+        elif part.startswith("IP Address:"):
+            ips.append(part[11:])
+    return dns, ips
+
+
+class _Node:
+    __slots__ = ("children", "exact", "wildcard")
+
+    def __init__(self):
+        self.children = {}
+        self.exact = None      # Zertifikats-ID → Herkunft ("CN" / "DNS:…"), erst bei Bedarf angelegt
+        self.wildcard = None   # Zertifikats-ID → SAN "*.<Name dieses Knotens>"
+
+
+class SanIndex:
+    """Unveränderlicher Index über eine Zertifikatsliste (Format von list_certificates())."""
+
+    def __init__(self, certs):
+        self.certs = certs
+        self._root = _Node()
+        self._ip_keys = []    # (Version, Zahlwert), sortiert
+        self._ip_ids = []     # Zertifikats-ID in derselben Reihenfolge
+        self._ip_names = []
+
+        ips = []
+        for cert_id, cert in enumerate(certs):
+            dns, ip_list = parse_san(cert.get("san"))
+            names = {}
+            cn = normalize_hostname(cert.get("cn"))
+            if cn and cn != "unknown":
+                key = ip_key(cn) if cn[-1].isdigit() or ":" in cn else None
+                if key is not None:
+                    ips.append((key, cert_id, f"CN:{cn}"))
+                else:
+                    names[cn] = "CN"
+            for name in dns:
+                names.setdefault(normalize_hostname(name), f"DNS:{name}")
+            for name, origin in names.items():
+                self._add_name(name, cert_id, origin)
+            for value in ip_list:
+                key = ip_key(value)
+                if key is not None:
+                    ips.append((key, cert_id, f"IP:{value.strip()}"))
+        ips.sort(key=lambda t: (t[0], t[1]))
+        self._ip_keys = [t[0] for t in ips]
+        self._ip_ids = [t[1] for t in ips]
+        self._ip_names = [t[2] for t in ips]
+
+    # ---------- Aufbau ----------
+
+    def _add_name(self, name, cert_id, origin):
+        labels = name.split(".")
+        wildcard = labels[0] == "*"
+        if wildcard:
+            labels = labels[1:]
+        node = self._root
+        for label in reversed(labels):
+            child = node.children.get(label)
+            if child is None:
+                child = node.children[label] = _Node()
+            node = child
+        if wildcard:
+            if node.wildcard is None:
+                node.wildcard = {}
+            node.wildcard[cert_id] = origin
+        else:
+            if node.exact is None:
+                node.exact = {}
+            node.exact[cert_id] = origin
+
+    # ---------- Suche ----------
+
+    def _walk(self, labels):
+        node = self._root
+        for label in reversed(labels):
+            node = node.children.get(label)
+            if node is None:
+                return None
+        return node
+
+    def match_hostname(self, hostname):
+        """Zertifikats-ID → passender Eintrag für alle Zertifikate, die den Hostnamen abdecken."""
+        labels = normalize_hostname(hostname).split(".")
+        hits = {}
+        if len(labels) > 1:
+            parent = self._walk(labels[1:])
+            if parent is not None and parent.wildcard:
+                hits.update(parent.wildcard)
+        node = self._walk(labels)
+        if node is not None and node.exact:
+            hits.update(node.exact)
+        return hits
+
+    def match_suffix(self, domain):
+        """Alle Zertifikate mit Namen in oder unterhalb der Domain (exakt und Wildcards)."""
+        domain = normalize_hostname(domain).lstrip("*.")
+        node = self._walk(domain.split(".")) if domain else self._root
+        hits = {}
+        stack = [node] if node is not None else []
+        while stack:
+            current = stack.pop()
+            for found in (current.exact, current.wildcard):
+                for cert_id, origin in (found or {}).items():
+                    hits.setdefault(cert_id, origin)
+            stack.extend(current.children.values())
+        return hits
+
+    def match_ip(self, query):
+        """Zertifikate mit IP-SAN gleich der Adresse bzw. innerhalb des Präfixes (CIDR)."""
+        network = ipaddress.ip_network(query.strip(), strict=False)
+        lo = bisect.bisect_left(self._ip_keys, (network.version, int(network.network_address)))
+        hi = bisect.bisect_right(self._ip_keys, (network.version, int(network.broadcast_address)))
+        hits = {}
+        for i in range(lo, hi):
+            hits.setdefault(self._ip_ids[i], self._ip_names[i])
+        return hits
+
+    def search(self, query, mode=MODE_HOST, include_all=False, limit=None):
+        """
+        Sucht nach Hostname, IP oder CIDR-Präfix. Liefert Zertifikats-dicts mit
+        zusätzlichem Feld "matched" (welcher Eintrag gepasst hat), neueste Ablaufzeit zuerst.
+        Ohne include_all nur gültige (Status V) Zertifikate aus issued/.
+        """
+        query = (query or "").strip()
+        if not query:
+            return []
+        try:
+            hits = self.match_ip(query)
+        except ValueError:
+            hits = self.match_suffix(query) if mode == MODE_SUFFIX else self.match_hostname(query)
+
+        results = []
+        for cert_id, origin in hits.items():
+            cert = self.certs[cert_id]
+            if not include_all and (cert.get("status") != "V" or cert.get("source") == "archive"):
+                continue
+            results.append(dict(cert, matched=origin))
+        results.sort(key=lambda c: c.get("expire") or "", reverse=True)
+        return results[:limit] if limit else results
+
+
+class SanSearch:
+    """
+    Hält einen SanIndex aktuell: neu aufgebaut wird nur, wenn sich issued/,
+    issued/archive/ (Verzeichnis-mtime), index.txt (CaIndex.version) oder – mit
+    Watcher – der Stand des In-Memory-Bestands (version()) geändert haben.
+    """
+
+    def __init__(self, load_certificates, directories, ca_index, version=None):
+        self.load_certificates = load_certificates
+        self.directories = directories
+        self.ca_index = ca_index
+        self.version = version
+        self._lock = threading.Lock()
+        self._signature = None
+        self._index = None
+
+        # Kennzahlen
+        self.builds = 0
+
+    def _current_signature(self):
+        sig = []
+        for directory in self.directories:
+            try:
+                st = os.stat(directory)
+                sig.append((st.st_ino, st.st_mtime_ns))
+            except FileNotFoundError:
+                sig.append(None)
+        self.ca_index.refresh()
+        sig.append(self.ca_index.version)
+        if self.version is not None:
+            sig.append(self.version())
+        return tuple(sig)
+
+    def index(self):
+        sig = self._current_signature()
+        if self._index is not None and sig == self._signature:
+            return self._index
+        with self._lock:
+            if self._index is None or sig != self._signature:
+                self._index = SanIndex(self.load_certificates())
+                self._signature = sig
+                self.builds += 1
+            return self._index
+
+    def search(self, query, **kwargs):
+        return self.index().search(query, **kwargs)
+
+
+def main(argv=None):
+    """CLI: python -m ca_tools.san_index <Hostname|IP|CIDR> … [--all] [--suffix] [--json]"""
+    import argparse
+    import json
+    import time
+
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, base)
+    from config import Config
+    from ca_tools.cert_cache import CertCache
+    from ca_tools.list_certs import list_certificates
+
+    parser = argparse.ArgumentParser(description="Zertifikate nach Hostname, IP oder Präfix suchen")
+    parser.add_argument("queries", nargs="+", metavar="SUCHE", help="Hostname, IP-Adresse oder CIDR-Präfix")
+    parser.add_argument("--all", action="store_true", help="auch abgelaufene, widerrufene und archivierte")
+    parser.add_argument("--suffix", action="store_true", help="alle Namen unterhalb der Domain")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    cache = CertCache(Config.CERT_CACHE_FILE) if Config.CERT_CACHE_FILE else None
+    started = time.perf_counter()
+    index = SanIndex(list_certificates(Config.CA_DIR, Config.ISSUED_DIR, include_archive=True,
+                                       backend=Config.CERT_PARSER, cache=cache))
+    built = time.perf_counter() - started
+
+    mode = MODE_SUFFIX if args.suffix else MODE_HOST
+    results = {q: index.search(q, mode=mode, include_all=args.all) for q in args.queries}
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return 0 if any(results.values()) else 1
+
+    print(f"ℹ️  Index über {len(index.certs)} Zertifikate in {built * 1000:.0f} ms aufgebaut")
+    for query, hits in results.items():
+        print(f"\n🔎 {query}: {len(hits)} Treffer")
+        for c in hits:
+            print(f"  {c['status']}  {c['serial']:>10}  {c['expire']}  {c['cn']}  ({c['matched']})")
+    return 0 if any(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+
+from ca_tools.archive_store import open_store
+from ca_tools.ca_index import normalize_serial, open_index
+from ca_tools.list_certs import _scan_directory
+
+# Zeitauflösung der mtime, mit der gerechnet wird (grobe Dateisysteme: 1 s, manche 2 s)
+MTIME_GRANULARITY = 2.0
+
+
+class SerialIndex:
+    """
+    Gemeinsamer Index Seriennummer → Zertifikatsdatei.
+
+    Aufgebaut aus index.txt (Status, Subject – über den geteilten CaIndex) und den
+    .cert.pem-Dateien in issued/ und issued/archive/. Aktualisiert wird inkrementell:
+    index.txt nur um neue Zeilen bzw. bei Austausch der Datei, Verzeichnisse nur bei geänderter Verzeichnis-mtime –
+    und dann über den Metadaten-Cache, so dass nur neue Dateien dekodiert werden.
+    """
+
+    def __init__(self, ca_dir, issued_dir, backend=None, cache=None):
+        self.index_file = os.path.join(ca_dir, "index.txt")
+        self.issued_dir = issued_dir
+        self.archive_dir = os.path.join(issued_dir, "archive")
+        self.backend = backend
+        self.cache = cache
+
+        self._lock = threading.Lock()
+        self.index = open_index(self.index_file)
+        self.store = open_store(self.archive_dir)
+        self._dir_sigs = {}
+        self._files = {}     # directory → {serial: Dateiname}
+        self._forced_at = {}  # Pfad → Zeitpunkt des letzten erzwungenen Einlesens
+
+        # Kennzahlen
+        self.forced_refreshes = 0
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh_index(self, force=False):
+        self.index.refresh(force)
+
+    def _refresh_directory(self, directory, force=False):
+        sig = self._signature(directory)
+        if sig == self._dir_sigs.get(directory) and not force:
+            return
+        files = {}
+        if sig is not None:
+            # Älteste zuerst, damit bei doppelten Seriennummern die neueste Datei gewinnt
+            for name, info in reversed(_scan_directory(directory, self.backend, self.cache)):
+                if info["serial"] != "unknown":
+                    files[normalize_serial(info["serial"])] = name
+        self._files[directory] = files
+        self._dir_sigs[directory] = sig
+
+    def _force_needed(self, path):
+        """
+        Erzwungenes Einlesen lohnt nur, wenn sich path seit dem letzten erzwungenen Einlesen innerhalb
+        der mtime-Auflösung geändert haben kann – sonst hätte die Signatur die Änderung gezeigt.
+        """
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        return self._forced_at.get(path, 0.0) <= mtime + MTIME_GRANULARITY
+
+    def refresh(self, force=False):
+        """
+        Aktualisiert geänderte Teile des Index. force=True liest zusätzlich alles neu ein, was sich
+        seit dem letzten erzwungenen Einlesen unbemerkt geändert haben kann (mtime zu grob).
+        """
+        with self._lock:
+            forced = [path for path in (self.index_file, self.issued_dir, self.archive_dir)
+                      if force and self._force_needed(path)]
+            started = time.time()
+            self._refresh_index(self.index_file in forced)
+            self._refresh_directory(self.issued_dir, self.issued_dir in forced)
+            self._refresh_directory(self.archive_dir, self.archive_dir in forced)
+            for path in forced:
+                self._forced_at[path] = started
+            if forced:
+                self.forced_refreshes += 1
+
+    def _lookup(self, serial, include_archive):
+        directories = [self.issued_dir]
+        if include_archive:
+            directories.append(self.archive_dir)
+        for directory in directories:
+            name = self._files.get(directory, {}).get(serial)
+            if name:
+                entry = self.index.get(serial)
+                status, subject = (entry.status, entry.subject) if entry else ("V", "")
+                return {
+                    "serial": serial,
+                    "path": os.path.join(directory, name),
+                    "file": name,
+                    "source": "archive" if directory == self.archive_dir else "active",
+                    "status": status,
+                    "subject": subject,
+                }
+        if include_archive:
+            # Gepackter Satz: keine Datei auf der Platte (path None), Inhalt über den ArchiveStore
+            packed = self.store.find_serial(serial)
+            if packed is not None and packed.cert_file:
+                entry = self.index.get(serial)
+                status, subject = (entry.status, entry.subject) if entry else ("V", "")
+                return {
+                    "serial": serial,
+                    "path": None,
+                    "file": packed.cert_file,
+                    "source": "archive",
+                    "packed": True,
+                    "status": status,
+                    "subject": subject,
+                }
+        return None
+
+    def lookup(self, serial, include_archive=False):
+        """
+        Sucht das Zertifikat zu einer Seriennummer in O(1).
+        Liefert ein dict (serial, path, file, source, status, subject) oder None.
+        Gepackte Archiv-Zertifikate haben path None und packed True.
+        """
+        return self.lookup_many([serial], include_archive)[0]
+
+    def lookup_many(self, serials, include_archive=False):
+        """
+        Wie lookup() für mehrere Seriennummern (Batch-Widerruf, Export): Liste in derselben
+        Reihenfolge. Höchstens ein erzwungenes Einlesen für alle Fehlgriffe zusammen.
+        """
+        serials = [normalize_serial(s) for s in serials]
+        self.refresh()
+        entries = [self._lookup(s, include_archive) for s in serials]
+        # Treffer ohne Datei oder kein Treffer: Verzeichnis-mtime kann zu grob sein → erzwingen
+        stale = [i for i, e in enumerate(entries) if e is None or (e["path"] and not os.path.exists(e["path"]))]
+        if stale:
+            self.refresh(force=True)
+            for i in stale:
+                entries[i] = self._lookup(serials[i], include_archive)
+        return entries
+
+    def issued_files(self):
+        """Seriennummer → Dateiname aller Zertifikate in issued/ (ohne Archiv)."""
+        self.refresh()
+        return self._files.get(self.issued_dir, {})
+
+    def status(self, serial):
+        """Status (V/E/R) laut index.txt oder None."""
+        self.refresh()
+        return self.index.status(serial)
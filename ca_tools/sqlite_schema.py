@@ -0,0 +1,40 @@
+"""
+Schema-Anlage und -Migration der SQLite-Datenbanken (Zertifikats-Cache, Jobs, Erneuerungen).
+
+Mit mehreren gunicorn-Workern öffnen alle Prozesse dieselbe Datenbank gleichzeitig beim
+Import. Anlegen und Migrieren laufen deshalb in einer BEGIN-IMMEDIATE-Transaktion: der
+erste Prozess legt das Schema an, die anderen warten (busy timeout) und finden es danach
+fertig vor.
+"""
+import sqlite3
+from contextlib import contextmanager
+
+
+@contextmanager
+def schema_transaction(conn):
+    """WAL einschalten, danach Schema-Änderungen exklusiv (BEGIN IMMEDIATE) ausführen."""
+    conn.execute("PRAGMA journal_mode=WAL")   # nicht innerhalb einer Transaktion möglich
+    previous = conn.isolation_level
+    conn.isolation_level = None               # BEGIN/COMMIT selbst steuern
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.isolation_level = previous
+
+
+def add_column(conn, table, column, definition):
+    """Spalte nachrüsten; bereits vorhanden (auch durch einen anderen Prozess) gilt als migriert."""
+    if column in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+        return False
+    try:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" not in str(e):
+            raise
+        return False
+    return True
@@ -0,0 +1,203 @@
+"""
+Fingerprinting und Vorkomprimierung der statischen Assets (AdminLTE, Bootstrap,
+jQuery, DataTables, moment, Font Awesome).
+
+build() erzeugt für jede von layout.html referenzierte Datei eine gzip- und –
+falls das Paket `brotli` installiert ist – eine Brotli-Variante im Build-
+Verzeichnis und schreibt ein Manifest (logischer Pfad → Inhalts-Hash). URLs
+erhalten den Hash im Dateinamen (adminlte/css/all.min.<hash>.css) und bleiben
+im selben Verzeichnis, damit relative url(...)-Verweise in CSS weiter passen.
+
+Mehrere Prozesse (gunicorn-Worker) dürfen gleichzeitig bauen: build() läuft unter
+einer flock-Sperre auf <build_dir>/.build.lock, übernimmt zuerst ein inzwischen von
+einem anderen Prozess geschriebenes Manifest und schreibt nur über eigene
+temporäre Dateien.
+
+Aufruf als Build-Schritt:
+    python -m ca_tools.static_assets [--force]
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optionale Abhängigkeit
+    brotli = None
+
+from ca_tools.ca_lock import file_lock
+
+MANIFEST = "manifest.json"
+LOCK_FILENAME = ".build.lock"
+HASH_LENGTH = 12
+
+# Nur Textformate lohnen die Kompression (woff2/png sind bereits komprimiert)
+COMPRESSIBLE = (".css", ".js", ".map", ".svg", ".txt", ".json")
+
+_REFERENCE_RE = re.compile(r"""(?:asset_url\(|filename=)\s*['"]([^'"]+)['"]""")
+_FINGERPRINT_RE = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % HASH_LENGTH)
+
+
+def referenced_files(template_file):
+    """Alle statischen Dateien, die ein Template über url_for('static', …) bzw. asset_url(…) einbindet."""
+    with open(template_file, encoding="utf-8") as f:
+        return sorted(set(_REFERENCE_RE.findall(f.read())))
+
+
+def fingerprinted_name(filename, digest):
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+class StaticAssets:
+    def __init__(self, static_dir, build_dir):
+        self.static_dir = static_dir
+        self.build_dir = build_dir
+        self._lock = threading.Lock()
+        self.manifest = {}     # logischer Pfad → {hash, url, size, mtime_ns, gzip, br}
+        self._reverse = {}     # fingerprinted Pfad → logischer Pfad
+        self._load_manifest()
+
+    # ---------- Manifest ----------
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.build_dir, MANIFEST), encoding="utf-8") as f:
+                self._set_manifest(json.load(f))
+        except (FileNotFoundError, ValueError):
+            self._set_manifest({})
+
+    def _set_manifest(self, manifest):
+        self.manifest = manifest
+        self._reverse = {info["url"]: name for name, info in manifest.items()}
+
+    def _write(self, path, payload):
+        """Atomar ersetzen – mit eigener temporärer Datei, damit parallele Builds sich nicht stören."""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _variant_path(self, filename, encoding):
+        return os.path.join(self.build_dir, filename + (".gz" if encoding == "gzip" else ".br"))
+
+    # ---------- Build ----------
+
+    def build(self, files, force=False):
+        """Erzeugt fehlende/veraltete Varianten. Liefert die Anzahl neu gebauter Dateien."""
+        built = 0
+        os.makedirs(self.build_dir, exist_ok=True)
+        with self._lock, file_lock(os.path.join(self.build_dir, LOCK_FILENAME)):
+            # Ein anderer Prozess kann inzwischen gebaut haben – dann ist hier nichts mehr zu tun
+            self._load_manifest()
+            manifest = dict(self.manifest)
+            for filename in files:
+                src = os.path.join(self.static_dir, filename)
+                try:
+                    st = os.stat(src)
+                except FileNotFoundError:
+                    manifest.pop(filename, None)
+                    continue
+                info = manifest.get(filename)
+                if (not force and info and info["size"] == st.st_size and info["mtime_ns"] == st.st_mtime_ns
+                        and all(os.path.exists(self._variant_path(filename, e)) for e in ("gzip", "br") if info.get(e))):
+                    continue
+
+                with open(src, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()
+                info = {
+                    "hash": digest[:HASH_LENGTH],
+                    "url": fingerprinted_name(filename, digest),
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "gzip": None,
+                    "br": None,
+                }
+                if filename.endswith(COMPRESSIBLE):
+                    os.makedirs(os.path.dirname(self._variant_path(filename, "gzip")), exist_ok=True)
+                    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+                    if brotli is not None:
+                        variants["br"] = brotli.compress(data, quality=11)
+                    for encoding, payload in variants.items():
+                        # Nur behalten, wenn die Variante tatsächlich kleiner ist
+                        if len(payload) < len(data):
+                            self._write(self._variant_path(filename, encoding), payload)
+                            info[encoding] = len(payload)
+                manifest[filename] = info
+                built += 1
+
+            if built or manifest != self.manifest:
+                self._write(os.path.join(self.build_dir, MANIFEST),
+                            json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+            self._set_manifest(manifest)
+        return built
+
+    # ---------- Auslieferung ----------
+
+    def url_name(self, filename):
+        """Fingerprinted Dateiname für url_for('static', …) – oder der Originalname ohne Manifest-Eintrag."""
+        info = self.manifest.get(filename)
+        return info["url"] if info else filename
+
+    def resolve(self, requested, accept_encodings=()):
+        """
+        Für einen fingerprinted Pfad: (Dateipfad, logischer Name, Content-Encoding oder None, Hash).
+        None, wenn der Pfad nicht aus dem Manifest stammt (→ normale Auslieferung).
+        """
+        filename = self._reverse.get(requested)
+        if filename is None:
+            return None
+        info = self.manifest[filename]
+        for encoding in ("br", "gzip"):
+            if info.get(encoding) and encoding in accept_encodings:
+                path = self._variant_path(filename, encoding)
+                if os.path.exists(path):
+                    return path, filename, encoding, info["hash"]
+        # Keine passende Variante → Original
+        return os.path.join(self.static_dir, filename), filename, None, info["hash"]
+
+
+def main(argv=None):
+    """CLI: python -m ca_tools.static_assets [--force]"""
+    import argparse
+
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, base)
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Statische Assets fingerprinten und vorkomprimieren")
+    parser.add_argument("--force", action="store_true", help="alle Varianten neu erzeugen")
+    args = parser.parse_args(argv)
+
+    assets = StaticAssets(os.path.join(base, "static"), Config.STATIC_BUILD_DIR)
+    files = referenced_files(os.path.join(base, "templates", "layout.html"))
+    built = assets.build(files, force=args.force)
+    for name in files:
+        info = assets.manifest.get(name)
+        if not info:
+            print(f"❌ {name}: nicht gefunden")
+            continue
+        sizes = ", ".join(f"{e} {info[e]}" for e in ("gzip", "br") if info.get(e)) or "unkomprimiert"
+        print(f"✅ {info['url']}  ({info['size']} Bytes → {sizes})")
+    if brotli is None:
+        print("ℹ️  Paket 'brotli' nicht installiert – nur gzip-Varianten erzeugt.")
+    print(f"==> {built} Datei(en) neu erzeugt")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Belastungstest für parallele CA-Schreibzugriffe (mehrere Prozesse wie gunicorn-Worker).
+
+Legt eine synthetische CA an (wie der Benchmark), startet N Prozesse, die
+gleichzeitig Zertifikate ausstellen und einen Teil davon sofort wieder
+widerrufen (inkl. CRL und Archivierung), und prüft danach die CA-Datenbank:
+
+- jede Zeile in index.txt ist gültig, jede Seriennummer kommt genau einmal vor
+- Anzahl Einträge = Anzahl erfolgreicher Ausstellungen (keine verlorenen Updates)
+- serial enthält die nächste freie Nummer, newcerts/<serial>.pem existiert
+- Status V/R stimmt mit den Ausstellungen/Widerrufen überein, R-Einträge haben ein Datum
+- die CRL enthält genau die widerrufenen Seriennummern
+- kein Dateisatz liegt halb in issued/ und halb im Archiv
+
+Aufruf:
+    python -m ca_tools.stress [--processes 8] [--issues 20] [--revoke-share 0.3] [--script] [--unlocked]
+
+--script stellt über issue_server_cert.sh aus (flock-Sperre im Skript), --unlocked
+schaltet die Sperre ab – nur um zu zeigen, dass der Test Wettläufe erkennt.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from ca_tools import issuer, revoke  # noqa: E402
+from ca_tools.ca_index import normalize_serial, parse_line  # noqa: E402
+
+
+def _disable_lock():
+    """Nur für --unlocked: CA-Sperre in diesem Prozess abschalten."""
+    issuer.ca_write_lock = lambda ca_dir: nullcontext()
+    revoke.ca_write_lock = lambda ca_dir: nullcontext()
+
+
+def _issue_script(base_dir, cn):
+    """Ausstellung über das Shell-Skript; liefert (Seriennummer, Basisname)."""
+    issued_dir = os.path.join(base_dir, "issued")
+    script = os.path.join(base_dir, "ca_tools_bash", "issue_server_cert.sh")
+    result = subprocess.run(["bash", script, "-c", cn, "-k", "2048"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stdout[-500:])
+    names = sorted(n for n in os.listdir(issued_dir) if n.startswith(f"{cn}__") and n.endswith(".cert.pem"))
+    cert_file = os.path.join(issued_dir, names[-1])
+    serial = subprocess.check_output(["openssl", "x509", "-in", cert_file, "-noout", "-serial"], text=True)
+    return normalize_serial(serial.strip().split("=", 1)[1]), names[-1][:-len(".cert.pem")]
+
+
+def _worker(args):
+    """Ein Prozess: issues Ausstellungen, davon revoke_share sofort widerrufen."""
+    worker_id, base_dir, issues, revoke_share, use_script, unlocked = args
+    if unlocked:
+        _disable_lock()
+    ca_dir = os.path.join(base_dir, "ca")
+    issued_dir = os.path.join(base_dir, "issued")
+    archive_dir = os.path.join(issued_dir, "archive")
+    rng = random.Random(worker_id)
+    issued, revoked, errors = [], [], []
+    for i in range(issues):
+        cn = f"w{worker_id:02d}-{i:03d}.stress.loc"
+        try:
+            if use_script:
+                serial, base = _issue_script(base_dir, cn)
+            else:
+                result = issuer.issue_certificate(cn, [f"alt.{cn}"], ca_dir=ca_dir, issued_dir=issued_dir,
+                                                  days=30, key_algo="ed25519")
+                serial, base = normalize_serial(result["serial"]), result["basename"]
+            issued.append(serial)
+        except Exception as e:  # Fehler zählen, nicht abbrechen – die Prüfung zeigt die Folgen
+            errors.append(f"issue {cn}: {e}")
+            continue
+        if rng.random() < revoke_share:
+            try:
+                outcome = revoke.revoke_batch(ca_dir, issued_dir, archive_dir, {serial: base}, reason="superseded")
+                if outcome[0]["outcome"] == revoke.OUTCOME_REVOKED:
+                    revoked.append(serial)
+                else:
+                    errors.append(f"revoke {serial}: {outcome[0]['outcome']}")
+            except Exception as e:
+                errors.append(f"revoke {serial}: {e}")
+    return {"issued": issued, "revoked": revoked, "errors": errors}
+
+
+def verify(base_dir, issued, revoked, start_serial):
+    """Prüft index.txt, serial, newcerts/, CRL und Dateisätze. Liefert eine Liste von Fehlern."""
+    from cryptography import x509
+
+    ca_dir = os.path.join(base_dir, "ca")
+    issued_dir = os.path.join(base_dir, "issued")
+    archive_dir = os.path.join(issued_dir, "archive")
+    problems = []
+
+    entries = []
+    with open(os.path.join(ca_dir, "index.txt"), encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            entry = parse_line(line)
+            if entry is None:
+                problems.append(f"index.txt Zeile {number} ungültig: {line!r}")
+            else:
+                entries.append(entry)
+
+    serials = [e.serial for e in entries]
+    duplicates = {s for s in serials if serials.count(s) > 1}
+    if duplicates:
+        problems.append(f"doppelte Seriennummern: {sorted(duplicates)[:10]}")
+    if len(entries) != len(issued):
+        problems.append(f"{len(entries)} Einträge in index.txt, aber {len(issued)} Ausstellungen (verlorene Updates)")
+    missing = set(issued) - set(serials)
+    if missing:
+        problems.append(f"ausgestellt, aber nicht in index.txt: {sorted(missing)[:10]}")
+
+    expected_next = max([int(s, 16) for s in serials] + [start_serial - 1]) + 1
+    try:
+        with open(os.path.join(ca_dir, "serial")) as f:
+            next_serial = int(f.read().strip(), 16)
+        if next_serial != expected_next:
+            problems.append(f"serial = {next_serial:X}, erwartet {expected_next:X}")
+    except (OSError, ValueError) as e:
+        problems.append(f"serial nicht lesbar: {e}")
+
+    for entry in entries:
+        if not os.path.exists(os.path.join(ca_dir, "newcerts", f"{issuer.format_serial(int(entry.serial, 16))}.pem")):
+            problems.append(f"newcerts/{entry.serial}.pem fehlt")
+        should_be_revoked = entry.serial in revoked
+        if should_be_revoked and (entry.status != "R" or not entry.revoked):
+            problems.append(f"{entry.serial}: widerrufen, aber Status {entry.status}")
+        if not should_be_revoked and entry.status != "V":
+            problems.append(f"{entry.serial}: Status {entry.status}, erwartet V")
+
+    try:
+        with open(os.path.join(ca_dir, "crl", "ca.crl.pem"), "rb") as f:
+            crl = x509.load_pem_x509_crl(f.read())
+        in_crl = {format(r.serial_number, "X") for r in crl}
+        index_revoked = {normalize_serial(e.serial) for e in entries if e.status == "R"}
+        if in_crl != index_revoked:
+            problems.append(f"CRL weicht ab: {len(in_crl)} in der CRL, {len(index_revoked)} widerrufen in index.txt")
+    except (OSError, ValueError) as e:
+        problems.append(f"CRL nicht lesbar: {e}")
+
+    for directory, other in ((issued_dir, archive_dir), (archive_dir, issued_dir)):
+        for name in os.listdir(directory):
+            if name.endswith(".cert.pem"):
+                base = name[:-len(".cert.pem")]
+                split = [ext for ext in revoke.ARTIFACT_EXTENSIONS if os.path.exists(os.path.join(other, base + ext))]
+                if split:
+                    problems.append(f"Dateisatz {base} geteilt: {split} liegen im anderen Verzeichnis")
+    return problems
+
+
+def main(argv=None):
+    from ca_tools import benchmark
+
+    parser = argparse.ArgumentParser(description="Parallele Ausstellungen/Widerrufe und Prüfung von index.txt")
+    parser.add_argument("--processes", type=int, default=8, help="parallele Prozesse (wie gunicorn-Worker)")
+    parser.add_argument("--issues", type=int, default=20, help="Ausstellungen pro Prozess")
+    parser.add_argument("--revoke-share", type=float, default=0.3, help="Anteil sofort widerrufener Zertifikate")
+    parser.add_argument("--script", action="store_true", help="über issue_server_cert.sh ausstellen")
+    parser.add_argument("--unlocked", action="store_true", help="ohne CA-Sperre (Gegenprobe)")
+    parser.add_argument("--keep", action="store_true", help="Test-CA nicht löschen")
+    args = parser.parse_args(argv)
+
+    base_dir = tempfile.mkdtemp(prefix="ca-stress-")
+    try:
+        ca_dir, _, _ = benchmark.build_ca(base_dir)
+        with open(os.path.join(ca_dir, "serial")) as f:
+            start_serial = int(f.read().strip(), 16)
+        # Anfangs-CRL, damit auch Läufe ohne Widerruf eine prüfbare CRL haben
+        revoke.generate_crl(ca_dir)
+
+        env_backup = os.environ.get("CA_LOCK_HELD")
+        if args.unlocked:
+            os.environ["CA_LOCK_HELD"] = "1"   # auch das Skript sperrt dann nicht
+        started = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            results = pool.map(_worker, [(w, base_dir, args.issues, args.revoke_share, args.script, args.unlocked)
+                                         for w in range(args.processes)])
+        elapsed = time.perf_counter() - started
+        if env_backup is None:
+            os.environ.pop("CA_LOCK_HELD", None)
+
+        issued = [s for r in results for s in r["issued"]]
+        revoked = {s for r in results for s in r["revoked"]}
+        errors = [e for r in results for e in r["errors"]]
+        problems = verify(base_dir, issued, revoked, start_serial)
+
+        print(json.dumps({
+            "processes": args.processes, "issues_per_process": args.issues, "backend": "script" if args.script else "python",
+            "locked": not args.unlocked, "seconds": round(elapsed, 2),
+            "issued": len(issued), "revoked": len(revoked), "errors": errors[:10], "error_count": len(errors),
+            "problems": problems[:20], "problem_count": len(problems),
+        }, indent=2, ensure_ascii=False))
+        if problems or errors:
+            print("❌ Integritätsprüfung fehlgeschlagen", file=sys.stderr)
+            return 1
+        print("✅ index.txt, serial, newcerts/, CRL und Dateisätze konsistent", file=sys.stderr)
+        return 0
+    finally:
+        if args.keep:
+            print(f"ℹ️  Test-CA bleibt erhalten: {base_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,16 @@ else
   exit 1
 fi
 
+# Bevorzugt: Python-Sweeper (ein Durchgang, index.txt einmal gelesen, Zertifikate einmal dekodiert)
+REPO_DIR="$(cd "$(dirname "$0")/.." && pwd)"
+PYTHON="${PYTHON:-$REPO_DIR/venv/bin/python}"
+[[ -x "$PYTHON" ]] || PYTHON="python3"
+if [[ -f "$REPO_DIR/ca_tools/archive_sweep.py" ]] && "$PYTHON" -c "import dotenv" >/dev/null 2>&1; then
+  cd "$REPO_DIR"
+  exec "$PYTHON" -m ca_tools.archive_sweep "$@"
+fi
+
+# Fallback ohne Python-Umgebung: Schleife mit openssl pro Zertifikat
 INDEX="$CA_DIR/index.txt"
 LOGFILE="$CA_DIR/cleanup.log"
 
@@ -30,7 +40,7 @@ for cert in "$ISSUED_DIR"/*.cert.pem; do
 
   if [[ "$status" == "R" || "$status" == "E" ]]; then
     echo "📦 [$status] Verschiebe $base.* nach $ARCHIVE_DIR" | tee -a "$LOGFILE"
-    for ext in .cert.pem .key.pem .csr.pem .fullchain.pem .p12; do
+    for ext in .key.pem .csr.pem .fullchain.pem .p12 .cert.pem; do   # .cert.pem zuletzt (Satz erst dann "archiviert")
       [[ -f "$base$ext" ]] && mv "$base$ext" "$ARCHIVE_DIR"/
     done
   fi
@@ -44,7 +54,7 @@ for cert in "$ISSUED_DIR"/*.cert.pem; do
   if ! grep -q "^$serial " "$TMP_STATUS"; then
     base="${cert%.cert.pem}"
     echo "⚠️  $base.* nicht im index.txt – verschiebe ins Archiv." | tee -a "$LOGFILE"
-    for ext in .cert.pem .key.pem .csr.pem .fullchain.pem .p12; do
+    for ext in .key.pem .csr.pem .fullchain.pem .p12 .cert.pem; do   # .cert.pem zuletzt (Satz erst dann "archiviert")
       [[ -f "$base$ext" ]] && mv "$base$ext" "$ARCHIVE_DIR"/
     done
   fi
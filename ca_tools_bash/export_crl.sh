@@ -18,11 +18,30 @@ mkdir -p "$EXPORT_DIR"
 # Export-Verzeichnis anlegen
 mkdir -p "$EXPORT_DIR"
 
+# CA-Schreibsperre: flock auf ${CA_DIR}/.ca.lock – dieselbe Datei wie die Web-App (ca_tools/ca_lock.py).
+# CA_LOCK_HELD=1: der Aufrufer hält die Sperre bereits.
+ca_lock() {
+  if [[ "${CA_LOCK_HELD:-0}" != "1" ]] && command -v flock >/dev/null 2>&1; then
+    exec 9>"${CA_DIR}/.ca.lock"
+    flock 9
+  fi
+}
+ca_unlock() {
+  if [[ "${CA_LOCK_HELD:-0}" != "1" ]] && command -v flock >/dev/null 2>&1; then
+    flock -u 9
+    exec 9>&-
+  fi
+}
+
 echo "📜 Generiere neue CRL (Certificate Revocation List)..."
-openssl ca -config "$CA_DIR/openssl.cnf" -gencrl -out "$CA_DIR/crl/ca.crl.pem" -passin file:"${CA_PASS_FILE}"
+ca_lock
+openssl ca -config "$CA_DIR/openssl.cnf" -gencrl -out "$CA_DIR/crl/ca.crl.pem.tmp" -passin file:"${CA_PASS_FILE}"
+mv -f "$CA_DIR/crl/ca.crl.pem.tmp" "$CA_DIR/crl/ca.crl.pem"
 
 echo "🔁 Konvertiere CRL zu Apache kompatibler Version..."
-openssl crl -in "$CA_DIR/crl/ca.crl.pem" -out "$CA_DIR/crl/ca.crl" -outform DER
+openssl crl -in "$CA_DIR/crl/ca.crl.pem" -out "$CA_DIR/crl/ca.crl.tmp" -outform DER
+mv -f "$CA_DIR/crl/ca.crl.tmp" "$CA_DIR/crl/ca.crl"
+ca_unlock
 
 echo "📦 Exportiere Dateien nach $EXPORT_DIR..."
 cp "$CA_DIR/crl/ca.crl.pem" "$EXPORT_DIR/"
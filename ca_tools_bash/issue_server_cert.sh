@@ -33,6 +33,10 @@ fi
 usage() {
   cat <<USAGE
 Usage: $0 -c <commonName> [-d <dnsSAN> ...] [-i <ipSAN> ...] [-D <days>] [-o <outdir>] [-k <keybits>]
+          [-K <vorhandener Schlüssel> [-P <Passphrase-Datei>]]
+
+  -K/-P: vorab erzeugten (ggf. verschlüsselten) Schlüssel verwenden, z. B. aus dem Key-Pool.
+         Die Datei wird übernommen und danach gelöscht.
 
 Beispiele:
   $0 -c pi-hole.bmgnet.loc
@@ -43,11 +47,13 @@ USAGE
 
 # ------------------------------ Globale Variablen ------------------------------
 CN=""
+POOL_KEY=""
+POOL_KEY_PASS=""
 declare -a DNS_SANS
 declare -a IP_SANS
 
 # ------------------------------ Argumente parsen -------------------------------
-while getopts ":c:d:i:D:o:k:" opt; do
+while getopts ":c:d:i:D:o:k:K:P:" opt; do
   case "$opt" in
     c) CN="$OPTARG" ;;
     d) DNS_SANS+=("$OPTARG") ;;
@@ -55,6 +61,8 @@ while getopts ":c:d:i:D:o:k:" opt; do
     D) CERT_DAYS="$OPTARG" ;;
     o) ISSUED_DIR="$OPTARG" ;;
     k) CERT_KEY_BITS="$OPTARG" ;;
+    K) POOL_KEY="$OPTARG" ;;
+    P) POOL_KEY_PASS="$OPTARG" ;;
     \?) echo "Fehler: Ungültige Option -$OPTARG" >&2; usage ;;
     :) echo "Fehler: Option -$OPTARG benötigt ein Argument." >&2; usage ;;
   esac
@@ -159,11 +167,21 @@ for ip in "${IP_SANS_FINAL[@]}"; do
 done
 
 # ------------------------------- Erstellung -----------------------------------
-echo "==> Generiere Server-Key (${CERT_KEY_ALGO}:${CERT_KEY_BITS}): ${KEY}"
-# Verwende genpkey für modernere Schlüsselerzeugung
-if [[ "$CERT_KEY_ALGO" == "rsa" ]]; then
+if [[ -n "$POOL_KEY" ]]; then
+  # Vorab erzeugten Schlüssel übernehmen (unverschlüsselt ablegen wie bei genpkey)
+  echo "==> Übernehme Schlüssel aus Key-Pool: ${KEY}"
+  if [[ -n "$POOL_KEY_PASS" ]]; then
+    openssl pkey -in "${POOL_KEY}" -passin file:"${POOL_KEY_PASS}" -out "${KEY}" >/dev/null 2>&1
+  else
+    openssl pkey -in "${POOL_KEY}" -out "${KEY}" >/dev/null 2>&1
+  fi
+  rm -f "${POOL_KEY}"
+elif [[ "$CERT_KEY_ALGO" == "rsa" ]]; then
+  echo "==> Generiere Server-Key (${CERT_KEY_ALGO}:${CERT_KEY_BITS}): ${KEY}"
+  # Verwende genpkey für modernere Schlüsselerzeugung
   openssl genpkey -algorithm RSA -out "${KEY}" -pkeyopt rsa_keygen_bits:"${CERT_KEY_BITS}" >/dev/null 2>&1
 else
+  echo "==> Generiere Server-Key (${CERT_KEY_ALGO}): ${KEY}"
   # Für z.B. Ed25519 (KEINE KEY_BITS nötig)
   openssl genpkey -algorithm "${CERT_KEY_ALGO}" -out "${KEY}" >/dev/null 2>&1
 fi
@@ -172,7 +190,24 @@ echo "==> Erzeuge CSR: ${CSR}"
 # Verwende -batch und -subj für nicht-interaktive Erstellung
 openssl req -new -key "${KEY}" -out "${CSR}" -subj "/CN=${CN}" -batch >/dev/null 2>&1
 
+# CA-Schreibsperre: flock auf ${CA_DIR}/.ca.lock – dieselbe Datei wie die Web-App (ca_tools/ca_lock.py).
+# CA_LOCK_HELD=1: der Aufrufer hält die Sperre bereits.
+ca_lock() {
+  if [[ "${CA_LOCK_HELD:-0}" != "1" ]] && command -v flock >/dev/null 2>&1; then
+    exec 9>"${CA_DIR}/.ca.lock"
+    flock 9
+  fi
+}
+ca_unlock() {
+  if [[ "${CA_LOCK_HELD:-0}" != "1" ]] && command -v flock >/dev/null 2>&1; then
+    flock -u 9
+    exec 9>&-
+  fi
+}
+
 echo "==> Signiere Zertifikat mit CA (${CERT_DAYS} Tage)"
+# Nur das Signieren (index.txt, serial, newcerts/) unter der Sperre
+ca_lock
 openssl ca -batch \
   -config "${CA_CONF_FILE}" \
   -extensions v3_server \
@@ -180,6 +215,7 @@ openssl ca -batch \
   -days "${CERT_DAYS}" -notext -md sha256 \
   -in "${CSR}" -out "${CERT}" \
   -passin file:"${CA_DIR}/private/ca.pass"
+ca_unlock
 
 # ------------------------------ Fullchain bauen -------------------------------
 echo "==> Baue Fullchain: ${CHAIN}"
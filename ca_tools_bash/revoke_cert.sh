@@ -40,12 +40,31 @@ if [[ -z "${CERT_FILE}" ]]; then
   exit 1
 fi
 
+# CA-Schreibsperre: flock auf ${CA_DIR}/.ca.lock – dieselbe Datei wie die Web-App (ca_tools/ca_lock.py).
+# CA_LOCK_HELD=1: der Aufrufer hält die Sperre bereits.
+ca_lock() {
+  if [[ "${CA_LOCK_HELD:-0}" != "1" ]] && command -v flock >/dev/null 2>&1; then
+    exec 9>"${CA_DIR}/.ca.lock"
+    flock 9
+  fi
+}
+ca_unlock() {
+  if [[ "${CA_LOCK_HELD:-0}" != "1" ]] && command -v flock >/dev/null 2>&1; then
+    flock -u 9
+    exec 9>&-
+  fi
+}
+
 echo "🔎 Zertifikat gefunden: ${CERT_FILE}"
+ca_lock
 echo "🚨 Widerrufe Zertifikat..."
 openssl ca -config "${CA_CONF_FILE}" -revoke "${CERT_FILE}"
 
 echo "📜 Erzeuge neue CRL (Certificate Revocation List)..."
-openssl ca -config "${CA_CONF_FILE}" -gencrl -out "${CA_DIR}/crl/ca.crl.pem"
+# Erst vollständig schreiben, dann ersetzen – Leser sehen nie eine halbe CRL
+openssl ca -config "${CA_CONF_FILE}" -gencrl -out "${CA_DIR}/crl/ca.crl.pem.tmp"
+mv -f "${CA_DIR}/crl/ca.crl.pem.tmp" "${CA_DIR}/crl/ca.crl.pem"
+ca_unlock
 
 echo "✅ Zertifikat widerrufen!"
 echo "👉 Widerrufene Zertifikate stehen in: ${CA_DIR}/index.txt"
@@ -23,11 +23,94 @@ class Config:
     
     # Root-Zertifikat (für Client-Import)
     CA_CERT_FILE = os.path.join(BASE_DIR, "certs", "ca.cert.pem")
+
+    # Zertifikats-Parser: "cryptography" (im Prozess) oder "openssl" (Subprozesse)
+    CERT_PARSER = os.getenv("CERT_PARSER", "cryptography")
+
+    # Persistenter Metadaten-Cache (SQLite); leer setzen, um ihn zu deaktivieren
+    CERT_CACHE_FILE = os.getenv("CERT_CACHE_FILE", os.path.join(BASE_DIR, "config", "certcache.db"))
+
+    # Hintergrund-Watcher für issued/, archive/ und index.txt: "off", "auto" (inotify, sonst Polling) oder "poll"
+    CERT_WATCHER = os.getenv("CERT_WATCHER", "off")
+    CERT_WATCHER_POLL_INTERVAL = float(os.getenv("CERT_WATCHER_POLL_INTERVAL", "5"))
+
+    # Paralleler Kaltstart-Scan: Anzahl Worker (0/1 = sequentiell) und Pool-Typ ("thread" oder "process")
+    SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", str(min(8, os.cpu_count() or 1))))
+    SCAN_EXECUTOR = os.getenv("SCAN_EXECUTOR", "thread")
+
+    # Schlüsselparameter der ausgestellten Zertifikate (wie in config.env für issue_server_cert.sh)
+    CERT_KEY_ALGO = os.getenv("CERT_KEY_ALGO", "rsa")
+    CERT_KEY_BITS = int(os.getenv("CERT_KEY_BITS", "4096"))
+    CERT_DAYS = int(os.getenv("CERT_DAYS", "825"))
+
+    # Ausstellung: "script" (issue_server_cert.sh) oder "python" (nativ im Prozess, ca_tools/issuer.py)
+    ISSUE_BACKEND = os.getenv("ISSUE_BACKEND", "script")
+
+    # Massenausstellung: Worker für Schlüsselerzeugung/Verpacken ("process" oder "thread")
+    BULK_WORKERS = int(os.getenv("BULK_WORKERS", str(os.cpu_count() or 1)))
+    BULK_EXECUTOR = os.getenv("BULK_EXECUTOR", "process")
+
+    # Job-Queue für create/renew/revoke: Anzahl Worker (0 = direkt in der Anfrage ausführen)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_DB_FILE = os.getenv("JOB_DB_FILE", os.path.join(BASE_DIR, "config", "jobs.db"))
+
+    # Automatische Erneuerung: gültige Zertifikate in issued/, die innerhalb des Fensters (Tage) ablaufen,
+    # werden alle AUTO_RENEW_INTERVAL Sekunden mit begrenzter Parallelität neu ausgestellt
+    AUTO_RENEW = os.getenv("AUTO_RENEW", "off").lower() in ("1", "on", "true", "yes")
+    AUTO_RENEW_WINDOW_DAYS = int(os.getenv("AUTO_RENEW_WINDOW_DAYS", "30"))
+    AUTO_RENEW_INTERVAL = int(os.getenv("AUTO_RENEW_INTERVAL", "3600"))
+    AUTO_RENEW_WORKERS = int(os.getenv("AUTO_RENEW_WORKERS", "2"))
+    AUTO_RENEW_MAX_ATTEMPTS = int(os.getenv("AUTO_RENEW_MAX_ATTEMPTS", "3"))
+    AUTO_RENEW_ARCHIVE = os.getenv("AUTO_RENEW_ARCHIVE", "off").lower() in ("1", "on", "true", "yes")
+    AUTO_RENEW_DB_FILE = os.getenv("AUTO_RENEW_DB_FILE", os.path.join(BASE_DIR, "config", "renewals.db"))
+
+    # Gepackter Archiv-Speicher (python -m ca_tools.archive_store pack): Sätze, die seit mindestens
+    # ARCHIVE_PACK_AFTER_DAYS Tagen im Archiv liegen, werden komprimiert in Segmentdateien verschoben
+    ARCHIVE_PACK_AFTER_DAYS = float(os.getenv("ARCHIVE_PACK_AFTER_DAYS", "30"))
+    ARCHIVE_SEGMENT_MAX_MB = int(os.getenv("ARCHIVE_SEGMENT_MAX_MB", "64"))
+
+    # CRL-Auslieferung (/crl/<datei>): maximale Cache-Dauer in Sekunden (sonst bis nextUpdate)
+    # und gzip-Variante der PEM-CRL für Clients mit Accept-Encoding: gzip
+    CRL_MAX_AGE = int(os.getenv("CRL_MAX_AGE", "3600"))
+    CRL_GZIP = os.getenv("CRL_GZIP", "on").lower() in ("1", "on", "true", "yes")
+
+    # OCSP-Responder unter /ocsp (öffentlich, ohne Login – daher standardmäßig aus): Gültigkeit der
+    # Antworten in Sekunden, delegierter Signer (Zertifikat/Schlüssel als PEM, empfohlen – sonst
+    # signiert der Root-CA-Schlüssel im Web-Prozess) und Nonce-Unterstützung
+    OCSP_ENABLED = os.getenv("OCSP_ENABLED", "off").lower() in ("1", "on", "true", "yes")
+    OCSP_VALIDITY = int(os.getenv("OCSP_VALIDITY", "3600"))
+    OCSP_SIGNER_CERT = os.getenv("OCSP_SIGNER_CERT", "")
+    OCSP_SIGNER_KEY = os.getenv("OCSP_SIGNER_KEY", "")
+    OCSP_NONCE = os.getenv("OCSP_NONCE", "off").lower() in ("1", "on", "true", "yes")
+
+    # Statische Assets: Fingerprint-URLs + gzip/brotli-Varianten (Build beim Start bzw. python -m ca_tools.static_assets)
+    STATIC_ASSETS = os.getenv("STATIC_ASSETS", "on").lower() in ("1", "on", "true", "yes")
+    STATIC_BUILD_DIR = os.getenv("STATIC_BUILD_DIR", os.path.join(BASE_DIR, "config", "static-build"))
+
+    # Kennzahlen unter /metrics (Prometheus-Textformat): Request-/Subprozess-Zeiten, Caches, Zähler.
+    # Optional Bearer-Token für den Scraper (sonst nur mit Login) und Log-Schwelle für langsame Anfragen (ms, 0 = aus)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "off").lower() in ("1", "on", "true", "yes")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    METRICS_SLOW_REQUEST_MS = int(os.getenv("METRICS_SLOW_REQUEST_MS", "0"))
+    # Gemeinsamer Kennzahlen-Speicher aller Worker-Prozesse (leer = jeder Prozess zählt für sich)
+    METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(BASE_DIR, "config", "metrics"))
+
+    # Key-Pool: Anzahl vorab erzeugter Schlüssel (0 = deaktiviert) und Ablageort
+    KEY_POOL_SIZE = int(os.getenv("KEY_POOL_SIZE", "0"))
+    KEY_POOL_DIR = os.getenv("KEY_POOL_DIR", os.path.join(BASE_DIR, "config", "keypool"))
     
     # Zeit in Millisekunden, wie lange Flash-Alerts sichtbar bleiben sollen
     ALERT_TIMEOUT_MS = 5000  # z. B. 10 Sekunden
     
-    # Flask-Server-Einstellungen
-    FLASK_HOST = "0.0.0.0"
-    FLASK_PORT = 5001
-    FLASK_DEBUG = True
\ No newline at end of file
+    # Flask-Server-Einstellungen (Entwicklungsserver: python app.py)
+    FLASK_HOST = os.getenv("FLASK_HOST", "0.0.0.0")
+    FLASK_PORT = int(os.getenv("FLASK_PORT", "5001"))
+    FLASK_DEBUG = os.getenv("FLASK_DEBUG", "off").lower() in ("1", "on", "true", "yes")
+
+    # Produktivbetrieb mit gunicorn (gunicorn -c gunicorn.conf.py app:app): Worker-Prozesse und
+    # Threads pro Worker. CA-Schreibzugriffe sind per Dateisperre (${CA_DIR}/.ca.lock) serialisiert.
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "4"))
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "4"))
+    # Sperrdatei der Leader-Wahl: nur der Prozess, der sie hält, führt Scan, Watcher, Key-Pool-
+    # Auffüllung, Jobs und Auto-Erneuerung aus (die übrigen Worker beantworten nur Anfragen)
+    SERVICES_LOCK_FILE = os.getenv("SERVICES_LOCK_FILE", os.path.join(BASE_DIR, "config", "services.lock"))
\ No newline at end of file
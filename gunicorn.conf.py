@@ -0,0 +1,32 @@
+"""
+gunicorn-Konfiguration für den Produktivbetrieb mit mehreren Worker-Prozessen:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Die Werte kommen aus config.py (bzw. Umgebung/config.env), siehe doku/mehrprozess_betrieb.md.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import Config  # noqa: E402
+
+bind = f"{Config.FLASK_HOST}:{Config.FLASK_PORT}"
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = "gthread"
+
+# Lange Vorgänge (Massenausstellung, Widerruf/Export mit Job-Queue) laufen als Hintergrund-Job;
+# der gthread-Heartbeat hängt nicht an den Anfrage-Threads. timeout deckt die längste synchrone
+# Anfrage ab (Einzelausstellung mit 4096-Bit-RSA ohne Key-Pool, Massenausstellung ohne Job-Queue).
+timeout = 300
+# Beim Neustart/Reload laufende Jobs im Leader-Worker zu Ende bringen lassen
+graceful_timeout = 300
+
+# Hintergrunddienste (Scan, Watcher, Key-Pool, Jobs, Auto-Erneuerung) startet nur der per
+# Sperrdatei gewählte Leader-Worker (SERVICES_LOCK_FILE) – Threads überleben keinen fork,
+# daher kein preload im Master
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
@@ -0,0 +1,12 @@
+"""
+Gemeinsame Einstellungen für die Tests (Aufruf aus dem Repo-Verzeichnis: python -m pytest -q).
+
+ca_tools ist ein Namespace-Paket ohne __init__.py – das Repo-Verzeichnis muss im
+Suchpfad liegen, wie bei den CLI-Werkzeugen.
+"""
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
@@ -0,0 +1,69 @@
+"""
+Gleichzeitiger Start mehrerer Worker-Prozesse (wie gunicorn mit WEB_WORKERS > 1) auf einer
+frischen Installation: alle Import-Initialisierungen (Datenbanken, Key-Pool, Passwortdatei,
+statische Assets, Leader-Wahl) müssen parallel gelingen.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_DIR
+
+WORKERS = 8
+
+BOOT = """
+import app
+print("leader" if app.leader.is_leader else "follower", flush=True)
+assert app.User.verify_password("admin")
+"""
+
+
+def _fresh_base(base_dir):
+    for sub in ("ca", "issued/archive"):
+        os.makedirs(os.path.join(base_dir, sub))
+    open(os.path.join(base_dir, "ca", "index.txt"), "w").close()
+
+
+def _boot_all(base_dir):
+    env = dict(os.environ, BASE_DIR=base_dir, JOB_WORKERS="2", KEY_POOL_SIZE="1", CERT_KEY_ALGO="ed25519",
+               AUTO_RENEW="on", STATIC_ASSETS="on", PYTHONPATH=REPO_DIR)
+    procs = [subprocess.Popen([sys.executable, "-c", BOOT], cwd=REPO_DIR, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+             for _ in range(WORKERS)]
+    return [(p.wait(timeout=120), p.stdout.read(), p.stderr.read()) for p in procs]
+
+
+@pytest.mark.parametrize("run", range(2))
+def test_concurrent_worker_boot(tmp_path, run):
+    base_dir = str(tmp_path)
+    _fresh_base(base_dir)
+    results = _boot_all(base_dir)
+    failures = [err for code, _, err in results if code != 0]
+    assert failures == []
+    roles = [out.strip().splitlines()[-1] for _, out, _ in results]
+    assert roles.count("leader") == 1
+    with open(os.path.join(base_dir, "config", "passwd.db"), "rb") as f:
+        assert f.read().startswith(b"$2")
+
+
+def test_password_change_reaches_other_workers(tmp_path):
+    base_dir = str(tmp_path)
+    _fresh_base(base_dir)
+    env = dict(os.environ, BASE_DIR=base_dir, PYTHONPATH=REPO_DIR)
+    script = """
+import app, sys
+assert app.User.verify_password("admin")
+sys.stdout.write("ready\\n"); sys.stdout.flush()
+sys.stdin.readline()      # anderer Worker ändert das Passwort
+print(app.User.verify_password("neu-123456"), app.User.verify_password("admin"))
+"""
+    other = subprocess.Popen([sys.executable, "-c", script], cwd=REPO_DIR, env=env, text=True,
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    while other.stdout.readline().strip() != "ready":   # ggf. Hinweis zum Standardpasswort überspringen
+        assert other.poll() is None, other.stderr.read()
+    subprocess.run([sys.executable, "-c", "import app; app.User.change_password('neu-123456')"],
+                   cwd=REPO_DIR, env=env, check=True, capture_output=True)
+    out, err = other.communicate("go\n", timeout=60)
+    assert out.strip().splitlines()[-1] == "True False", err
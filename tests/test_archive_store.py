@@ -0,0 +1,96 @@
+"""ArchiveStore – Packen, Lesen einzelner Dateien und Neuaufbau des Index aus den Segmenten."""
+import os
+import stat
+
+import pytest
+
+from ca_tools.archive_store import ArchiveStore
+from ca_tools.list_certs import read_cert_info
+
+from test_archive_sweep import _cert_pem, _setup
+
+
+def _archive_set(archive_dir, base, serial):
+    contents = {
+        base + ".cert.pem": _cert_pem(serial, base),
+        base + ".key.pem": os.urandom(64) + b"\n",
+        base + ".csr.pem": b"-----BEGIN CERTIFICATE REQUEST-----\n" + base.encode() + b"\n",
+    }
+    for name, data in contents.items():
+        with open(os.path.join(archive_dir, name), "wb") as f:
+            f.write(data)
+    return contents
+
+
+@pytest.fixture
+def packed(tmp_path):
+    _, _, archive_dir = _setup(tmp_path)
+    expected = {}
+    for i, base in enumerate(("host-a.20250101", "host-b.20250102", "host-c.20250103")):
+        expected.update(_archive_set(archive_dir, base, 0x20 + i))
+    store = ArchiveStore(archive_dir, segment_max_bytes=1)   # jeder Satz in einem eigenen Segment
+    count, _, after = store.pack(store.loose_sets(), read_cert_info)
+    assert count == 3 and after > 0
+    return store, archive_dir, expected
+
+
+def test_pack_and_read_member(packed):
+    store, archive_dir, expected = packed
+    assert store.loose_sets() == {}
+    assert not any(name in expected for name in os.listdir(archive_dir))
+    for name, data in expected.items():
+        assert store.read_member(name) == data
+    assert store.read_member("fehlt.cert.pem") is None
+
+    assert store.find_serial("21").base == "host-b.20250102"
+    certs = store.certificates({"22": "R"})
+    assert [(c["file"], c["status"], c["cn"]) for c in certs] == [
+        ("host-c.20250103.cert.pem", "R", "host-c.20250103"),
+        ("host-b.20250102.cert.pem", "V", "host-b.20250102"),
+        ("host-a.20250101.cert.pem", "V", "host-a.20250101"),
+    ]
+    assert store.verify() == []
+    assert stat.S_IMODE(os.stat(store.store_dir).st_mode) == 0o700
+    for name in os.listdir(store.store_dir):
+        if name.endswith((".pack", ".jsonl")):
+            assert stat.S_IMODE(os.stat(os.path.join(store.store_dir, name)).st_mode) == 0o600
+
+
+def test_other_instance_reads_packed_sets(packed):
+    store, archive_dir, expected = packed
+    other = ArchiveStore(archive_dir)
+    assert len(other) == 3
+    assert other.read_member("host-a.20250101.key.pem") == expected["host-a.20250101.key.pem"]
+
+
+def test_reindex_rebuilds_lost_index(packed):
+    store, archive_dir, expected = packed
+    before = {s.base: (s.segment, s.offset, s.length, s.members, s.meta) for s in store.sets()}
+    assert len({segment for segment, *_ in before.values()}) > 1
+    os.remove(store.index_file)
+    assert len(store) == 0
+
+    assert store.reindex() == 3
+    after = {s.base: (s.segment, s.offset, s.length, s.members, s.meta) for s in store.sets()}
+    assert after == before
+    for name, data in expected.items():
+        assert store.read_member(name) == data
+
+
+def test_truncated_segment_and_corruption(packed):
+    store, archive_dir, expected = packed
+    last = store.sets()[0]
+    segment = os.path.join(store.store_dir, last.segment)
+    # Abgeschnittener letzter Eintrag (Absturz beim Schreiben) wird beim reindex übergangen
+    with open(segment, "r+b") as f:
+        f.truncate(last.offset + last.length - 1)
+    assert store.reindex() == 2
+    assert store.find_member(last.cert_file) is None
+
+    first = store.sets()[-1]
+    with open(os.path.join(store.store_dir, first.segment), "r+b") as f:
+        f.seek(first.offset + first.length // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    assert [e.split(":")[0] for e in store.verify()] == [first.base]
@@ -0,0 +1,83 @@
+"""archive_sweep.sweep – Einordnung R/E/unindexed und halb geschriebene Zertifikate beim Scan."""
+import datetime
+import os
+
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from cryptography.x509.oid import NameOID
+
+from ca_tools import archive_sweep
+from ca_tools.cert_cache import CertCache
+
+
+def _cert_pem(serial, cn):
+    key = ed25519.Ed25519PrivateKey.generate()
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(serial).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=30))
+            .sign(key, None))
+    return cert.public_bytes(serialization.Encoding.PEM)
+
+
+def _setup(tmp_path):
+    ca_dir, issued_dir = tmp_path / "ca", tmp_path / "issued"
+    archive_dir = issued_dir / "archive"
+    for d in (ca_dir, archive_dir):
+        d.mkdir(parents=True)
+    return str(ca_dir), str(issued_dir), str(archive_dir)
+
+
+def _index_line(status, serial, cn):
+    revoked = "260101000000Z,superseded" if status == "R" else ""
+    return f"{status}\t301231235959Z\t{revoked}\t{serial:X}\tunknown\t/CN={cn}\n"
+
+
+def _add(issued_dir, base, pem):
+    with open(os.path.join(issued_dir, base + ".cert.pem"), "wb") as f:
+        f.write(pem)
+    with open(os.path.join(issued_dir, base + ".key.pem"), "wb") as f:
+        f.write(b"key")
+
+
+def test_sweep_moves_revoked_expired_and_unindexed(tmp_path):
+    ca_dir, issued_dir, archive_dir = _setup(tmp_path)
+    lines = []
+    for serial, status, base in ((0x10, "V", "valid"), (0x11, "R", "revoked"), (0x12, "E", "expired")):
+        _add(issued_dir, base, _cert_pem(serial, base))
+        lines.append(_index_line(status, serial, base))
+    _add(issued_dir, "stray", _cert_pem(0x99, "stray"))
+    with open(os.path.join(ca_dir, "index.txt"), "w") as f:
+        f.writelines(lines)
+
+    report = archive_sweep.sweep(ca_dir, issued_dir, archive_dir)
+    assert sorted((m["base"], m["reason"]) for m in report["moved"]) == [
+        ("expired", "E"), ("revoked", "R"), ("stray", "unindexed")]
+    assert report["kept"] == 1
+    assert sorted(os.listdir(issued_dir)) == ["archive", "valid.cert.pem", "valid.key.pem"]
+
+
+def test_sweep_rechecks_certificate_written_during_scan(tmp_path, monkeypatch):
+    ca_dir, issued_dir, archive_dir = _setup(tmp_path)
+    pem = _cert_pem(0x20, "fresh")
+    _add(issued_dir, "fresh", pem[:len(pem) // 2])         # openssl ca schreibt noch
+    open(os.path.join(ca_dir, "index.txt"), "w").close()
+    cache = CertCache(str(tmp_path / "cache.db"))
+
+    original = archive_sweep.scan_issued
+
+    def scan_then_finish(*args, **kwargs):
+        scanned = original(*args, **kwargs)
+        assert scanned == [("fresh", "")]                     # halbe Datei: keine Seriennummer
+        _add(issued_dir, "fresh", pem)                        # Ausstellung abgeschlossen …
+        with open(os.path.join(ca_dir, "index.txt"), "a") as f:
+            f.write(_index_line("V", 0x20, "fresh"))          # … und im Index
+        return scanned
+
+    monkeypatch.setattr(archive_sweep, "scan_issued", scan_then_finish)
+    report = archive_sweep.sweep(ca_dir, issued_dir, archive_dir, cache=cache)
+    assert report["moved"] == []
+    assert os.path.exists(os.path.join(issued_dir, "fresh.cert.pem"))
+    # Die halbe Datei darf nicht im Cache gelandet sein
+    assert cache.load_directory(issued_dir) == {}
@@ -0,0 +1,93 @@
+"""bundle_export – gestreamte ZIP-/tar.gz-Archive, geprüft mit zipfile/tarfile."""
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from ca_tools.archive_store import ArchiveStore
+from ca_tools.bundle_export import (BundleMember, FORMAT_TGZ, FORMAT_ZIP, bundle_members, stream_bundle)
+from ca_tools.list_certs import read_cert_info
+
+from test_archive_store import _archive_set
+from test_archive_sweep import _add, _cert_pem, _setup
+
+
+def _zip(members):
+    data = b"".join(stream_bundle(members, FORMAT_ZIP))
+    zf = zipfile.ZipFile(io.BytesIO(data))
+    assert zf.testzip() is None   # CRC aller Einträge
+    return zf
+
+
+def test_zip_contents_modes_and_sizes(tmp_path):
+    big = os.urandom(3 * 64 * 1024 + 17)   # mehrere Blöcke, nicht komprimierbar
+    path = tmp_path / "big.bin"
+    path.write_bytes(big)
+    members = [
+        BundleMember("ca.cert.pem", data=b"CA\n", mtime=1_700_000_000),
+        BundleMember("certs/host.key.pem", path=str(path)),
+        BundleMember("certs/leer.cert.pem", data=b"", mtime=1_700_000_000),
+        BundleMember("certs/größe-ü.cert.pem", data=b"x" * 100_000, mtime=1),
+        BundleMember("certs/fehlt.p12", path=str(tmp_path / "fehlt.p12")),
+    ]
+    zf = _zip(members)
+    assert zf.namelist() == ["ca.cert.pem", "certs/host.key.pem", "certs/leer.cert.pem", "certs/größe-ü.cert.pem"]
+    assert zf.read("certs/host.key.pem") == big
+    assert zf.read("certs/leer.cert.pem") == b""
+    assert zf.read("certs/größe-ü.cert.pem") == b"x" * 100_000
+    modes = {info.filename: (info.external_attr >> 16) & 0o777 for info in zf.infolist()}
+    assert modes["certs/host.key.pem"] == 0o600
+    assert modes["ca.cert.pem"] == 0o644
+    assert zf.getinfo("certs/größe-ü.cert.pem").date_time[0] == 1980   # vor 1980 nicht darstellbar
+
+
+def test_empty_zip(tmp_path):
+    assert _zip([]).namelist() == []
+
+
+def test_zip64_end_record_for_many_entries():
+    count = 0xFFFF + 2
+    zf = _zip(BundleMember(f"certs/{i}.cert.pem", data=b"%d" % i, mtime=1_700_000_000) for i in range(count))
+    names = zf.namelist()
+    assert len(names) == count
+    assert zf.read(names[-1]) == b"%d" % (count - 1)
+
+
+def test_bundle_members_from_issued_archive_and_store(tmp_path):
+    ca_dir, issued_dir, archive_dir = _setup(tmp_path)
+    _add(issued_dir, "live.20250101", _cert_pem(0x30, "live"))
+    loose = _archive_set(archive_dir, "alt.20240101", 0x31)
+    packed = _archive_set(archive_dir, "gepackt.20230101", 0x32)
+    store = ArchiveStore(archive_dir)
+    store.pack({"gepackt.20230101": sorted(packed)}, read_cert_info)
+
+    certs = [
+        {"file": "live.20250101.cert.pem", "source": "active"},
+        {"file": "alt.20240101.cert.pem", "source": "archive"},
+        {"file": "gepackt.20230101.cert.pem", "source": "archive", "packed": True},
+        {"file": "live.20250101.cert.pem", "source": "active"},   # doppelt → einmal
+    ]
+    extra = [BundleMember("crl/ca.crl.pem", data=b"CRL\n", mtime=1_700_000_000)]
+    members = list(bundle_members(certs, issued_dir, ("key", "cert"), store=store, extra=extra))
+
+    zf = _zip(members)
+    assert zf.namelist() == [
+        "certs/live.20250101.key.pem", "certs/live.20250101.cert.pem",
+        "archive/alt.20240101.key.pem", "archive/alt.20240101.cert.pem",
+        "archive/gepackt.20230101.key.pem", "archive/gepackt.20230101.cert.pem",
+        "crl/ca.crl.pem",
+    ]
+    assert zf.read("archive/alt.20240101.key.pem") == loose["alt.20240101.key.pem"]
+    assert zf.read("archive/gepackt.20230101.cert.pem") == packed["gepackt.20230101.cert.pem"]
+
+    tar = tarfile.open(fileobj=io.BytesIO(b"".join(stream_bundle(members, FORMAT_TGZ))), mode="r:gz")
+    assert tar.getnames() == zf.namelist()
+    assert tar.extractfile("archive/gepackt.20230101.key.pem").read() == packed["gepackt.20230101.key.pem"]
+    assert tar.getmember("certs/live.20250101.key.pem").mode == 0o600
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        list(stream_bundle([], "rar"))
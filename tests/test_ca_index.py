@@ -0,0 +1,123 @@
+"""CaIndex – inkrementelles Nachladen, Erkennung von In-place-Änderung und Austausch per rename."""
+import os
+import subprocess
+import sys
+
+from ca_tools.ca_index import CaIndex
+
+from conftest import REPO_DIR
+
+
+def _line(status, serial, cn):
+    return f"{status}\t301231235959Z\t\t{serial}\tunknown\t/CN={cn}\n"
+
+
+def _write(path, text, mode="w"):
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def test_append_is_read_incrementally(tmp_path):
+    path = str(tmp_path / "index.txt")
+    _write(path, _line("V", "01", "a"))
+    index = CaIndex(path)
+    assert index.status("1") == "V"
+    version = index.version
+
+    _write(path, _line("V", "02", "b"), mode="a")
+    assert index.status("2") == "V"
+    assert index.incremental_loads == 1 and index.full_loads == 1
+    assert index.version == version + 1
+    assert index.refresh() is False
+
+
+def test_partial_line_waits_for_newline(tmp_path):
+    path = str(tmp_path / "index.txt")
+    _write(path, _line("V", "01", "a"))
+    index = CaIndex(path)
+    assert len(index) == 1
+
+    _write(path, _line("V", "02", "b").rstrip("\n"), mode="a")
+    assert index.get("2") is None
+    _write(path, "\n", mode="a")
+    assert index.get("2").subject == "/CN=b"
+
+
+def test_in_place_rewrite_reloads_fully(tmp_path):
+    path = str(tmp_path / "index.txt")
+    _write(path, _line("V", "01", "a") + _line("V", "02", "b"))
+    index = CaIndex(path)
+    assert index.status("1") == "V"
+    inode = os.stat(path).st_ino
+
+    # Gleiche Inode, gleiche Größe, nur die mtime ändert sich (V → R in der ersten Zeile)
+    with open(path, "r+") as f:
+        f.write("R")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert os.stat(path).st_ino == inode
+    assert index.status("1") == "R"
+    _write(path, _line("V", "03", "c"), mode="a")
+    assert index.status("3") == "V"
+
+    # Letzte Zeile in place geändert, Datei gewachsen → alter Inhalt darf nicht stehen bleiben
+    with open(path, "r+") as f:
+        data = f.read()
+        f.seek(0)
+        f.write(data.replace("/CN=c", "/CN=C") + _line("V", "04", "d"))
+    assert index.get("3").subject == "/CN=C"
+    assert index.full_loads >= 2
+
+
+def test_rename_replacement_is_detected(tmp_path):
+    path = str(tmp_path / "index.txt")
+    _write(path, _line("V", "01", "a") + _line("V", "02", "b"))
+    index = CaIndex(path)
+    assert len(index) == 2
+    full = index.full_loads
+
+    # Wie openssl ca: neue Datei schreiben und per rename ersetzen (neue Inode, gleiche Größe)
+    _write(path + ".new", _line("R", "01", "a") + _line("V", "02", "b"))
+    os.replace(path + ".new", path)
+    assert index.status("1") == "R"
+    assert index.full_loads == full + 1
+
+    # Kürzere Ersatzdatei: entfernte Seriennummern verschwinden
+    _write(path + ".new", _line("V", "02", "b"))
+    os.replace(path + ".new", path)
+    assert index.get("1") is None
+    assert len(index) == 1
+
+    os.unlink(path)
+    assert index.refresh() is True
+    assert len(index) == 0
+
+
+DOWNLOAD = """
+import app
+client = app.app.test_client()
+client.post("/login", data={"username": app.User.id, "password": "admin"})
+response = client.get("/download/index")
+assert response.status_code == 200, response.status_code
+import sys; sys.stdout.write(response.get_data(as_text=True))
+"""
+
+
+def test_download_streams_raw_lines(tmp_path):
+    base_dir = str(tmp_path)
+    for sub in ("ca", "issued/archive"):
+        os.makedirs(os.path.join(base_dir, sub))
+    raw = (_line("V", "0A", "a") + "kaputt\n" + _line("R", "0A", "a-alt") +
+           "V\t301231235959Z\t0B\t/CN=kurz\n")
+    _write(os.path.join(base_dir, "ca", "index.txt"), raw)
+    env = dict(os.environ, BASE_DIR=base_dir, PYTHONPATH=REPO_DIR)
+    result = subprocess.run([sys.executable, "-c", DOWNLOAD], cwd=REPO_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    body = result.stdout[result.stdout.index("# Status"):]
+    assert body.splitlines()[2:] == [
+        "V\t301231235959Z\t0A\t/CN=a",
+        "kaputt",                          # Fehlzeile bleibt erhalten
+        "R\t301231235959Z\t0A\t/CN=a-alt",  # doppelte Seriennummer bleibt erhalten
+        "V\t301231235959Z\t0B\t/CN=kurz",
+    ]
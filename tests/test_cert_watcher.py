@@ -0,0 +1,39 @@
+"""CertInventory.reload – Ereignisse während des Einlesens gehen nicht verloren."""
+import os
+import threading
+
+from ca_tools.cert_watcher import CertInventory
+
+from test_archive_sweep import _add, _cert_pem, _setup
+
+
+def test_events_during_reload_are_replayed(tmp_path):
+    ca_dir, issued_dir, archive_dir = _setup(tmp_path)
+    open(os.path.join(ca_dir, "index.txt"), "w").close()
+    _add(issued_dir, "old", _cert_pem(0x10, "old"))
+    inventory = CertInventory(ca_dir, issued_dir, load=False)
+
+    scanned, release = threading.Event(), threading.Event()
+    original_scan = inventory._scan
+
+    def slow_scan(directory, *args, **kwargs):
+        result = original_scan(directory, *args, **kwargs)
+        if directory == issued_dir:
+            scanned.set()
+            release.wait(10)   # Momentaufnahme steht, Watcher arbeitet weiter
+        return result
+
+    inventory._scan = slow_scan
+    warm_up = threading.Thread(target=inventory.reload)
+    warm_up.start()
+    assert scanned.wait(10)
+
+    # Watcher-Ereignisse während des Kaltstarts: neue Datei, gelöschte Datei
+    _add(issued_dir, "new", _cert_pem(0x11, "new"))
+    os.unlink(os.path.join(issued_dir, "old.cert.pem"))
+    inventory.apply_changes(issued_dir, ["new.cert.pem", "old.cert.pem"])
+
+    release.set()
+    warm_up.join(10)
+    assert [c["file"] for c in inventory.certificates()] == ["new.cert.pem"]
+    assert inventory._recorders == []
@@ -0,0 +1,85 @@
+"""JobQueue – Schema-Anlage beim gleichzeitigen Start mehrerer Worker, Übernahme und Ausführung."""
+import multiprocessing
+import sqlite3
+import time
+
+from ca_tools.jobs import STATE_DONE, STATE_FAILED, JobError, JobQueue
+
+
+def _open(db_file):
+    try:
+        JobQueue(db_file)
+        return None
+    except Exception as e:
+        return repr(e)
+
+
+def _open_concurrently(db_file, processes=8):
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(processes) as pool:
+        return [e for e in pool.map(_open, [db_file] * processes) if e]
+
+
+def _columns(db_file):
+    with sqlite3.connect(db_file) as conn:
+        return {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+
+
+def test_concurrent_schema_creation_on_fresh_db(tmp_path):
+    for run in range(10):
+        db_file = str(tmp_path / f"jobs-{run}.db")
+        assert _open_concurrently(db_file) == []
+        assert "runner" in _columns(db_file)
+
+
+def test_concurrent_migration_from_schema_1(tmp_path):
+    for run in range(10):
+        db_file = str(tmp_path / f"jobs-{run}.db")
+        with sqlite3.connect(db_file) as conn:   # Schema 1: noch ohne runner
+            conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, label TEXT, "
+                         "params TEXT NOT NULL, state TEXT NOT NULL, message TEXT, log TEXT NOT NULL DEFAULT '', "
+                         "created REAL NOT NULL, started REAL, finished REAL)")
+            conn.execute("INSERT INTO jobs (id, kind, params, state, created) VALUES ('a', 'x', '{}', 'done', 0)")
+        assert _open_concurrently(db_file) == []
+        assert "runner" in _columns(db_file)
+        assert JobQueue(db_file).get("a")["state"] == STATE_DONE
+
+
+def _wait(queue, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["state"] in (STATE_DONE, STATE_FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} nicht fertig: {queue.get(job_id)}")
+
+
+def test_jobs_run_only_after_start(tmp_path):
+    db_file = str(tmp_path / "jobs.db")
+    follower = JobQueue(db_file)               # reiht nur ein (kein Leader)
+    leader = JobQueue(db_file, poll_interval=0.05)
+
+    def ok(params, log):
+        log("läuft")
+        return f"ok {params['n']}"
+
+    def fails(params, log):
+        raise JobError("geht nicht")
+
+    for queue in (follower, leader):
+        queue.register("ok", ok)
+        queue.register("fails", fails)
+
+    first = follower.submit("ok", {"n": 1})
+    time.sleep(0.2)
+    assert follower.get(first)["state"] == "queued"
+
+    leader.start()
+    try:
+        second = follower.submit("fails", {})
+        job = _wait(leader, first)
+        assert job["message"] == "ok 1" and "läuft" in job["log"]
+        assert _wait(leader, second)["message"] == "geht nicht"
+    finally:
+        leader.stop()
@@ -0,0 +1,68 @@
+"""Kennzahlen über mehrere Worker-Prozesse (MultiprocessStore): Summen, pid-Label, beendete Prozesse."""
+import multiprocessing
+import os
+import re
+
+from ca_tools.metrics import DEAD_FILE, AppMetrics
+
+
+def _value(text, series):
+    match = re.search(r"^" + re.escape(series) + r" (\S+)$", text, re.M)
+    return float(match.group(1)) if match else None
+
+
+def _make(shared_dir):
+    metrics = AppMetrics(shared_dir=shared_dir)
+    metrics.collector(lambda: [("ca_test_level", "gauge", "Test", [({}, os.getpid() % 1000)])])
+    return metrics
+
+
+def _child(shared_dir, issued, conn):
+    metrics = _make(shared_dir)
+    metrics.store.start()
+    metrics.issued_total.inc("create", "ok", amount=issued)
+    metrics.request_seconds.observe(0.02, "dashboard", "GET")
+    metrics.store.flush()
+    conn.send(os.getpid())
+    conn.recv()          # bis der Test sagt, dass der Prozess enden darf
+
+
+def test_counters_are_summed_across_processes(tmp_path):
+    shared_dir = str(tmp_path / "metrics")
+    ctx = multiprocessing.get_context("fork")
+    children = []
+    for issued in (2, 3):
+        parent_conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(target=_child, args=(shared_dir, issued, child_conn))
+        proc.start()
+        children.append((proc, parent_conn, parent_conn.recv()))
+
+    own = _make(shared_dir)
+    own.store.start()
+    own.issued_total.inc("create", "ok")
+    text = own.render()
+    assert _value(text, 'ca_certificates_issued_total{source="create",outcome="ok"}') == 6
+    assert _value(text, 'ca_http_request_duration_seconds_count{endpoint="dashboard",method="GET"}') == 2
+    for _, _, pid in children:
+        assert f'ca_test_level{{pid="{pid}"}}' in text
+    assert f'ca_test_level{{pid="{os.getpid()}"}}' in text
+
+    # Prozesse enden: Zähler bleiben erhalten (dead.json), ihre Collector-Werte verschwinden
+    for proc, conn, _ in children:
+        conn.send("stop")
+        proc.join()
+    own.store.flush()
+    assert os.path.exists(os.path.join(shared_dir, DEAD_FILE))
+    assert sorted(os.listdir(shared_dir)) == sorted([DEAD_FILE, f"{os.getpid()}.json", ".lock"])
+    text = own.render()
+    assert _value(text, 'ca_certificates_issued_total{source="create",outcome="ok"}') == 6
+    for _, _, pid in children:
+        assert f'pid="{pid}"' not in text
+    own.store.stop()
+
+
+def test_without_shared_dir_counts_per_process():
+    metrics = AppMetrics()
+    metrics.revoked_total.inc("revoked")
+    assert metrics.store is None
+    assert _value(metrics.render(), 'ca_certificates_revoked_total{outcome="revoked"}') == 1
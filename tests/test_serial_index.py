@@ -0,0 +1,62 @@
+"""SerialIndex.lookup_many – höchstens ein erzwungenes Einlesen pro Batch, begrenzt über die mtime."""
+import os
+
+from ca_tools import serial_index as serial_index_module
+from ca_tools.serial_index import SerialIndex
+
+from test_archive_sweep import _add, _cert_pem, _index_line, _setup
+
+OLD = 1_000_000_000  # mtime weit in der Vergangenheit: Änderung liegt sicher vor dem letzten Einlesen
+
+
+def _age(*paths):
+    for path in paths:
+        os.utime(path, (OLD, OLD))
+
+
+def _counting_scan(monkeypatch):
+    calls = []
+    original = serial_index_module._scan_directory
+
+    def scan(directory, *args, **kwargs):
+        calls.append(directory)
+        return original(directory, *args, **kwargs)
+
+    monkeypatch.setattr(serial_index_module, "_scan_directory", scan)
+    return calls
+
+
+def test_batch_with_unknown_serials_forces_once(tmp_path, monkeypatch):
+    ca_dir, issued_dir, archive_dir = _setup(tmp_path)
+    _add(issued_dir, "known", _cert_pem(0x10, "known"))
+    with open(os.path.join(ca_dir, "index.txt"), "w") as f:
+        f.write(_index_line("V", 0x10, "known"))
+    index = SerialIndex(ca_dir, issued_dir)
+    calls = _counting_scan(monkeypatch)
+
+    entries = index.lookup_many(["10", "AA", "BB", "CC", "DD"])
+
+    assert entries[0]["file"] == "known.cert.pem"
+    assert entries[1:] == [None] * 4
+    assert index.forced_refreshes == 1
+    assert calls.count(issued_dir) == 2  # normales + ein erzwungenes Einlesen
+
+
+def test_forced_refresh_skipped_when_nothing_can_have_changed(tmp_path, monkeypatch):
+    ca_dir, issued_dir, archive_dir = _setup(tmp_path)
+    open(os.path.join(ca_dir, "index.txt"), "w").close()
+    _age(os.path.join(ca_dir, "index.txt"), issued_dir, archive_dir)
+    index = SerialIndex(ca_dir, issued_dir)
+
+    assert index.lookup("AA") is None
+    assert index.forced_refreshes == 1
+    calls = _counting_scan(monkeypatch)
+    for serial in ("AA", "BB", "CC"):
+        assert index.lookup(serial) is None
+    assert index.forced_refreshes == 1
+    assert calls == []
+
+    # Neue Datei ändert die Verzeichnis-mtime → wird ohne Erzwingen gefunden
+    _add(issued_dir, "late", _cert_pem(0xAA, "late"))
+    os.utime(issued_dir)
+    assert index.lookup("AA")["file"] == "late.cert.pem"
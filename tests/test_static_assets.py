@@ -0,0 +1,47 @@
+"""StaticAssets.build – parallele Builds mehrerer Worker beim Start."""
+import json
+import multiprocessing
+import os
+
+from ca_tools.static_assets import MANIFEST, StaticAssets
+
+FILES = ["app.css", "app.js", "logo.png"]
+
+
+def _make_static(static_dir):
+    os.makedirs(static_dir)
+    for name in FILES:
+        with open(os.path.join(static_dir, name), "wb") as f:
+            f.write((name.encode() + b" body { color: red; }\n") * 2000)
+
+
+def _build(args):
+    static_dir, build_dir = args
+    try:
+        StaticAssets(static_dir, build_dir).build(FILES, force=True)
+        return None
+    except Exception as e:  # Ergebnis an den Test zurückgeben statt den Pool abzubrechen
+        return repr(e)
+
+
+def test_build_writes_manifest_and_variants(tmp_path):
+    static_dir, build_dir = str(tmp_path / "static"), str(tmp_path / "build")
+    _make_static(static_dir)
+    assets = StaticAssets(static_dir, build_dir)
+    assert assets.build(FILES) == len(FILES)
+    assert assets.build(FILES) == 0   # unverändert → nichts neu
+    assert assets.manifest["app.css"]["gzip"]
+    assert os.path.exists(os.path.join(build_dir, "app.css.gz"))
+    assert assets.manifest["logo.png"]["gzip"] is None   # bereits komprimiertes Format
+
+
+def test_concurrent_builds_do_not_fail(tmp_path):
+    static_dir, build_dir = str(tmp_path / "static"), str(tmp_path / "build")
+    _make_static(static_dir)
+    with multiprocessing.get_context("fork").Pool(8) as pool:
+        errors = [e for e in pool.map(_build, [(static_dir, build_dir)] * 32) if e]
+    assert errors == []
+    with open(os.path.join(build_dir, MANIFEST), encoding="utf-8") as f:
+        assert sorted(json.load(f)) == sorted(FILES)
+    leftovers = [n for _, _, names in os.walk(build_dir) for n in names if n.endswith(".tmp")]
+    assert leftovers == []